@@ -1,11 +1,22 @@
+import numbers
+import os
+import time
+import weakref
+
 import streamlit as st
-import requests
 import pandas as pd
-import io
-import chardet
 import altair as alt
 from PIL import Image, ImageDraw, ImageOps
-from csv import Sniffer
+
+from bacen import aquecimento, dados, series
+from bacen.busca import buscar as buscar_instituicoes
+from bacen.colunas import identificar_coluna_instituicao, identificar_colunas_reclamacoes
+from bacen.comparacao import obter_comparacao, periodo_anterior
+from bacen.dados import gerar_link_csv
+from bacen.lote import iterar_periodos
+from bacen.metricas import iniciar_servidor_metricas, medir, observar, resumo
+from bacen.numeros import converter_numero, formatar_numero_brasileiro, formatar_numeros
+from bacen.series import ordenar_periodos, serie_instituicao
 
 # ================= CONFIGURAÇÃO DA PÁGINA =================
 st.set_page_config(
@@ -15,36 +26,83 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+inicio_rerun = time.perf_counter()
+
 # ================= FUNÇÕES AUXILIARES =================
 def safe_index(lista):
     return len(lista) - 1 if lista else 0
 
 
-@st.cache_data
-def load_data():
-    url = "https://www3.bcb.gov.br/rdrweb/rest/ext/ranking"
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
+def texto_celula(valor):
+    # As colunas vêm tipadas (int64/float64/texto); exibir tudo no padrão brasileiro
+    if pd.isna(valor):
+        return ""
+    if isinstance(valor, numbers.Integral):
+        return f"{valor:,}".replace(",", ".")
+    if isinstance(valor, numbers.Real):
+        return formatar_numero_brasileiro(valor)
+    return str(valor)
+
+
+def tabela_comparacao(linhas):
+    # Só as linhas exibidas são formatadas
+    tabela = pd.DataFrame({
+        'Instituição': linhas['instituicao'],
+        'Posição anterior': linhas['posicao_anterior'],
+        'Posição atual': linhas['posicao_atual'],
+        'Variação': linhas['variacao_posicao'],
+        'Índice anterior': formatar_numeros(linhas['Índice_anterior']),
+        'Índice atual': formatar_numeros(linhas['Índice_atual']),
+        'Variação do Índice': formatar_numeros(linhas['Índice_variacao']),
+    })
+    return tabela.reset_index(drop=True)
 
-    data = response.json()
 
-    df = pd.json_normalize(
-        data,
-        record_path=['anos', 'periodicidades', 'periodos', 'tipos'],
-        meta=[
-            ['anos', 'ano'],
-            ['anos', 'periodicidades', 'periodicidade'],
-            ['anos', 'periodicidades', 'periodos', 'periodo']
-        ]
-    )
+def derivados_periodo(chave, resultado):
+    """
+    Colunas identificadas e índice de instituições do período, guardados na
+    sessão: os reruns de fragmentos e da página no mesmo período os reaproveitam.
+    A sessão guarda só a chave e uma referência fraca ao Resultado: o DataFrame
+    continua só no cache em memória, que pode removê-lo para respeitar o orçamento.
+    """
+    memo = st.session_state.get("derivados")
+    if memo is None or memo["chave"] != chave or memo["resultado"]() is not resultado:
+        memo = st.session_state["derivados"] = {
+            "chave": chave,
+            "resultado": weakref.ref(resultado),
+            "coluna_instituicao": identificar_coluna_instituicao(resultado.df.columns),
+            "colunas_reclamacoes": identificar_colunas_reclamacoes(resultado.df.columns),
+            # Montado uma vez por período e guardado no Resultado em cache: nome -> linha
+            "instituicoes": resultado.instituicoes,
+        }
+    return memo
+
+
+# Cache em memória do processo, o mesmo que o aquecimento em segundo plano preenche.
+# Com TTL, períodos gravados depois por um backfill passam a ser lidos localmente
+load_data = dados.obter_catalogo
+carregar_periodo = dados.obter_periodo
+
 
-    df.columns = ['tipo', 'ano', 'periodicidade', 'periodo']
-    return df
+@st.cache_resource
+def iniciar_aquecimento():
+    # Períodos padrão de cada tipo, na inicialização e a cada atualização do catálogo
+    aquecimento.ativar()
+    # Partições das séries históricas: lidas fora dos reruns
+    series.carregar_em_segundo_plano()
 
 
-def gerar_link_csv(ano, periodicidade, periodo, tipo):
-    base = "https://www3.bcb.gov.br/rdrweb/rest/ext/ranking/arquivo"
-    return f"{base}?ano={ano}&periodicidade={periodicidade}&periodo={periodo}&tipo={tipo}"
+iniciar_aquecimento()
+
+
+@st.cache_resource
+def servidor_metricas(porta):
+    # Um único servidor /metrics por processo, mesmo com vários reruns e sessões
+    return iniciar_servidor_metricas(porta)
+
+
+if os.environ.get("BACEN_METRICAS_PORTA"):
+    servidor_metricas(int(os.environ["BACEN_METRICAS_PORTA"]))
 
 
 def cantos_arredondados(image, radius):
@@ -60,162 +118,33 @@ def cantos_arredondados(image, radius):
     return result
 
 
-@st.cache_data
-def baixar_csv(url):
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
-
-    encoding = chardet.detect(response.content)['encoding']
-    csv_text = response.content.decode(encoding or "latin1", errors="ignore")
-    
-    # TENTATIVA 1: Detectar delimitador automaticamente
+@st.cache_resource
+def logo_arredondado():
+    # Lido e arredondado uma vez por processo, não a cada rerun
     try:
-        delimiter = Sniffer().sniff(csv_text[:10000]).delimiter
+        return cantos_arredondados(Image.open("logo.png").convert("RGBA"), 20)
     except Exception:
-        delimiter = ";"
-    
-    # TENTATIVA 2: Ler o CSV
-    try:
-        df = pd.read_csv(io.StringIO(csv_text), sep=delimiter, dtype=str, on_bad_lines='warn')
-    except Exception as e:
-        st.warning(f"Tentativa 1 falhou: {str(e)[:100]}... Tentando método alternativo.")
-        
-        # TENTATIVA 3: Tentar com diferentes delimitadores
-        for delim in [';', ',', '\t', '|']:
-            try:
-                df = pd.read_csv(io.StringIO(csv_text), sep=delim, dtype=str, on_bad_lines='warn')
-                if df.shape[1] > 1:  # Se encontrou mais de uma coluna
-                    break
-            except:
-                continue
-        
-        # TENTATIVA 4: Se nada funcionar, tentar ler linha por linha
-        try:
-            lines = csv_text.strip().split('\n')
-            # Encontrar o cabeçalho
-            for i, line in enumerate(lines):
-                if ';' in line and ('Instituição' in line or 'Índice' in line):
-                    header_line = i
-                    break
-            else:
-                header_line = 0
-            
-            # Ler a partir do cabeçalho
-            df = pd.read_csv(io.StringIO('\n'.join(lines[header_line:])), sep=';', dtype=str)
-        except Exception as e2:
-            st.error(f"Não foi possível ler o arquivo CSV. Erro: {str(e2)[:200]}")
-            # Retornar DataFrame vazio
-            return pd.DataFrame()
-    
-    return df
+        return None
 
-# ================= FUNÇÃO PARA LIMPAR DADOS =================
-def limpar_dados_csv(df):
-    """
-    Limpa e padroniza o DataFrame baixado do BACEN
-    """
-    if df.empty:
-        return df
-    
-    # Fazer uma cópia para não modificar o original
-    df = df.copy()
-    
-    # Remover colunas completamente vazias
-    df = df.dropna(axis=1, how='all')
-    
-    # Remover linhas completamente vazias
-    df = df.dropna(how='all')
-    
-    # Remover apenas colunas de índice do pandas (Unnamed: 0, etc.)
-    colunas_para_remover = []
-    for col in df.columns:
-        if str(col).strip() in ['', 'Unnamed: 0', 'Unnamed: 0.1', 'index', 'Unnamed: 0.1.1']:
-            colunas_para_remover.append(col)
-    
-    df = df.drop(columns=colunas_para_remover, errors='ignore')
-    
-    # Padronizar nomes de colunas - MANTENDO TODAS AS COLUNAS ORIGINAIS
-    colunas_mapeamento = {
-        'Instituição financeira': 'Instituição',
-        'Administradora de consórcio': 'Instituição',
-        'Instituição Financeira': 'Instituição',
-        'Administradora de Consórcio': 'Instituição',
-        'Índice': 'Índice'
-    }
-    
-    # Renomear apenas as colunas principais
-    df = df.rename(columns={col: colunas_mapeamento.get(col, col) for col in df.columns})
-    
-    # Garantir que todas as colunas sejam strings
-    for col in df.columns:
-        df[col] = df[col].astype(str)
-    
-    return df
 
-# ================= FUNÇÃO PARA FORMATAR NÚMEROS NO PADRÃO BRASILEIRO =================
-def formatar_numero_brasileiro(valor):
-    """
-    Formata números no padrão brasileiro: 1.234,56
-    """
-    if pd.isna(valor) or str(valor).strip() in ['', 'nan', 'None', 'NaN']:
-        return ""
-    
-    try:
-        # Se já for string formatada, retorna como está
-        if isinstance(valor, str):
-            valor_str = str(valor).strip()
-            # Verifica se já está no formato brasileiro (tem vírgula como decimal)
-            if ',' in valor_str and valor_str.replace(',', '').replace('.', '').replace('-', '').isdigit():
-                # Garantir que está formatado corretamente
-                try:
-                    # Remover pontos de milhar existentes
-                    if '.' in valor_str and ',' in valor_str:
-                        # Verificar qual é o separador decimal
-                        if valor_str.rfind('.') > valor_str.rfind(','):
-                            # Ponto é o separador decimal, vírgula é milhar
-                            num = float(valor_str.replace(',', '').replace('.', '').replace(',', '.'))
-                        else:
-                            # Vírgula é o separador decimal
-                            num = float(valor_str.replace('.', '').replace(',', '.'))
-                    elif ',' in valor_str:
-                        # Apenas vírgula, provavelmente é decimal
-                        num = float(valor_str.replace('.', '').replace(',', '.'))
-                    else:
-                        # Apenas número
-                        num = float(valor_str)
-                except:
-                    num = float(valor_str.replace('.', '').replace(',', '.'))
-            else:
-                # Tentar converter para número
-                try:
-                    num = float(valor_str.replace('.', '').replace(',', '.'))
-                except:
-                    return valor_str
-        else:
-            num = float(valor)
-        
-        # Formata com separador de milhar e 2 casas decimais
-        if num >= 1000:
-            return f"{num:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        else:
-            return f"{num:.2f}".replace(".", ",")
-    except Exception as e:
-        return str(valor)
+# Fragmentos: ao mexer em um widget de dentro, só o fragmento é reexecutado
+fragmento = getattr(st, "fragment", None) or st.experimental_fragment
+
 
 # ================= SIDEBAR =================
 with st.sidebar:
     st.subheader("BASES DE RECLAMAÇÕES DO BACEN")
 
-    try:
-        logo = Image.open("logo.png").convert("RGBA")
-        st.image(cantos_arredondados(logo, 20), use_column_width=True)
-    except:
+    logo = logo_arredondado()
+    if logo is not None:
+        st.image(logo, use_column_width=True)
+    else:
         st.info("Logo não encontrado")
 
-    df_base = load_data()
+    _, indice_catalogo = load_data()
 
     # ---- Tipo
-    tipos = sorted(df_base['tipo'].dropna().unique().tolist())
+    tipos = list(indice_catalogo)
     if not tipos:
         st.error("Nenhum tipo disponível.")
         st.stop()
@@ -223,12 +152,7 @@ with st.sidebar:
     tipo = st.selectbox("Selecione o tipo:", tipos)
 
     # ---- Ano
-    anos = sorted(
-        df_base[df_base['tipo'] == tipo]['ano']
-        .dropna()
-        .unique()
-        .tolist()
-    )
+    anos = list(indice_catalogo[tipo])
     if not anos:
         st.error("Nenhum ano disponível.")
         st.stop()
@@ -236,15 +160,7 @@ with st.sidebar:
     ano = st.selectbox("Selecione o ano:", anos, index=safe_index(anos))
 
     # ---- Periodicidade
-    periodicidades = (
-        df_base[
-            (df_base['tipo'] == tipo) &
-            (df_base['ano'] == ano)
-        ]['periodicidade']
-        .dropna()
-        .unique()
-        .tolist()
-    )
+    periodicidades = list(indice_catalogo[tipo][ano])
 
     if not periodicidades:
         st.error("Nenhuma periodicidade disponível.")
@@ -256,16 +172,7 @@ with st.sidebar:
     )
 
     # ---- Período
-    periodos = (
-        df_base[
-            (df_base['tipo'] == tipo) &
-            (df_base['ano'] == ano) &
-            (df_base['periodicidade'] == periodicidade)
-        ]['periodo']
-        .dropna()
-        .unique()
-        .tolist()
-    )
+    periodos = indice_catalogo[tipo][ano][periodicidade]
 
     if not periodos:
         st.warning("Não há períodos disponíveis para este filtro.")
@@ -277,539 +184,563 @@ with st.sidebar:
         index=safe_index(periodos)
     )
 
+    # ---- Comparação com outro período (por padrão, o anterior)
+    st.markdown("---")
+    periodo_comparado = None
+    if st.checkbox("Comparar com outro período"):
+        sugerido = periodo_anterior(indice_catalogo, tipo, ano, periodicidade, periodo)
+        ano_comparado = st.selectbox(
+            "Ano de comparação:",
+            anos,
+            index=anos.index(sugerido[1]) if sugerido else safe_index(anos)
+        )
+        periodicidades_comparadas = list(indice_catalogo[tipo][ano_comparado])
+        periodicidade_comparada = st.selectbox(
+            "Periodicidade de comparação:",
+            periodicidades_comparadas,
+            index=periodicidades_comparadas.index(periodicidade) if periodicidade in periodicidades_comparadas else 0
+        )
+        periodos_comparados = indice_catalogo[tipo][ano_comparado][periodicidade_comparada]
+        if periodos_comparados:
+            periodo_escolhido = st.selectbox(
+                "Período de comparação:",
+                periodos_comparados,
+                index=(
+                    periodos_comparados.index(sugerido[3])
+                    if sugerido and sugerido[1] == ano_comparado and sugerido[3] in periodos_comparados
+                    else safe_index(periodos_comparados)
+                )
+            )
+            periodo_comparado = (tipo, ano_comparado, periodicidade_comparada, periodo_escolhido)
+
+    # ---- Todos os períodos do ano, baixados juntos
+    ver_periodos_ano = len(periodos) > 1 and st.checkbox("Ver todos os períodos do ano")
+
+# Os próximos cliques prováveis (outros períodos do mesmo ano) já vão sendo carregados
+aquecimento.prefetch(indice_catalogo, tipo, ano, periodicidade, periodo)
+
 # ================= DOWNLOAD E LEITURA CSV =================
 csv_url = gerar_link_csv(ano, periodicidade, periodo, tipo)
 
+# Períodos já trazidos pelo backfill (python -m bacen.backfill) são lidos localmente
+# Enquanto está na tela, o período não sai do cache em memória para abrir espaço
+dados.selecionar_periodo(tipo, ano, periodicidade, periodo)
 try:
-    df_csv = baixar_csv(csv_url)
+    resultado = carregar_periodo(tipo, ano, periodicidade, periodo)
 except Exception as e:
     st.error(f"Erro ao baixar o CSV: {str(e)[:200]}")
     st.info(f"URL do CSV: {csv_url}")
     st.stop()
 
+for aviso in resultado.avisos:
+    st.warning(aviso)
+if resultado.erro:
+    st.error(resultado.erro)
+
+df_csv = resultado.df
+
 if df_csv.empty or df_csv.shape[0] == 0 or df_csv.shape[1] == 0:
     st.warning("O ranking para este período ainda não possui dados ou o formato do arquivo é incompatível.")
     st.info(f"Tente selecionar um período diferente. URL do CSV: {csv_url}")
     st.stop()
 
-# ================= LIMPAR DADOS =================
-df_csv = limpar_dados_csv(df_csv)
-
-if df_csv.empty:
-    st.warning("Não foi possível processar os dados do CSV.")
-    st.stop()
-
 # Mostrar colunas disponíveis na sidebar para debug
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Colunas disponíveis no CSV:**")
 for col in df_csv.columns:
     st.sidebar.text(f"- {col}")
 
-# Identificar qual coluna contém o nome da instituição
-coluna_instituicao = None
-possiveis_colunas = ['Instituição', 'Instituição financeira', 'Administradora de consórcio', 
-                     'Instituição Financeira', 'Administradora de Consórcio']
-
-for col in possiveis_colunas:
-    if col in df_csv.columns:
-        coluna_instituicao = col
-        break
-
-# Se não encontrou, usar a primeira coluna que parece ser de instituição
-if not coluna_instituicao:
-    for col in df_csv.columns:
-        if any(termo in str(col).lower() for termo in ['instituição', 'administradora', 'banco', 'financeira', 'nome']):
-            coluna_instituicao = col
-            break
-    else:
-        # Usar a primeira coluna como fallback
-        coluna_instituicao = df_csv.columns[0]
+# ================= DADOS DERIVADOS DO PERÍODO =================
+chave_selecionada = (tipo, ano, periodicidade, periodo)
+derivados = derivados_periodo(chave_selecionada, resultado)
+coluna_instituicao = derivados["coluna_instituicao"]
+colunas_encontradas = derivados["colunas_reclamacoes"]
+instituicoes = derivados["instituicoes"]
 
-# ================= CONVERTER ÍNDICE PARA NÚMERO (PARA ORDENAÇÃO) =================
-if 'Índice' in df_csv.columns:
-    # Criar cópia para exibição com formatação brasileira
-    df_csv_display = df_csv.copy()
-    
-    # Converter para numérico para ordenação
-    def converter_para_numerico(valor):
-        if pd.isna(valor) or str(valor).strip() in ['', 'nan', 'None', 'NaN']:
-            return 0
-        try:
-            valor_str = str(valor).strip()
-            # Remover caracteres não numéricos exceto ponto, vírgula e hífen
-            valor_limpo = ''.join(c for c in valor_str if c.isdigit() or c in '.,-')
-            
-            if ',' in valor_limpo and '.' in valor_limpo:
-                # Tem ambos, decidir qual é o separador decimal
-                if valor_limpo.rfind('.') > valor_limpo.rfind(','):
-                    # Ponto é decimal
-                    return float(valor_limpo.replace(',', ''))
-                else:
-                    # Vírgula é decimal
-                    return float(valor_limpo.replace('.', '').replace(',', '.'))
-            elif ',' in valor_limpo:
-                # Apenas vírgula, assumir que é decimal
-                return float(valor_limpo.replace('.', '').replace(',', '.'))
-            elif '.' in valor_limpo:
-                # Apenas ponto
-                if valor_limpo.count('.') > 1:
-                    # Múltiplos pontos, provavelmente separador de milhar
-                    return float(valor_limpo.replace('.', ''))
-                else:
-                    # Apenas um ponto, pode ser decimal
-                    return float(valor_limpo)
-            else:
-                return float(valor_limpo)
-        except:
-            return 0
-    
-    df_csv['Índice_num'] = df_csv['Índice'].apply(converter_para_numerico)
-    
-    # Manter a formatação original para exibição
-    df_csv_display['Índice_formatado'] = df_csv['Índice'].apply(formatar_numero_brasileiro)
-else:
-    df_csv_display = df_csv.copy()
+# Mostrar quais colunas foram encontradas
+st.sidebar.markdown("**Colunas de reclamações identificadas:**")
+for tipo_nome, coluna in colunas_encontradas.items():
+    st.sidebar.text(f"- {tipo_nome}: {coluna}")
 
 # ================= HEADER =================
 st.header("📊 BACEN: Análise de Reclamações")
 
 # Listar empresas disponíveis
-empresas_disponiveis = sorted(df_csv[coluna_instituicao].dropna().unique())
+empresas_disponiveis = instituicoes.nomes
 
 if not empresas_disponiveis:
     st.warning("Nenhuma empresa encontrada nos dados.")
     st.stop()
 
-empresa = st.selectbox(
-    "Selecione a Empresa:",
-    empresas_disponiveis
-)
-
-# Encontrar dados da empresa
-try:
-    if 'Índice_num' in df_csv.columns:
-        empresa_data = df_csv[df_csv[coluna_instituicao] == empresa]
-        if not empresa_data.empty:
-            idx = empresa_data.index[0]
-            dados_empresa = df_csv_display.iloc[idx]
-            dados_empresa_raw = df_csv.iloc[idx]  # Dados brutos para conversão
-        else:
-            st.warning(f"Empresa {empresa} não encontrada nos dados.")
-            st.stop()
-    else:
-        dados_empresa = df_csv[df_csv[coluna_instituicao] == empresa].iloc[0]
-        dados_empresa_raw = df_csv[df_csv[coluna_instituicao] == empresa].iloc[0]
-except Exception as e:
-    st.error(f"Erro ao buscar dados da empresa: {str(e)}")
-    st.stop()
-
-# ================= EXIBIR DADOS DA EMPRESA =================
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    if 'Índice_formatado' in dados_empresa:
-        valor_indice = dados_empresa['Índice_formatado']
-    elif 'Índice' in dados_empresa:
-        valor_indice = formatar_numero_brasileiro(dados_empresa['Índice'])
-    else:
-        valor_indice = "N/A"
-    
-    st.metric("Índice", valor_indice)
-
-# Função para extrair valores numéricos das colunas
-def extrair_valor_numerico(valor, default=0):
-    if pd.isna(valor) or str(valor).strip() in ['', 'nan', 'None', 'NaN']:
-        return default
-    try:
-        valor_str = str(valor).strip()
-        # Remover pontos (separadores de milhar) e converter vírgula para ponto decimal
-        valor_limpo = valor_str.replace('.', '').replace(',', '.')
-        return float(valor_limpo)
-    except:
-        try:
-            # Tentar converter diretamente
-            return float(valor_str)
-        except:
-            return default
-
-# ================= IDENTIFICAR COLUNAS DE RECLAMAÇÕES =================
-
-# Lista de padrões para buscar colunas de reclamações
-padroes_reclamacoes = {
-    'Reguladas Procedentes': ['procedente', 'regulada.*procedente', 'reclamações.*procedente'],
-    'Reguladas Outras': ['regulada.*outra', 'outra.*regulada', 'reclamações.*outra'],
-    'Não Reguladas': ['não.*regulada', 'nao.*regulada', 'não regulada', 'nao regulada', 'reclamações.*não.*regulada'],
-    'Total Reclamações': ['total.*reclamação', 'reclamações.*total', 'quantidade.*total']
-}
-
-# Buscar colunas correspondentes aos padrões
-colunas_encontradas = {}
-
-for tipo_nome, padroes in padroes_reclamacoes.items():
-    for col in df_csv.columns:
-        col_lower = str(col).lower()
-        for padrao in padroes:
-            if padrao in col_lower:
-                colunas_encontradas[tipo_nome] = col
-                break
-        if tipo_nome in colunas_encontradas:
-            break
-
-# Se não encontrou pelo padrão, tentar nomes exatos
-nomes_exatos = {
-    'Reguladas Procedentes': 'Quantidade de reclamações reguladas procedentes',
-    'Reguladas Outras': 'Quantidade de reclamações reguladas - outras',
-    'Não Reguladas': 'Quantidade de reclamações não reguladas',
-    'Total Reclamações': 'Quantidade total de reclamações'
-}
-
-for tipo_nome, nome_exato in nomes_exatos.items():
-    if tipo_nome not in colunas_encontradas and nome_exato in df_csv.columns:
-        colunas_encontradas[tipo_nome] = nome_exato
-
-# Mostrar quais colunas foram encontradas
-st.sidebar.markdown("**Colunas de reclamações identificadas:**")
-for tipo, coluna in colunas_encontradas.items():
-    st.sidebar.text(f"- {tipo}: {coluna}")
-
-# Buscar valores para cada tipo de reclamação
-valores_reclamacoes = {}
-
-for tipo_nome, coluna_nome in colunas_encontradas.items():
-    if coluna_nome in dados_empresa:
-        valor = extrair_valor_numerico(dados_empresa[coluna_nome])
-        valores_reclamacoes[tipo_nome] = valor
-    else:
-        valores_reclamacoes[tipo_nome] = 0
+# Ao trocar de período, manter a empresa escolhida, mesmo que tenha mudado de nome (mesmo CNPJ)
+empresa_anterior = st.session_state.get("empresa")
+if empresa_anterior not in instituicoes.posicoes:
+    empresa_anterior = instituicoes.nome_por_cnpj(st.session_state.get("cnpj_empresa"))
+if empresa_anterior is None:
+    st.session_state.pop("empresa", None)
+else:
+    st.session_state["empresa"] = empresa_anterior
+
+
+@fragmento
+def secao_busca():
+    # Digitar na busca reexecuta só este bloco
+    with st.expander("🔎 Buscar instituição em todos os períodos carregados"):
+        consulta = st.text_input("Nome (sem precisar de acentos):", key="busca_instituicao")
+        if consulta:
+            ocorrencias = buscar_instituicoes(consulta)
+            if ocorrencias:
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            'Instituição': ocorrencia.nome,
+                            'Outros nomes (mesmo CNPJ)': ", ".join(ocorrencia.outros_nomes),
+                            'Períodos': ", ".join(dict.fromkeys(f"{a}/{p}" for _, a, _, p in ocorrencia.periodos)),
+                        }
+                        for ocorrencia in ocorrencias
+                    ]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.info("Nenhuma instituição encontrada.")
 
-# Exibir métricas
-with col2:
-    valor_rp = int(valores_reclamacoes.get('Reguladas Procedentes', 0))
-    st.metric("Reguladas Procedentes", f"{valor_rp:,}".replace(",", "."))
 
-with col3:
-    valor_nr = int(valores_reclamacoes.get('Não Reguladas', 0))
-    st.metric("Não Reguladas", f"{valor_nr:,}".replace(",", "."))
+secao_busca()
 
-# # ================= GRÁFICO DE RECLAMAÇÕES =================
-# st.markdown("## 📈 Distribuição de Reclamações")
 
-# # Preparar dados para o gráfico
-# dados_grafico = []
+# ================= EMPRESA SELECIONADA =================
+@fragmento
+def secao_empresa():
+    """
+    Seletor de empresa, métricas, gráfico e detalhes: trocar a empresa
+    reexecuta só esta seção (o ranking e a sidebar ficam como estão)
+    """
+    inicio_fragmento = time.perf_counter()
+
+    # O período é buscado no cache a cada execução (um acerto é só uma consulta
+    # ao dicionário): o fragmento não segura o DataFrame de uma execução anterior
+    dados.selecionar_periodo(*chave_selecionada)
+    resultado_periodo = carregar_periodo(*chave_selecionada)
+    df_periodo = resultado_periodo.df
+    indice_periodo = derivados_periodo(chave_selecionada, resultado_periodo)["instituicoes"]
+
+    empresa = st.selectbox(
+        "Selecione a Empresa:",
+        empresas_disponiveis,
+        key="empresa"
+    )
+    st.session_state["cnpj_empresa"] = indice_periodo.cnpj(empresa)
 
-# tipos_grafico = ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas']
-# for tipo_grafico in tipos_grafico:
-#     valor = valores_reclamacoes.get(tipo_grafico, 0)
-#     # Mostrar no gráfico mesmo se for 0, para visualização completa
-#     dados_grafico.append({
-#         'Tipo de Reclamação': tipo_grafico,
-#         'Quantidade': valor
-#     })
+    # Encontrar dados da empresa (posição da linha vinda do índice, sem varrer a coluna)
+    dados_empresa = df_periodo.iloc[indice_periodo.posicao(empresa)]
 
-# # Verificar se há dados para mostrar
-# total_reclamacoes = sum(valores_reclamacoes.values())
+    # ================= EXIBIR DADOS DA EMPRESA =================
+    col1, col2, col3 = st.columns(3)
 
-# if total_reclamacoes > 0:
-#     df_grafico = pd.DataFrame(dados_grafico)
-    
-#     # Criar gráfico
-#     grafico = alt.Chart(df_grafico).mark_bar().encode(
-#         x=alt.X('Tipo de Reclamação:N', title='Tipo de Reclamação', sort=None),
-#         y=alt.Y('Quantidade:Q', title='Quantidade'),
-#         color=alt.Color('Tipo de Reclamação:N', 
-#                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
-#                        legend=alt.Legend(title="Tipo")),
-#         tooltip=['Tipo de Reclamação', alt.Tooltip('Quantidade:Q', title='Quantidade', format=',.0f')]
-#     ).properties(
-#         title=f'Distribuição de Reclamações - {empresa}',
-#         height=400
-#     )
-    
-#     # Adicionar valores no topo das barras
-#     texto = grafico.mark_text(
-#         align='center',
-#         baseline='bottom',
-#         dy=-5,
-#         fontSize=12,
-#         fontWeight='bold',
-#         color='white'
-#     ).encode(
-#         text=alt.Text('Quantidade:Q', format=',.0f')
-#     )
-    
-#     st.altair_chart(grafico + texto, use_container_width=True)
-# else:
-#     # Mostrar gráfico mesmo com zeros, mas com mensagem
-#     df_grafico = pd.DataFrame(dados_grafico)
-    
-#     grafico = alt.Chart(df_grafico).mark_bar().encode(
-#         x=alt.X('Tipo de Reclamação:N', title='Tipo de Reclamação', sort=None),
-#         y=alt.Y('Quantidade:Q', title='Quantidade'),
-#         color=alt.Color('Tipo de Reclamação:N', 
-#                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
-#                        legend=alt.Legend(title="Tipo"))
-#     ).properties(
-#         title=f'Distribuição de Reclamações - {empresa} (Sem reclamações registradas)',
-#         height=400
-#     )
+    with col1:
+        if 'Índice' in dados_empresa:
+            valor_indice = formatar_numero_brasileiro(dados_empresa['Índice'])
+        else:
+            valor_indice = "N/A"
     
-#     st.altair_chart(grafico, use_container_width=True)
-#     st.info(f"A empresa {empresa} não possui reclamações registradas no período selecionado.")
-
-# ... (código anterior permanece igual até a parte do gráfico) ...
+        st.metric("Índice", valor_indice)
 
-# # ================= GRÁFICO DE RECLAMAÇÕES =================
-# st.markdown("## 📈 Distribuição de Reclamações")
+    # Buscar valores para cada tipo de reclamação
+    valores_reclamacoes = {}
 
-# # Preparar dados para o gráfico
-# dados_grafico = []
-
-# tipos_grafico = ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas']
-# for tipo_grafico in tipos_grafico:
-#     valor = valores_reclamacoes.get(tipo_grafico, 0)
-#     # Mostrar no gráfico mesmo se for 0, para visualização completa
-#     dados_grafico.append({
-#         'Tipo de Reclamação': tipo_grafico,
-#         'Quantidade': valor
-#     })
-
-# # Verificar se há dados para mostrar
-# total_reclamacoes = sum(valores_reclamacoes.values())
-
-# if total_reclamacoes > 0:
-#     df_grafico = pd.DataFrame(dados_grafico)
-    
-#     # Criar gráfico com configurações para não cortar
-#     grafico = alt.Chart(df_grafico).mark_bar(
-#         size=60  # Aumentar a largura das barras
-#     ).encode(
-#         x=alt.X('Tipo de Reclamação:N', 
-#                title='Tipo de Reclamação', 
-#                sort=None,
-#                axis=alt.Axis(labelAngle=0)),  # Manter labels horizontais
-#         y=alt.Y('Quantidade:Q', 
-#                title='Quantidade',
-#                scale=alt.Scale(padding=0.2)),  # Adicionar padding no eixo Y
-#         color=alt.Color('Tipo de Reclamação:N', 
-#                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
-#                        legend=alt.Legend(title="Tipo de Reclamação")),
-#         tooltip=['Tipo de Reclamação', alt.Tooltip('Quantidade:Q', title='Quantidade', format=',.0f')]
-#     ).properties(
-#         title=f'Distribuição de Reclamações - {empresa}',
-#         height=450,  # Aumentar altura
-#         width=600    # Definir largura fixa para melhor controle
-#     )
-    
-#     # Adicionar valores no topo das barras com configuração melhorada
-#     texto = grafico.mark_text(
-#         align='center',
-#         baseline='middle',  # Mudar para middle para melhor posicionamento
-#         dy=-25,  # Ajustar posição vertical (negativo = acima da barra)
-#         fontSize=14,
-#         fontWeight='bold',
-#         color='white'
-#     ).encode(
-#         text=alt.Text('Quantidade:Q', format=',.0f')
-#     )
-    
-#     # Combinar gráfico e texto
-#     chart = (grafico + texto).configure_view(
-#         strokeWidth=0  # Remover borda do gráfico
-#     ).configure_axis(
-#         labelFontSize=12,
-#         titleFontSize=14
-#     ).configure_title(
-#         fontSize=16,
-#         anchor='start'  # Alinhar título à esquerda
-#     )
-    
-#     st.altair_chart(chart, use_container_width=True)
-    
-# else:
-#     # Mostrar gráfico mesmo com zeros, mas com mensagem
-#     df_grafico = pd.DataFrame(dados_grafico)
-    
-#     grafico = alt.Chart(df_grafico).mark_bar(
-#         size=60
-#     ).encode(
-#         x=alt.X('Tipo de Reclamação:N', 
-#                title='Tipo de Reclamação', 
-#                sort=None,
-#                axis=alt.Axis(labelAngle=0)),
-#         y=alt.Y('Quantidade:Q', 
-#                title='Quantidade',
-#                scale=alt.Scale(domain=[0, 1])),  # Domínio fixo para zeros
-#         color=alt.Color('Tipo de Reclamação:N', 
-#                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
-#                        legend=alt.Legend(title="Tipo de Reclamação"))
-#     ).properties(
-#         title=f'Distribuição de Reclamações - {empresa} (Sem reclamações registradas)',
-#         height=450,
-#         width=600
-#     ).configure_view(
-#         strokeWidth=0
-#     ).configure_axis(
-#         labelFontSize=12,
-#         titleFontSize=14
-#     ).configure_title(
-#         fontSize=16,
-#         anchor='start'
-#     )
-    
-#     st.altair_chart(grafico, use_container_width=True)
-#     st.info(f"A empresa {empresa} não possui reclamações registradas no período selecionado.")
-
-# ... (código anterior permanece igual até a parte do gráfico) ...
-
-# ================= GRÁFICO DE RECLAMAÇÕES =================
-st.markdown("## 📈 Distribuição de Reclamações")
-
-# Preparar dados para o gráfico
-dados_grafico = []
-
-# Usar nomes mais curtos para o gráfico mas manter os completos na legenda
-nomes_grafico = {
-    'Reguladas Procedentes': 'Reguladas Procedentes',
-    'Reguladas Outras': 'Reguladas Outras', 
-    'Não Reguladas': 'Não Reguladas'
-}
-
-tipos_grafico = ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas']
-for tipo_grafico in tipos_grafico:
-    valor = valores_reclamacoes.get(tipo_grafico, 0)
-    # Mostrar no gráfico mesmo se for 0, para visualização completa
-    dados_grafico.append({
-        'Tipo de Reclamação': nomes_grafico[tipo_grafico],
-        'Quantidade': valor
-    })
-
-# Verificar se há dados para mostrar
-total_reclamacoes = sum(valores_reclamacoes.values())
+    for tipo_nome, coluna_nome in colunas_encontradas.items():
+        if coluna_nome in dados_empresa:
+            valores_reclamacoes[tipo_nome] = converter_numero(dados_empresa[coluna_nome])
+        else:
+            valores_reclamacoes[tipo_nome] = 0
+
+    # Exibir métricas
+    with col2:
+        valor_rp = int(valores_reclamacoes.get('Reguladas Procedentes', 0))
+        st.metric("Reguladas Procedentes", f"{valor_rp:,}".replace(",", "."))
+
+    with col3:
+        valor_nr = int(valores_reclamacoes.get('Não Reguladas', 0))
+        st.metric("Não Reguladas", f"{valor_nr:,}".replace(",", "."))
+
+    # # ================= GRÁFICO DE RECLAMAÇÕES =================
+    # st.markdown("## 📈 Distribuição de Reclamações")
+
+    # # Preparar dados para o gráfico
+    # dados_grafico = []
+
+    # tipos_grafico = ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas']
+    # for tipo_grafico in tipos_grafico:
+    #     valor = valores_reclamacoes.get(tipo_grafico, 0)
+    #     # Mostrar no gráfico mesmo se for 0, para visualização completa
+    #     dados_grafico.append({
+    #         'Tipo de Reclamação': tipo_grafico,
+    #         'Quantidade': valor
+    #     })
+
+    # # Verificar se há dados para mostrar
+    # total_reclamacoes = sum(valores_reclamacoes.values())
+
+    # if total_reclamacoes > 0:
+    #     df_grafico = pd.DataFrame(dados_grafico)
+    
+    #     # Criar gráfico
+    #     grafico = alt.Chart(df_grafico).mark_bar().encode(
+    #         x=alt.X('Tipo de Reclamação:N', title='Tipo de Reclamação', sort=None),
+    #         y=alt.Y('Quantidade:Q', title='Quantidade'),
+    #         color=alt.Color('Tipo de Reclamação:N', 
+    #                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
+    #                        legend=alt.Legend(title="Tipo")),
+    #         tooltip=['Tipo de Reclamação', alt.Tooltip('Quantidade:Q', title='Quantidade', format=',.0f')]
+    #     ).properties(
+    #         title=f'Distribuição de Reclamações - {empresa}',
+    #         height=400
+    #     )
+    
+    #     # Adicionar valores no topo das barras
+    #     texto = grafico.mark_text(
+    #         align='center',
+    #         baseline='bottom',
+    #         dy=-5,
+    #         fontSize=12,
+    #         fontWeight='bold',
+    #         color='white'
+    #     ).encode(
+    #         text=alt.Text('Quantidade:Q', format=',.0f')
+    #     )
+    
+    #     st.altair_chart(grafico + texto, use_container_width=True)
+    # else:
+    #     # Mostrar gráfico mesmo com zeros, mas com mensagem
+    #     df_grafico = pd.DataFrame(dados_grafico)
+    
+    #     grafico = alt.Chart(df_grafico).mark_bar().encode(
+    #         x=alt.X('Tipo de Reclamação:N', title='Tipo de Reclamação', sort=None),
+    #         y=alt.Y('Quantidade:Q', title='Quantidade'),
+    #         color=alt.Color('Tipo de Reclamação:N', 
+    #                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
+    #                        legend=alt.Legend(title="Tipo"))
+    #     ).properties(
+    #         title=f'Distribuição de Reclamações - {empresa} (Sem reclamações registradas)',
+    #         height=400
+    #     )
+    
+    #     st.altair_chart(grafico, use_container_width=True)
+    #     st.info(f"A empresa {empresa} não possui reclamações registradas no período selecionado.")
+
+    # ... (código anterior permanece igual até a parte do gráfico) ...
+
+    # # ================= GRÁFICO DE RECLAMAÇÕES =================
+    # st.markdown("## 📈 Distribuição de Reclamações")
+
+    # # Preparar dados para o gráfico
+    # dados_grafico = []
+
+    # tipos_grafico = ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas']
+    # for tipo_grafico in tipos_grafico:
+    #     valor = valores_reclamacoes.get(tipo_grafico, 0)
+    #     # Mostrar no gráfico mesmo se for 0, para visualização completa
+    #     dados_grafico.append({
+    #         'Tipo de Reclamação': tipo_grafico,
+    #         'Quantidade': valor
+    #     })
+
+    # # Verificar se há dados para mostrar
+    # total_reclamacoes = sum(valores_reclamacoes.values())
+
+    # if total_reclamacoes > 0:
+    #     df_grafico = pd.DataFrame(dados_grafico)
+    
+    #     # Criar gráfico com configurações para não cortar
+    #     grafico = alt.Chart(df_grafico).mark_bar(
+    #         size=60  # Aumentar a largura das barras
+    #     ).encode(
+    #         x=alt.X('Tipo de Reclamação:N', 
+    #                title='Tipo de Reclamação', 
+    #                sort=None,
+    #                axis=alt.Axis(labelAngle=0)),  # Manter labels horizontais
+    #         y=alt.Y('Quantidade:Q', 
+    #                title='Quantidade',
+    #                scale=alt.Scale(padding=0.2)),  # Adicionar padding no eixo Y
+    #         color=alt.Color('Tipo de Reclamação:N', 
+    #                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
+    #                        legend=alt.Legend(title="Tipo de Reclamação")),
+    #         tooltip=['Tipo de Reclamação', alt.Tooltip('Quantidade:Q', title='Quantidade', format=',.0f')]
+    #     ).properties(
+    #         title=f'Distribuição de Reclamações - {empresa}',
+    #         height=450,  # Aumentar altura
+    #         width=600    # Definir largura fixa para melhor controle
+    #     )
+    
+    #     # Adicionar valores no topo das barras com configuração melhorada
+    #     texto = grafico.mark_text(
+    #         align='center',
+    #         baseline='middle',  # Mudar para middle para melhor posicionamento
+    #         dy=-25,  # Ajustar posição vertical (negativo = acima da barra)
+    #         fontSize=14,
+    #         fontWeight='bold',
+    #         color='white'
+    #     ).encode(
+    #         text=alt.Text('Quantidade:Q', format=',.0f')
+    #     )
+    
+    #     # Combinar gráfico e texto
+    #     chart = (grafico + texto).configure_view(
+    #         strokeWidth=0  # Remover borda do gráfico
+    #     ).configure_axis(
+    #         labelFontSize=12,
+    #         titleFontSize=14
+    #     ).configure_title(
+    #         fontSize=16,
+    #         anchor='start'  # Alinhar título à esquerda
+    #     )
+    
+    #     st.altair_chart(chart, use_container_width=True)
+    
+    # else:
+    #     # Mostrar gráfico mesmo com zeros, mas com mensagem
+    #     df_grafico = pd.DataFrame(dados_grafico)
+    
+    #     grafico = alt.Chart(df_grafico).mark_bar(
+    #         size=60
+    #     ).encode(
+    #         x=alt.X('Tipo de Reclamação:N', 
+    #                title='Tipo de Reclamação', 
+    #                sort=None,
+    #                axis=alt.Axis(labelAngle=0)),
+    #         y=alt.Y('Quantidade:Q', 
+    #                title='Quantidade',
+    #                scale=alt.Scale(domain=[0, 1])),  # Domínio fixo para zeros
+    #         color=alt.Color('Tipo de Reclamação:N', 
+    #                        scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
+    #                        legend=alt.Legend(title="Tipo de Reclamação"))
+    #     ).properties(
+    #         title=f'Distribuição de Reclamações - {empresa} (Sem reclamações registradas)',
+    #         height=450,
+    #         width=600
+    #     ).configure_view(
+    #         strokeWidth=0
+    #     ).configure_axis(
+    #         labelFontSize=12,
+    #         titleFontSize=14
+    #     ).configure_title(
+    #         fontSize=16,
+    #         anchor='start'
+    #     )
+    
+    #     st.altair_chart(grafico, use_container_width=True)
+    #     st.info(f"A empresa {empresa} não possui reclamações registradas no período selecionado.")
+
+    # ... (código anterior permanece igual até a parte do gráfico) ...
+
+    # ================= GRÁFICO DE RECLAMAÇÕES =================
+    st.markdown("## 📈 Distribuição de Reclamações")
+
+    # Preparar dados para o gráfico
+    dados_grafico = []
+
+    # Usar nomes mais curtos para o gráfico mas manter os completos na legenda
+    nomes_grafico = {
+        'Reguladas Procedentes': 'Reguladas Procedentes',
+        'Reguladas Outras': 'Reguladas Outras', 
+        'Não Reguladas': 'Não Reguladas'
+    }
 
-if total_reclamacoes > 0:
-    df_grafico = pd.DataFrame(dados_grafico)
-    
-    # Ordenar do maior para o menor para melhor visualização
-    df_grafico = df_grafico.sort_values('Quantidade', ascending=True)
-    
-    # OPÇÃO 1: Gráfico de barras horizontais (melhor para textos longos)
-    grafico = alt.Chart(df_grafico).mark_bar(
-        size=35,  # Altura das barras horizontais
-        cornerRadius=3  # Cantos arredondados
-    ).encode(
-        y=alt.Y('Tipo de Reclamação:N', 
-               title=None,  # Remover título do eixo Y
-               sort=None,
-               axis=alt.Axis(labelLimit=200,  # Aumentar limite do label
-                           labelFontSize=13,
-                           labelPadding=10)),  # Espaço entre label e eixo
-        x=alt.X('Quantidade:Q', 
-               title='Quantidade de Reclamações',
-               axis=alt.Axis(grid=True)),
-        color=alt.Color('Tipo de Reclamação:N',
-                       scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
-                       legend=None),  # Remover legenda separada
-        tooltip=['Tipo de Reclamação', 
-                alt.Tooltip('Quantidade:Q', title='Quantidade', format=',.0f')]
-    ).properties(
-        title=f'Distribuição de Reclamações - {empresa[:50]}...' if len(empresa) > 50 else f'Distribuição de Reclamações - {empresa}',
-        height=300,  # Altura fixa para 3 barras
-        width=700    # Largura adequada
-    )
-    
-    # Adicionar valores no final das barras
-    texto = alt.Chart(df_grafico).mark_text(
-        align='left',
-        baseline='middle',
-        dx=5,  # Deslocamento horizontal (dentro da barra)
-        fontSize=13,
-        fontWeight='bold',
-        color='white'
-    ).encode(
-        y=alt.Y('Tipo de Reclamação:N', sort=None),
-        x=alt.X('Quantidade:Q'),
-        text=alt.Text('Quantidade:Q', format=',.0f')
-    )
+    tipos_grafico = ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas']
+    for tipo_grafico in tipos_grafico:
+        valor = valores_reclamacoes.get(tipo_grafico, 0)
+        # Mostrar no gráfico mesmo se for 0, para visualização completa
+        dados_grafico.append({
+            'Tipo de Reclamação': nomes_grafico[tipo_grafico],
+            'Quantidade': valor
+        })
+
+    # Verificar se há dados para mostrar
+    total_reclamacoes = sum(valores_reclamacoes.values())
+
+    if total_reclamacoes > 0:
+        df_grafico = pd.DataFrame(dados_grafico)
+    
+        # Ordenar do maior para o menor para melhor visualização
+        df_grafico = df_grafico.sort_values('Quantidade', ascending=True)
+    
+        # OPÇÃO 1: Gráfico de barras horizontais (melhor para textos longos)
+        grafico = alt.Chart(df_grafico).mark_bar(
+            size=35,  # Altura das barras horizontais
+            cornerRadius=3  # Cantos arredondados
+        ).encode(
+            y=alt.Y('Tipo de Reclamação:N', 
+                   title=None,  # Remover título do eixo Y
+                   sort=None,
+                   axis=alt.Axis(labelLimit=200,  # Aumentar limite do label
+                               labelFontSize=13,
+                               labelPadding=10)),  # Espaço entre label e eixo
+            x=alt.X('Quantidade:Q', 
+                   title='Quantidade de Reclamações',
+                   axis=alt.Axis(grid=True)),
+            color=alt.Color('Tipo de Reclamação:N',
+                           scale=alt.Scale(range=['#00aca8', '#1d2262', '#d4096a']),
+                           legend=None),  # Remover legenda separada
+            tooltip=['Tipo de Reclamação', 
+                    alt.Tooltip('Quantidade:Q', title='Quantidade', format=',.0f')]
+        ).properties(
+            title=f'Distribuição de Reclamações - {empresa[:50]}...' if len(empresa) > 50 else f'Distribuição de Reclamações - {empresa}',
+            height=300,  # Altura fixa para 3 barras
+            width=700    # Largura adequada
+        )
     
-    # Combinar gráfico e texto
-    chart = (grafico + texto).configure_view(
-        strokeWidth=0
-    ).configure_axis(
-        labelFontSize=12,
-        titleFontSize=14
-    ).configure_title(
-        fontSize=16,
-        anchor='start',
-        offset=20
-    )
+        # Adicionar valores no final das barras
+        texto = alt.Chart(df_grafico).mark_text(
+            align='left',
+            baseline='middle',
+            dx=5,  # Deslocamento horizontal (dentro da barra)
+            fontSize=13,
+            fontWeight='bold',
+            color='white'
+        ).encode(
+            y=alt.Y('Tipo de Reclamação:N', sort=None),
+            x=alt.X('Quantidade:Q'),
+            text=alt.Text('Quantidade:Q', format=',.0f')
+        )
     
-    # Usar container para melhor controle
-    with st.container():
-        col1, col2, col3 = st.columns([1, 6, 1])
-        with col2:
-            st.altair_chart(chart, use_container_width=True)
+        # Combinar gráfico e texto
+        chart = (grafico + texto).configure_view(
+            strokeWidth=0
+        ).configure_axis(
+            labelFontSize=12,
+            titleFontSize=14
+        ).configure_title(
+            fontSize=16,
+            anchor='start',
+            offset=20
+        )
     
-    # Adicionar legenda abaixo do gráfico
-    st.markdown("""
-    <div style="display: flex; justify-content: center; gap: 30px; margin-top: 10px;">
-        <div style="display: flex; align-items: center;">
-            <div style="width: 20px; height: 20px; background-color: #00aca8; margin-right: 8px; border-radius: 3px;"></div>
-            <span>Reguladas Procedentes</span>
-        </div>
-        <div style="display: flex; align-items: center;">
-            <div style="width: 20px; height: 20px; background-color: #1d2262; margin-right: 8px; border-radius: 3px;"></div>
-            <span>Reguladas Outras</span>
-        </div>
-        <div style="display: flex; align-items: center;">
-            <div style="width: 20px; height: 20px; background-color: #d4096a; margin-right: 8px; border-radius: 3px;"></div>
-            <span>Não Reguladas</span>
+        # Usar container para melhor controle
+        with st.container():
+            col1, col2, col3 = st.columns([1, 6, 1])
+            with col2:
+                with medir("grafico"):
+                    st.altair_chart(chart, use_container_width=True)
+    
+        # Adicionar legenda abaixo do gráfico
+        st.markdown("""
+        <div style="display: flex; justify-content: center; gap: 30px; margin-top: 10px;">
+            <div style="display: flex; align-items: center;">
+                <div style="width: 20px; height: 20px; background-color: #00aca8; margin-right: 8px; border-radius: 3px;"></div>
+                <span>Reguladas Procedentes</span>
+            </div>
+            <div style="display: flex; align-items: center;">
+                <div style="width: 20px; height: 20px; background-color: #1d2262; margin-right: 8px; border-radius: 3px;"></div>
+                <span>Reguladas Outras</span>
+            </div>
+            <div style="display: flex; align-items: center;">
+                <div style="width: 20px; height: 20px; background-color: #d4096a; margin-right: 8px; border-radius: 3px;"></div>
+                <span>Não Reguladas</span>
+            </div>
         </div>
-    </div>
-    """, unsafe_allow_html=True)
+        """, unsafe_allow_html=True)
     
-else:
-    # Para dados zerados, mostrar mensagem clara
-    st.info(f"### ⓘ {empresa}")
-    st.info("Esta empresa não possui reclamações registradas no período selecionado.")
-    
-    # Mostrar tabela simples com zeros para transparência
-    st.markdown("**Resumo de Reclamações:**")
-    resumo_data = {
-        'Tipo de Reclamação': ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas'],
-        'Quantidade': [0, 0, 0]
-    }
-    df_resumo = pd.DataFrame(resumo_data)
-    st.dataframe(df_resumo, hide_index=True, use_container_width=True)
+    else:
+        # Para dados zerados, mostrar mensagem clara
+        st.info(f"### ⓘ {empresa}")
+        st.info("Esta empresa não possui reclamações registradas no período selecionado.")
+    
+        # Mostrar tabela simples com zeros para transparência
+        st.markdown("**Resumo de Reclamações:**")
+        resumo_data = {
+            'Tipo de Reclamação': ['Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas'],
+            'Quantidade': [0, 0, 0]
+        }
+        df_resumo = pd.DataFrame(resumo_data)
+        st.dataframe(df_resumo, hide_index=True, use_container_width=True)
+
+    # ================= HISTÓRICO DA EMPRESA =================
+    # Lido da tabela de séries (períodos já carregados ou trazidos pelo backfill)
+    st.markdown("## 🕒 Histórico da Empresa")
+    with medir("historico"):
+        # Sem esperar a carga das partições: mostra o que já está em memória
+        historico = serie_instituicao(empresa, indice_periodo.cnpj(empresa), tipo, esperar=False)
+    if not series.carregada():
+        st.caption("⏳ Histórico ainda sendo carregado; os demais períodos aparecem nos próximos cliques.")
+
+    if len(historico) < 2:
+        st.info("Histórico disponível só para os períodos já consultados ou baixados com o backfill "
+                "(python -m bacen.backfill).")
+    else:
+        historico['Período'] = historico['ano'].astype(str) + " - " + historico['periodo'].astype(str)
+        grafico_historico = alt.Chart(historico).mark_line(point=True).encode(
+            x=alt.X('Período:N', title=None, sort=list(dict.fromkeys(ordenar_periodos(historico, ['ano', 'periodo'])['Período'])), axis=alt.Axis(labelAngle=-45)),
+            y=alt.Y('Índice:Q', title='Índice'),
+            color=alt.Color('periodicidade:N', title='Periodicidade'),
+            tooltip=[
+                'Período', 'periodicidade', 'instituicao',
+                alt.Tooltip('Índice:Q', format=',.2f'),
+                alt.Tooltip('Reguladas Procedentes:Q', format=',.0f'),
+                alt.Tooltip('Não Reguladas:Q', format=',.0f'),
+            ]
+        ).properties(height=300)
+        st.altair_chart(grafico_historico, use_container_width=True)
+
+    # ================= INFORMAÇÕES ADICIONAIS =================
+    with st.expander("ℹ️ Informações sobre os dados"):
+        st.markdown(f"""
+        ### Sobre os dados:
+        - **Índice**: Número de reclamações reguladas procedentes dividido pelo número de clientes e multiplicado por 1.000.000. 
+        - **Reguladas Procedentes**: Reclamações onde o cliente tinha razão
+        - **Reguladas Outras**: Reclamações reguladas mas não procedentes
+        - **Não Reguladas**: Reclamações fora do escopo de regulação do BACEN
+    
+        ### Fonte:
+        Dados obtidos diretamente do Banco Central do Brasil (BACEN)
+    
+        ### Período selecionado:
+        - **Tipo**: {tipo}
+        - **Ano**: {ano}
+        - **Periodicidade**: {periodicidade}
+        - **Período**: {periodo}
+    
+        ### Empresa selecionada:
+        - **Nome**: {empresa}
+        - **Índice**: {valor_indice}
+        - **Reguladas Procedentes**: {valor_rp:,}
+        - **Não Reguladas**: {valor_nr:,}
+        - **Total de reclamações**: {sum(valores_reclamacoes.values()):,}
+        """)
+
+    # Mostrar dados completos da empresa selecionada para debug
+    with st.expander("🔍 Ver dados completos da empresa selecionada"):
+        st.write(f"Dados completos para **{empresa}**:")
+    
+        # Criar uma tabela com todos os dados da empresa
+        dados_tabela = []
+        for col in df_periodo.columns:
+            if col in dados_empresa:
+                dados_tabela.append({
+                    'Coluna': col,
+                    'Valor': texto_celula(dados_empresa[col])
+                })
+    
+        df_debug = pd.DataFrame(dados_tabela)
+        st.dataframe(df_debug, use_container_width=True, hide_index=True)
+
+    observar("rerun_empresa", time.perf_counter() - inicio_fragmento)
+
+
+secao_empresa()
+
 
-# ... (restante do código permanece igual) ...
 # ================= RANKING - TABELA PRINCIPAL =================
 st.markdown("## 🏆 Ranking de Reclamações")
+inicio_ranking = time.perf_counter()
 
-# Garantir que temos a coluna de índice para ordenar
-if 'Índice_num' in df_csv.columns:
-    # Criar DataFrame para ranking
-    df_ranking = df_csv.copy()
-    
-    # Ordenar por índice numérico (decrescente)
-    df_ranking = df_ranking.sort_values("Índice_num", ascending=False).reset_index(drop=True)
-    
-    # Adicionar coluna de ranking
-    df_ranking.insert(0, "Rank", [f"{i+1}º" for i in df_ranking.index])
-    
-    # Formatar índice no padrão brasileiro
-    if 'Índice' in df_ranking.columns:
-        df_ranking["Índice"] = df_ranking["Índice"].apply(formatar_numero_brasileiro)
-    elif 'Índice_num' in df_ranking.columns:
-        df_ranking["Índice"] = df_ranking["Índice_num"].apply(formatar_numero_brasileiro)
-    
-    # Selecionar colunas para exibir - APENAS AS 3 COLUNAS SOLICITADAS
+# Top 30 calculado uma vez por período (seleção parcial) e guardado no Resultado em cache
+if 'Índice' in df_csv.columns:
     colunas_exibir = ["Rank", coluna_instituicao, "Índice"]
-    
-    # Manter apenas as colunas que existem
-    colunas_exibir = [col for col in colunas_exibir if col in df_ranking.columns]
-    
-    # Exibir apenas top 30
-    ranking_exibir = df_ranking[colunas_exibir].head(30).reset_index(drop=True)
+    ranking_exibir = resultado.ranking.topo(30)[colunas_exibir].copy()
+
+    # Posição como rótulo ("1º"), só para as linhas exibidas
+    ranking_exibir["Rank"] = ranking_exibir["Rank"].astype(str) + "º"
     
     # Estilizar a tabela SEM MOSTRAR O ÍNDICE DO DATAFRAME
     st.dataframe(
@@ -845,91 +776,98 @@ if 'Índice_num' in df_csv.columns:
     except Exception as e:
         st.warning(f"Não foi possível gerar o arquivo CSV para download: {str(e)[:100]}")
     
-elif 'Índice' in df_csv.columns:
-    # Se não tiver a coluna numérica, usar a original
-    df_ranking = df_csv.copy()
-    
-    # Tentar ordenar convertendo na hora
-    try:
-        df_ranking['Índice_num_temp'] = df_ranking['Índice'].apply(converter_para_numerico)
-        df_ranking = df_ranking.sort_values("Índice_num_temp", ascending=False).reset_index(drop=True)
-        df_ranking = df_ranking.drop(columns=['Índice_num_temp'], errors='ignore')
-    except:
-        # Se não conseguir ordenar numericamente, manter ordem original
-        pass
-    
-    # Adicionar coluna de ranking
-    df_ranking.insert(0, "Rank", [f"{i+1}º" for i in df_ranking.index])
-    
-    # Formatar os números
-    if 'Índice' in df_ranking.columns:
-        df_ranking["Índice"] = df_ranking["Índice"].apply(formatar_numero_brasileiro)
-    
-    # Selecionar colunas para exibir
-    colunas_exibir = ["Rank", coluna_instituicao, "Índice"]
-    colunas_exibir = [col for col in colunas_exibir if col in df_ranking.columns]
-    
-    # Exibir apenas top 30
-    ranking_exibir = df_ranking[colunas_exibir].head(30).reset_index(drop=True)
-    
-    # Estilizar a tabela SEM MOSTRAR O ÍNDICE
-    st.dataframe(
-        ranking_exibir,
-        use_container_width=True,
-        height=800,
-        hide_index=True,  # <--- ISSO OCULTA O ÍNDICE
-        column_config={
-            coluna_instituicao: st.column_config.Column(
-                "Instituição",
-                width="large"
-            ),
-            "Índice": st.column_config.TextColumn(
-                "Índice",
-                help="Número de reclamações reguladas procedentes dividido pelo número de clientes e multiplicado por 1.000.000"
-            )
-        }
-    )
 else:
     st.warning("Não foi possível gerar o ranking - coluna 'Índice' não encontrada.")
+observar("ranking_tabela", time.perf_counter() - inicio_ranking)
 
-# ================= INFORMAÇÕES ADICIONAIS =================
-with st.expander("ℹ️ Informações sobre os dados"):
-    st.markdown(f"""
-    ### Sobre os dados:
-    - **Índice**: Número de reclamações reguladas procedentes dividido pelo número de clientes e multiplicado por 1.000.000. 
-    - **Reguladas Procedentes**: Reclamações onde o cliente tinha razão
-    - **Reguladas Outras**: Reclamações reguladas mas não procedentes
-    - **Não Reguladas**: Reclamações fora do escopo de regulação do BACEN
-    
-    ### Fonte:
-    Dados obtidos diretamente do Banco Central do Brasil (BACEN)
-    
-    ### Período selecionado:
-    - **Tipo**: {tipo}
-    - **Ano**: {ano}
-    - **Periodicidade**: {periodicidade}
-    - **Período**: {periodo}
-    
-    ### Empresa selecionada:
-    - **Nome**: {empresa}
-    - **Índice**: {valor_indice}
-    - **Reguladas Procedentes**: {valor_rp:,}
-    - **Não Reguladas**: {valor_nr:,}
-    - **Total de reclamações**: {sum(valores_reclamacoes.values()):,}
-    """)
-
-# Mostrar dados completos da empresa selecionada para debug
-with st.expander("🔍 Ver dados completos da empresa selecionada"):
-    st.write(f"Dados completos para **{empresa}**:")
-    
-    # Criar uma tabela com todos os dados da empresa
-    dados_tabela = []
-    for col in df_csv.columns:
-        if col in dados_empresa:
-            dados_tabela.append({
-                'Coluna': col,
-                'Valor': dados_empresa[col]
-            })
-    
-    df_debug = pd.DataFrame(dados_tabela)
-    st.dataframe(df_debug, use_container_width=True, hide_index=True)
+
+# Daqui em diante o período não é mais usado: sem estas referências, o script
+# (cujas variáveis os fragmentos mantêm) não segura o DataFrame fora do cache
+del resultado, df_csv
+
+# ================= COMPARAÇÃO ENTRE PERÍODOS =================
+if periodo_comparado is not None:
+    st.markdown("## 🔀 Comparação entre Períodos")
+    st.caption(f"De {periodo_comparado[1]} - {periodo_comparado[3]} ({periodo_comparado[2]}) "
+               f"para {ano} - {periodo} ({periodicidade})")
+    try:
+        comparacao = obter_comparacao(periodo_comparado, (tipo, ano, periodicidade, periodo))
+    except Exception as e:
+        st.error(f"Erro ao comparar os períodos: {str(e)[:200]}")
+    else:
+        subiram = comparacao.subiram()
+        desceram = comparacao.desceram()
+        novas = comparacao.novas()
+        sairam = comparacao.sairam()
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Subiram", int((comparacao.tabela['variacao_posicao'] > 0).sum()))
+        col2.metric("Desceram", int((comparacao.tabela['variacao_posicao'] < 0).sum()))
+        col3.metric("Novas", len(novas))
+        col4.metric("Saíram", len(sairam))
+
+        aba_subiram, aba_desceram, aba_indice, aba_novas, aba_sairam = st.tabs(
+            ["⬆️ Subiram", "⬇️ Desceram", "📊 Variação do Índice", "🆕 Novas", "🚪 Saíram"]
+        )
+        with aba_subiram:
+            st.dataframe(tabela_comparacao(subiram), hide_index=True, use_container_width=True)
+        with aba_desceram:
+            st.dataframe(tabela_comparacao(desceram), hide_index=True, use_container_width=True)
+        with aba_indice:
+            st.dataframe(tabela_comparacao(comparacao.maiores_variacoes('Índice')), hide_index=True, use_container_width=True)
+        with aba_novas:
+            st.dataframe(tabela_comparacao(novas.head(50)), hide_index=True, use_container_width=True)
+        with aba_sairam:
+            st.dataframe(tabela_comparacao(sairam.head(50)), hide_index=True, use_container_width=True)
+
+# ================= TODOS OS PERÍODOS DO ANO =================
+if ver_periodos_ano:
+    st.markdown("## 📅 Todos os Períodos do Ano")
+    st.caption(f"{tipo} - {ano} ({periodicidade}): cada período aparece assim que fica pronto")
+
+    # Um espaço por período, na ordem do catálogo; os downloads correm juntos
+    # e cada espaço é preenchido na ordem em que os arquivos chegam
+    espacos = {}
+    for periodo_ano in periodos:
+        espacos[periodo_ano] = st.empty()
+        espacos[periodo_ano].info(f"⏳ {periodo_ano}: carregando...")
+
+    with medir("periodos_ano"):
+        chaves_ano = [(tipo, ano, periodicidade, periodo_ano) for periodo_ano in periodos]
+        for (_, _, _, periodo_ano), resultado_ano in iterar_periodos(chaves_ano):
+            with espacos[periodo_ano].container():
+                st.markdown(f"**{periodo_ano}**")
+                if resultado_ano.erro:
+                    st.error(resultado_ano.erro)
+                elif resultado_ano.vazio or not resultado_ano.ranking.disponivel:
+                    st.warning("Sem ranking para este período.")
+                else:
+                    st.dataframe(
+                        resultado_ano.ranking.topo(5).drop(columns=['Índice_valor']),
+                        hide_index=True,
+                        use_container_width=True
+                    )
+        resultado_ano = None
+
+# ================= MÉTRICAS =================
+observar("rerun", time.perf_counter() - inicio_rerun)
+
+if os.environ.get("BACEN_PAINEL_METRICAS"):
+    etapas, contadores = resumo()
+    with st.sidebar.expander("⏱️ Métricas de desempenho"):
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    'Etapa': etapa,
+                    'Execuções': dados_etapa['contagem'],
+                    'p50 (ms)': round(dados_etapa['p50'] * 1000, 1),
+                    'p95 (ms)': round(dados_etapa['p95'] * 1000, 1),
+                }
+                for etapa, dados_etapa in etapas.items()
+            ]),
+            hide_index=True,
+            use_container_width=True
+        )
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            detalhe = ", ".join(f"{k}={v}" for k, v in rotulos)
+            st.text(f"{nome}{{{detalhe}}}: {valor:,.0f}" if detalhe else f"{nome}: {valor:,.0f}")
@@ -0,0 +1,40 @@
+"""
+Motor de dados do Dashboard BACEN: catálogo, download, leitura, limpeza e
+identificação de colunas dos rankings de reclamações, sem dependência do
+Streamlit.
+
+Os nomes abaixo são importados sob demanda, então `import bacen` é barato e
+só carrega pandas/pyarrow/requests quando alguma função é usada:
+
+    from bacen import carregar_periodo, load_data
+"""
+import importlib
+
+_EXPORTACOES = {
+    'load_data': 'bacen.dados',
+    'construir_indice_catalogo': 'bacen.dados',
+    'gerar_link_csv': 'bacen.dados',
+    'baixar_csv': 'bacen.dados',
+    'limpar_dados_csv': 'bacen.dados',
+    'carregar_periodo': 'bacen.dados',
+    'converter_numeros': 'bacen.numeros',
+    'formatar_numeros': 'bacen.numeros',
+    'converter_numero': 'bacen.numeros',
+    'formatar_numero_brasileiro': 'bacen.numeros',
+    'identificar_coluna_instituicao': 'bacen.colunas',
+    'identificar_colunas_reclamacoes': 'bacen.colunas',
+    'resolver_esquema': 'bacen.colunas',
+    'Esquema': 'bacen.colunas',
+    'Resultado': 'bacen.resultado',
+}
+
+__all__ = sorted(_EXPORTACOES)
+
+
+def __getattr__(nome):
+    modulo = _EXPORTACOES.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module 'bacen' has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(modulo), nome)
+    globals()[nome] = valor
+    return valor
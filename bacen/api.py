@@ -0,0 +1,329 @@
+"""
+API HTTP (JSON) com o catálogo, o ranking de um período e os dados de uma
+instituição, para sistemas que hoje dependem do dashboard.
+
+Uso:
+    python -m bacen.api [--host 0.0.0.0] [--porta 8000]
+
+Rotas:
+    GET /catalogo
+    GET /ranking?tipo=...&ano=...&periodicidade=...&periodo=...[&limite=30]
+    GET /instituicao?tipo=...&ano=...&periodicidade=...&periodo=...&nome=...
+    GET /comparacao?tipo=...&ano=...&periodicidade=...&periodo=...
+                   [&ano_anterior=...&periodicidade_anterior=...&periodo_anterior=...][&limite=20]
+    GET /metrics  (formato texto do Prometheus)
+
+As respostas são serializadas uma vez e guardadas em memória; cada uma leva
+ETag e Cache-Control, e requisições com If-None-Match recebem 304.
+"""
+import argparse
+import hashlib
+import json
+
+import pandas as pd
+from flask import Flask, Response, request
+
+from bacen import aquecimento
+from bacen.cache_disco import periodo_fechado
+from bacen.cache_memoria import CacheMemoria
+from bacen.colunas import identificar_colunas_reclamacoes
+from bacen.comparacao import obter_comparacao, periodo_anterior
+from bacen.dados import ao_invalidar_periodo, obter_catalogo, obter_periodo
+from bacen.metricas import exportar_prometheus
+from bacen.numeros import converter_numero, formatar_numero_brasileiro
+
+# Tempo de vida das respostas (segundos)
+TTL_CATALOGO = 600
+TTL_PERIODO_ABERTO = 600
+TTL_PERIODO_FECHADO = 24 * 60 * 60
+
+_respostas = CacheMemoria(ttl=TTL_CATALOGO, max_itens=1024, nome="respostas_api")
+
+
+@ao_invalidar_periodo
+def _invalidar_respostas(chave):
+    """
+    O catálogo mudou para este período: saem a resposta do catálogo e todas
+    as que usam o período (ranking, instituição, comparações)
+    """
+    def usa_periodo(chave_resposta):
+        return chave_resposta[0] == "catalogo" or any(
+            isinstance(parte, tuple) and tuple(str(p) for p in parte) == chave
+            for parte in chave_resposta[1:]
+        )
+
+    _respostas.remover_onde(usa_periodo)
+
+
+class ErroApi(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+# ================= SERIALIZAÇÃO =================
+def _serializar(dados):
+    corpo = json.dumps(dados, ensure_ascii=False, default=str).encode("utf-8")
+    return corpo, hashlib.sha256(corpo).hexdigest()[:32]
+
+
+def _valor_json(valor):
+    if pd.isna(valor):
+        return None
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def _responder(corpo, etag, ttl):
+    resposta = Response(corpo, mimetype="application/json")
+    resposta.set_etag(etag)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = ttl
+    return resposta.make_conditional(request)
+
+
+def _erro(status, mensagem):
+    corpo = json.dumps({"erro": mensagem}, ensure_ascii=False).encode("utf-8")
+    return Response(corpo, status=status, mimetype="application/json")
+
+
+# ================= PARÂMETROS =================
+def _periodo_da_requisicao():
+    """
+    Valida tipo/ano/periodicidade/periodo contra o catálogo e devolve os
+    valores com os tipos usados nele
+    """
+    faltando = [campo for campo in ("tipo", "ano", "periodicidade", "periodo") if not request.args.get(campo)]
+    if faltando:
+        raise ErroApi(400, f"Parâmetros obrigatórios ausentes: {', '.join(faltando)}")
+
+    _, indice = obter_catalogo()
+    chave = _periodo_do_catalogo(
+        indice,
+        request.args["tipo"],
+        request.args["ano"],
+        request.args["periodicidade"],
+        request.args["periodo"],
+    )
+    return chave
+
+
+def _periodo_do_catalogo(indice, tipo, ano, periodicidade, periodo):
+    anos = indice.get(tipo, {})
+    ano = next((a for a in anos if str(a) == ano), None)
+    periodicidades = anos.get(ano, {})
+    periodicidade = next((p for p in periodicidades if str(p) == periodicidade), None)
+    periodo = next(
+        (p for p in periodicidades.get(periodicidade, []) if str(p) == periodo),
+        None
+    )
+    if periodo is None:
+        raise ErroApi(404, "Período não encontrado no catálogo do BACEN.")
+    return tipo, ano, periodicidade, periodo
+
+
+def _periodo_anterior_da_requisicao(chave):
+    """
+    Período de comparação: ano_anterior/periodicidade_anterior/periodo_anterior
+    ou, sem eles, o período imediatamente anterior ao pedido
+    """
+    _, indice = obter_catalogo()
+    tipo, ano, periodicidade, _ = chave
+    if request.args.get("periodo_anterior"):
+        return _periodo_do_catalogo(
+            indice,
+            tipo,
+            request.args.get("ano_anterior", str(ano)),
+            request.args.get("periodicidade_anterior", str(periodicidade)),
+            request.args["periodo_anterior"],
+        )
+    anterior = periodo_anterior(indice, *chave)
+    if anterior is None:
+        raise ErroApi(404, "Não há período anterior no catálogo do BACEN.")
+    return anterior
+
+
+def _ttl_periodo(chave):
+    return TTL_PERIODO_FECHADO if periodo_fechado(*chave[1:]) else TTL_PERIODO_ABERTO
+
+
+def _dados_periodo(chave):
+    """
+    Só é chamada quando a resposta não está em cache (nem foi um 304): é aqui
+    que os períodos vizinhos são adiantados, uma vez por resposta calculada
+    """
+    try:
+        resultado = obter_periodo(*chave)
+    except Exception as e:
+        raise ErroApi(502, f"Erro ao baixar o CSV do BACEN: {str(e)[:200]}")
+    _, indice = obter_catalogo()
+    aquecimento.prefetch(indice, *chave)
+    if resultado.vazio:
+        raise ErroApi(404, resultado.erro or "O ranking para este período ainda não possui dados.")
+    return resultado
+
+
+# ================= CONTEÚDO =================
+def _conteudo_catalogo():
+    _, indice = obter_catalogo()
+    return _serializar({
+        tipo: {
+            str(ano): {str(per): list(periodos) for per, periodos in periodicidades.items()}
+            for ano, periodicidades in anos.items()
+        }
+        for tipo, anos in indice.items()
+    })
+
+
+def _conteudo_ranking(chave, limite):
+    resultado = _dados_periodo(chave)
+    df = resultado.df
+    ranking = resultado.ranking.topo(limite if limite and limite > 0 else None)
+
+    tipo, ano, periodicidade, periodo = chave
+    return _serializar({
+        "tipo": tipo,
+        "ano": ano,
+        "periodicidade": periodicidade,
+        "periodo": periodo,
+        "total": len(df),
+        "ranking": [
+            {"posicao": int(rank), "instituicao": nome, "indice": converter_numero(valor, None), "indice_formatado": texto}
+            for rank, nome, texto, valor in ranking.itertuples(index=False, name=None)
+        ]
+    })
+
+
+def _conteudo_comparacao(anterior, atual, limite):
+    try:
+        comparacao = obter_comparacao(anterior, atual)
+    except Exception as e:
+        raise ErroApi(502, f"Erro ao baixar o CSV do BACEN: {str(e)[:200]}")
+
+    def linhas(tabela):
+        return [
+            {
+                "instituicao": linha['instituicao'],
+                "situacao": linha['situacao'],
+                "posicao_anterior": _valor_json(linha['posicao_anterior']),
+                "posicao_atual": _valor_json(linha['posicao_atual']),
+                "variacao_posicao": _valor_json(linha['variacao_posicao']),
+                "indice_anterior": _valor_json(linha['Índice_anterior']),
+                "indice_atual": _valor_json(linha['Índice_atual']),
+                "variacao_indice": _valor_json(linha['Índice_variacao']),
+            }
+            for linha in tabela.to_dict("records")
+        ]
+
+    return _serializar({
+        "anterior": dict(zip(("tipo", "ano", "periodicidade", "periodo"), anterior)),
+        "atual": dict(zip(("tipo", "ano", "periodicidade", "periodo"), atual)),
+        "por_cnpj": comparacao.por_cnpj,
+        "subiram": linhas(comparacao.subiram(limite)),
+        "desceram": linhas(comparacao.desceram(limite)),
+        "variacao_indice": linhas(comparacao.maiores_variacoes('Índice', limite)),
+        "novas": linhas(comparacao.novas()),
+        "sairam": linhas(comparacao.sairam()),
+    })
+
+
+def _conteudo_instituicao(chave, nome):
+    resultado = _dados_periodo(chave)
+    df = resultado.df
+    posicao_linha = resultado.instituicoes.posicao(nome)
+    if posicao_linha is None:
+        raise ErroApi(404, f"Instituição {nome} não encontrada no período.")
+    linha = df.iloc[posicao_linha]
+
+    reclamacoes = {}
+    for tipo_nome, coluna in identificar_colunas_reclamacoes(df.columns).items():
+        reclamacoes[tipo_nome] = converter_numero(linha[coluna], None)
+
+    dados = {str(col): _valor_json(linha[col]) for col in df.columns}
+
+    tipo, ano, periodicidade, periodo = chave
+    return _serializar({
+        "tipo": tipo,
+        "ano": ano,
+        "periodicidade": periodicidade,
+        "periodo": periodo,
+        "instituicao": nome,
+        "posicao": resultado.ranking.posicao(posicao_linha),
+        "indice": converter_numero(linha['Índice'], None) if 'Índice' in linha else None,
+        "indice_formatado": formatar_numero_brasileiro(linha['Índice']) if 'Índice' in linha else None,
+        "reclamacoes": reclamacoes,
+        "dados": dados,
+    })
+
+
+# ================= APLICAÇÃO =================
+def criar_app():
+    app = Flask(__name__)
+    aquecimento.ativar()
+
+    @app.errorhandler(ErroApi)
+    def tratar_erro_api(erro):
+        return _erro(erro.status, erro.mensagem)
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(exportar_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @app.get("/catalogo")
+    def catalogo():
+        corpo, etag = _respostas.obter(("catalogo",), _conteudo_catalogo, ttl=TTL_CATALOGO)
+        return _responder(corpo, etag, TTL_CATALOGO)
+
+    @app.get("/ranking")
+    def ranking():
+        chave = _periodo_da_requisicao()
+        limite = request.args.get("limite", type=int)
+        ttl = _ttl_periodo(chave)
+        corpo, etag = _respostas.obter(
+            ("ranking", chave, limite),
+            lambda: _conteudo_ranking(chave, limite),
+            ttl=ttl
+        )
+        return _responder(corpo, etag, ttl)
+
+    @app.get("/comparacao")
+    def comparacao():
+        atual = _periodo_da_requisicao()
+        anterior = _periodo_anterior_da_requisicao(atual)
+        limite = request.args.get("limite", default=20, type=int)
+        ttl = min(_ttl_periodo(anterior), _ttl_periodo(atual))
+        corpo, etag = _respostas.obter(
+            ("comparacao", anterior, atual, limite),
+            lambda: _conteudo_comparacao(anterior, atual, limite),
+            ttl=ttl
+        )
+        return _responder(corpo, etag, ttl)
+
+    @app.get("/instituicao")
+    def instituicao():
+        chave = _periodo_da_requisicao()
+        nome = request.args.get("nome")
+        if not nome:
+            raise ErroApi(400, "Parâmetro obrigatório ausente: nome")
+        ttl = _ttl_periodo(chave)
+        corpo, etag = _respostas.obter(
+            ("instituicao", chave, nome),
+            lambda: _conteudo_instituicao(chave, nome),
+            ttl=ttl
+        )
+        return _responder(corpo, etag, ttl)
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API JSON do ranking de reclamações do BACEN.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    criar_app().run(host=args.host, port=args.porta, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
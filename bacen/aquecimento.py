@@ -0,0 +1,178 @@
+"""
+Aquecimento do cache em segundo plano.
+
+- Na inicialização e a cada atualização do catálogo, carrega o período que o
+  dashboard abre por padrão (último ano, primeira periodicidade, último
+  período) de cada tipo
+- Quando o usuário escolhe um tipo/ano, adianta os demais períodos desse ano,
+  começando pelos mais próximos do selecionado
+- A cada BACEN_CATALOGO_INTERVALO segundos, busca o catálogo de novo em uma
+  thread própria, compara com o anterior e carrega só os períodos publicados
+  desde então (os demais DataFrames em cache não são tocados); os reruns
+  continuam lendo o catálogo anterior até a troca
+
+Tudo roda em um pool pequeno de threads e vai para o cache em memória do
+processo (dados.obter_periodo); falhas são apenas registradas no log.
+
+    BACEN_AQUECIMENTO               0 desliga o aquecimento (padrão 1)
+    BACEN_AQUECIMENTO_TRABALHADORES threads do pool (padrão 2)
+    BACEN_CATALOGO_INTERVALO        segundos entre atualizações do catálogo (padrão 600; 0 desliga)
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bacen import dados
+from bacen.metricas import descrever, incrementar
+
+logger = logging.getLogger(__name__)
+
+ATIVO = os.environ.get("BACEN_AQUECIMENTO", "1") != "0"
+TRABALHADORES = int(os.environ.get("BACEN_AQUECIMENTO_TRABALHADORES", "2"))
+INTERVALO_CATALOGO = float(os.environ.get("BACEN_CATALOGO_INTERVALO", "600"))
+
+_executor = ThreadPoolExecutor(max_workers=max(1, TRABALHADORES), thread_name_prefix="bacen-aquecimento")
+_trava = threading.Lock()
+_agendados = set()
+_ativado = False
+
+
+# ================= SELEÇÃO DE PERÍODOS =================
+def periodos_padrao(indice_catalogo):
+    """
+    Para cada tipo, o período que o dashboard abre por padrão
+    """
+    for tipo, anos in indice_catalogo.items():
+        if not anos:
+            continue
+        ano = list(anos)[-1]
+        periodicidades = anos[ano]
+        if not periodicidades:
+            continue
+        periodicidade = next(iter(periodicidades))
+        periodos = periodicidades[periodicidade]
+        if periodos:
+            yield tipo, ano, periodicidade, periodos[-1]
+
+
+def periodos_vizinhos(indice_catalogo, tipo, ano, periodicidade, periodo):
+    """
+    Os demais períodos do mesmo ano e periodicidade, do mais próximo ao mais distante
+    """
+    periodos = indice_catalogo.get(tipo, {}).get(ano, {}).get(periodicidade, [])
+    if periodo not in periodos:
+        return []
+    posicao = periodos.index(periodo)
+    outros = [p for p in periodos if p != periodo]
+    return [
+        (tipo, ano, periodicidade, p)
+        for p in sorted(outros, key=lambda p: abs(periodos.index(p) - posicao))
+    ]
+
+
+# ================= EXECUÇÃO =================
+def _carregar(chave, origem):
+    try:
+        dados.obter_periodo(*chave)
+        incrementar("bacen_aquecimento_total", origem=origem, resultado="ok")
+    except Exception as e:
+        incrementar("bacen_aquecimento_total", origem=origem, resultado="erro")
+        logger.warning("Falha ao aquecer %s: %s", chave, e)
+    finally:
+        with _trava:
+            _agendados.discard(chave)
+
+
+def agendar(chaves, origem):
+    """
+    Coloca os períodos na fila do pool (ignorando os que já estão na fila)
+    """
+    if not ATIVO:
+        return 0
+
+    novos = 0
+    for chave in chaves:
+        with _trava:
+            if chave in _agendados:
+                continue
+            _agendados.add(chave)
+        _executor.submit(_carregar, chave, origem)
+        novos += 1
+    return novos
+
+
+def aquecer(indice_catalogo):
+    return agendar(list(periodos_padrao(indice_catalogo)), "catalogo")
+
+
+def prefetch(indice_catalogo, tipo, ano, periodicidade, periodo):
+    return agendar(periodos_vizinhos(indice_catalogo, tipo, ano, periodicidade, periodo), "vizinhos")
+
+
+def _ao_atualizar_catalogo(catalogo):
+    _, indice_catalogo = catalogo
+    aquecer(indice_catalogo)
+
+
+def ativar():
+    """
+    Liga o aquecimento: registra o gatilho de atualização do catálogo e já
+    carrega o catálogo (e os períodos padrão) em segundo plano; com
+    INTERVALO_CATALOGO, também a atualização periódica do catálogo
+    """
+    global _ativado
+    if not ATIVO:
+        return
+    with _trava:
+        if _ativado:
+            return
+        _ativado = True
+    dados.ao_atualizar_catalogo(_ao_atualizar_catalogo)
+    if INTERVALO_CATALOGO > 0:
+        threading.Thread(target=_atualizar_catalogo_periodicamente, name="bacen-catalogo", daemon=True).start()
+    else:
+        _executor.submit(_carregar_catalogo)
+
+
+def _carregar_catalogo():
+    try:
+        dados.obter_catalogo()
+    except Exception as e:
+        logger.warning("Falha ao carregar o catálogo para aquecimento: %s", e)
+
+
+# ================= ATUALIZAÇÃO DO CATÁLOGO =================
+def atualizar_catalogo():
+    """
+    Uma rodada: busca o catálogo, agenda os períodos novos e retorna
+    (adicionados, removidos)
+    """
+    # Enquanto a atualização periódica estiver de pé, o catálogo em cache não
+    # vence sozinho (um rerun nunca espera pelo BACEN); se ela parar, volta a
+    # valer a atualização sob demanda
+    adicionados, removidos = dados.atualizar_catalogo(ttl=INTERVALO_CATALOGO * 3)
+    if adicionados or removidos:
+        incrementar("bacen_catalogo_alteracoes_total", tipo="adicionado", valor=len(adicionados))
+        incrementar("bacen_catalogo_alteracoes_total", tipo="removido", valor=len(removidos))
+        logger.info("Catálogo atualizado: %d períodos novos, %d removidos", len(adicionados), len(removidos))
+    agendar(adicionados, "catalogo_novo")
+    return adicionados, removidos
+
+
+def _atualizar_catalogo_periodicamente():
+    while True:
+        try:
+            atualizar_catalogo()
+        except Exception as e:
+            incrementar("bacen_catalogo_atualizacoes_total", resultado="erro")
+            logger.warning("Falha ao atualizar o catálogo: %s", e)
+        else:
+            incrementar("bacen_catalogo_atualizacoes_total", resultado="ok")
+        time.sleep(INTERVALO_CATALOGO)
+
+
+descrever("bacen_aquecimento_total", "Períodos carregados em segundo plano (catálogo ou vizinhos do selecionado)")
+descrever("bacen_catalogo_atualizacoes_total", "Atualizações periódicas do catálogo, por resultado")
+descrever("bacen_catalogo_alteracoes_total", "Períodos que entraram ou saíram do catálogo nas atualizações")
@@ -0,0 +1,82 @@
+"""
+Armazenamento local dos rankings em um dataset Parquet particionado.
+
+Cada período fica em tipo=<tipo>/ano=<ano>/periodicidade=<periodicidade>/periodo=<periodo>,
+com os valores codificados para URL (mesmo formato lido por pyarrow.dataset
+com particionamento "hive").
+"""
+import os
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+# ================= CONFIGURAÇÃO =================
+DIRETORIO_PADRAO = os.environ.get("BACEN_ARMAZEM_DIR", "dados_bacen")
+NOME_ARQUIVO = "parte-0.parquet"
+
+
+# ================= PARTIÇÕES =================
+def caminho_particao(tipo, ano, periodicidade, periodo, diretorio=DIRETORIO_PADRAO):
+    return os.path.join(
+        diretorio,
+        f"tipo={quote(str(tipo), safe='')}",
+        f"ano={quote(str(ano), safe='')}",
+        f"periodicidade={quote(str(periodicidade), safe='')}",
+        f"periodo={quote(str(periodo), safe='')}",
+    )
+
+
+def existe_particao(tipo, ano, periodicidade, periodo, diretorio=DIRETORIO_PADRAO):
+    caminho = caminho_particao(tipo, ano, periodicidade, periodo, diretorio)
+    return os.path.exists(os.path.join(caminho, NOME_ARQUIVO))
+
+
+def gravar_particao(df, tipo, ano, periodicidade, periodo, diretorio=DIRETORIO_PADRAO):
+    """
+    Grava o DataFrame já limpo de um período, substituindo o anterior
+    """
+    caminho = caminho_particao(tipo, ano, periodicidade, periodo, diretorio)
+    os.makedirs(caminho, exist_ok=True)
+
+    destino = os.path.join(caminho, NOME_ARQUIVO)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return destino
+
+
+def ler_particao(tipo, ano, periodicidade, periodo, diretorio=DIRETORIO_PADRAO):
+    """
+    Lê um período do armazenamento local. Retorna None se ele ainda não foi baixado.
+    """
+    caminho = os.path.join(
+        caminho_particao(tipo, ano, periodicidade, periodo, diretorio),
+        NOME_ARQUIVO
+    )
+    if not os.path.exists(caminho):
+        return None
+    return pd.read_parquet(caminho)
+
+
+def listar_particoes(diretorio=DIRETORIO_PADRAO):
+    """
+    Lista as tuplas (tipo, ano, periodicidade, periodo) já armazenadas
+    """
+    particoes = []
+    for raiz, _, arquivos in os.walk(diretorio):
+        if NOME_ARQUIVO not in arquivos:
+            continue
+        partes = os.path.relpath(raiz, diretorio).split(os.sep)
+        valores = dict(parte.split("=", 1) for parte in partes if "=" in parte)
+        try:
+            particoes.append(tuple(
+                unquote(valores[campo])
+                for campo in ("tipo", "ano", "periodicidade", "periodo")
+            ))
+        except KeyError:
+            continue
+    return sorted(particoes)
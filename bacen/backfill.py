@@ -0,0 +1,123 @@
+"""
+Backfill histórico: baixa todos os períodos do catálogo do BACEN para o
+armazenamento local em Parquet.
+
+Uso:
+    python -m bacen.backfill [--trabalhadores 4] [--tipo TIPO] [--ano ANO] [--forcar]
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bacen import armazem, series
+from bacen.cliente_http import estatisticas as estatisticas_http
+from bacen.dados import baixar_csv, gerar_link_csv, limpar_dados_csv, load_data
+
+
+def listar_periodos(indice_catalogo, tipo=None, ano=None):
+    """
+    Retorna as combinações (tipo, ano, periodicidade, periodo) do catálogo
+    """
+    periodos = []
+    for tipo_item, anos in indice_catalogo.items():
+        if tipo and tipo_item != tipo:
+            continue
+        for ano_item, periodicidades in anos.items():
+            if ano and str(ano_item) != str(ano):
+                continue
+            for periodicidade, lista in periodicidades.items():
+                periodos.extend((tipo_item, ano_item, periodicidade, periodo) for periodo in lista)
+    return periodos
+
+
+def baixar_periodo(tipo, ano, periodicidade, periodo, diretorio=armazem.DIRETORIO_PADRAO):
+    """
+    Executa baixar_csv -> limpar_dados_csv para um período e grava a partição
+    (e a da série histórica).
+    Retorna o número de linhas gravadas (0 se o arquivo veio vazio).
+    """
+    resultado = baixar_csv(gerar_link_csv(ano, periodicidade, periodo, tipo))
+    if resultado.erro:
+        raise RuntimeError(resultado.erro)
+    df = limpar_dados_csv(resultado.df)
+    if df.empty:
+        return 0
+    armazem.gravar_particao(df, tipo, ano, periodicidade, periodo, diretorio)
+    series.atualizar_periodo((tipo, ano, periodicidade, periodo), df)
+    return len(df)
+
+
+def executar_backfill(periodos, trabalhadores=4, diretorio=armazem.DIRETORIO_PADRAO, forcar=False):
+    """
+    Baixa os períodos em paralelo com um pool limitado de threads.
+    Retorna um resumo com as contagens de gravados, vazios, pulados e falhas.
+    """
+    resumo = {'gravados': 0, 'vazios': 0, 'pulados': 0, 'falhas': []}
+
+    pendentes = []
+    for chave in periodos:
+        if not forcar and armazem.existe_particao(*chave, diretorio=diretorio):
+            resumo['pulados'] += 1
+        else:
+            pendentes.append(chave)
+
+    with ThreadPoolExecutor(max_workers=max(1, trabalhadores)) as executor:
+        futuros = {
+            executor.submit(baixar_periodo, *chave, diretorio=diretorio): chave
+            for chave in pendentes
+        }
+        for i, futuro in enumerate(as_completed(futuros), start=1):
+            chave = futuros[futuro]
+            try:
+                linhas = futuro.result()
+            except Exception as e:
+                resumo['falhas'].append((chave, str(e)[:200]))
+                print(f"[{i}/{len(pendentes)}] FALHA {chave}: {str(e)[:200]}", file=sys.stderr)
+                continue
+
+            if linhas:
+                resumo['gravados'] += 1
+            else:
+                resumo['vazios'] += 1
+            print(f"[{i}/{len(pendentes)}] {chave}: {linhas} linhas")
+
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Baixa todo o histórico de rankings do BACEN para Parquet local.")
+    parser.add_argument("--trabalhadores", type=int, default=4, help="Downloads simultâneos (padrão: 4)")
+    parser.add_argument("--tipo", help="Baixar apenas este tipo")
+    parser.add_argument("--ano", help="Baixar apenas este ano")
+    parser.add_argument("--diretorio", default=armazem.DIRETORIO_PADRAO, help="Destino do dataset Parquet")
+    parser.add_argument("--forcar", action="store_true", help="Baixar de novo períodos já armazenados")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    _, indice_catalogo = load_data()
+    periodos = listar_periodos(indice_catalogo, tipo=args.tipo, ano=args.ano)
+    print(f"{len(periodos)} períodos no catálogo")
+
+    resumo = executar_backfill(
+        periodos,
+        trabalhadores=args.trabalhadores,
+        diretorio=args.diretorio,
+        forcar=args.forcar
+    )
+
+    print(
+        f"Concluído em {time.perf_counter() - inicio:.1f}s: "
+        f"{resumo['gravados']} gravados, {resumo['vazios']} vazios, "
+        f"{resumo['pulados']} já existentes, {len(resumo['falhas'])} falhas"
+    )
+    http = estatisticas_http()
+    print(
+        f"HTTP: {http['requisicoes']} requisições, {http['conexoes_novas']} conexões novas "
+        f"({http['taxa_reuso']:.0%} de reuso), {http['espera_limite']:.1f}s aguardando o limite de taxa"
+    )
+    return 1 if resumo['falhas'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Busca de instituições.
+
+- IndiceInstituicoes: por período, nome -> linha (e CNPJ -> nome), montado uma
+  vez e guardado junto com o Resultado em cache
+- Busca global: nomes de todos os períodos carregados, normalizados (sem
+  acentos, maiúsculas ou pontuação), com busca por prefixo e por trigramas e
+  agrupamento por CNPJ para reconhecer instituições que mudaram de nome
+
+    from bacen.busca import buscar
+    for ocorrencia in buscar("itau"):
+        print(ocorrencia.nome, ocorrencia.outros_nomes, ocorrencia.periodos)
+"""
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from bacen.colunas import resolver_esquema
+
+_RE_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar_nome(texto):
+    """
+    'Itaú Unibanco S.A.' -> 'itau unibanco s a'
+    """
+    sem_acentos = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    return _RE_NAO_ALFANUMERICO.sub(" ", sem_acentos.casefold()).strip()
+
+
+def trigramas(normalizado):
+    texto = f"  {normalizado} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def normalizar_cnpj(valor):
+    if valor is None or pd.isna(valor):
+        return None
+    digitos = re.sub(r"\D", "", str(valor))
+    return digitos or None
+
+
+# ================= ÍNDICE DE UM PERÍODO =================
+class IndiceInstituicoes:
+    """
+    Nome -> posição da linha (para df.iloc) de um DataFrame de ranking,
+    sem varrer a coluna a cada consulta
+    """
+
+    def __init__(self, df):
+        esquema = resolver_esquema(df.columns)
+        self.coluna = esquema.instituicao
+        self.coluna_cnpj = esquema.cnpj
+        self.posicoes = {}
+        self.cnpjs = {}
+        self.nomes_cnpj = {}
+
+        if self.coluna is None or df.empty:
+            self.nomes = []
+            return
+
+        nomes = df[self.coluna].to_numpy(dtype=object, na_value=None)
+        cnpjs = (
+            [normalizar_cnpj(valor) for valor in df[self.coluna_cnpj].to_numpy(dtype=object, na_value=None)]
+            if self.coluna_cnpj else [None] * len(nomes)
+        )
+
+        # Em nomes repetidos vale a primeira linha, como no filtro df[coluna == nome].iloc[0]
+        for posicao in range(len(nomes) - 1, -1, -1):
+            nome = nomes[posicao]
+            if nome is None:
+                continue
+            self.posicoes[nome] = posicao
+            if cnpjs[posicao]:
+                self.cnpjs[nome] = cnpjs[posicao]
+                self.nomes_cnpj[cnpjs[posicao]] = nome
+
+        self.nomes = sorted(self.posicoes)
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def posicao(self, nome):
+        return self.posicoes.get(nome)
+
+    def cnpj(self, nome):
+        return self.cnpjs.get(nome)
+
+    def nome_por_cnpj(self, cnpj):
+        """Nome da instituição com esse CNPJ no período (ou None)"""
+        return self.nomes_cnpj.get(normalizar_cnpj(cnpj))
+
+
+# ================= BUSCA GLOBAL =================
+def _ordem_periodo(chave):
+    # Partes numéricas comparadas como número ("10" depois de "2")
+    return tuple((0, int(parte), '') if parte.isdigit() else (1, 0, parte) for parte in chave)
+
+
+@dataclass
+class Ocorrencia:
+    nome: str
+    cnpj: Optional[str] = None
+    outros_nomes: List[str] = field(default_factory=list)
+    periodos: List[Tuple] = field(default_factory=list)
+
+
+class BuscaInstituicoes:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._zerar()
+
+    def _zerar(self):
+        self._nomes = {}                      # normalizado -> nome original
+        self._normalizados = {}               # nome original -> normalizado
+        self._ordenados = []                  # normalizados, em ordem (busca por prefixo)
+        self._trigramas = defaultdict(set)    # trigrama -> normalizados
+        self._trigramas_nome = {}             # normalizado -> seus trigramas
+        self._periodos = defaultdict(set)     # normalizado -> chaves de período
+        self._cnpjs = {}                      # nome original -> CNPJ
+        self._nomes_cnpj = defaultdict(set)   # CNPJ -> nomes originais
+
+    def registrar_periodo(self, chave, indice):
+        # O dashboard e a API passam ano/período como no catálogo, bacen.lote como texto
+        chave = tuple(str(parte) for parte in chave)
+        with self._trava:
+            for nome in indice.nomes:
+                normalizado = self._normalizados.get(nome)
+                if normalizado is None:
+                    normalizado = self._normalizados[nome] = normalizar_nome(nome)
+                self._periodos[normalizado].add(chave)
+                cnpj = indice.cnpj(nome)
+                if cnpj:
+                    self._cnpjs[nome] = cnpj
+                    self._nomes_cnpj[cnpj].add(nome)
+
+                if normalizado in self._nomes:
+                    continue
+                self._nomes[normalizado] = nome
+                bisect.insort(self._ordenados, normalizado)
+                self._trigramas_nome[normalizado] = trigramas(normalizado)
+                for trigrama in self._trigramas_nome[normalizado]:
+                    self._trigramas[trigrama].add(normalizado)
+
+    def _por_prefixo(self, consulta, limite):
+        inicio = bisect.bisect_left(self._ordenados, consulta)
+        encontrados = []
+        for normalizado in self._ordenados[inicio:]:
+            if not normalizado.startswith(consulta) or len(encontrados) >= limite:
+                break
+            encontrados.append(normalizado)
+        return encontrados
+
+    def _por_trigramas(self, consulta, limite, similaridade_minima):
+        alvo = trigramas(consulta)
+        minimo = max(1, math.ceil(similaridade_minima * len(alvo)))
+
+        # Quem tem ao menos `minimo` trigramas da consulta aparece obrigatoriamente
+        # em um dos (len - minimo + 1) trigramas mais raros: só eles geram candidatos,
+        # e os trigramas comuns ("ban", "co ") não precisam ser percorridos
+        raros = sorted(alvo, key=lambda trigrama: len(self._trigramas.get(trigrama, ())))
+        candidatos = set()
+        for trigrama in raros[:len(alvo) - minimo + 1]:
+            candidatos |= self._trigramas.get(trigrama, set())
+
+        pontuados = []
+        for normalizado in candidatos:
+            comuns = len(alvo & self._trigramas_nome[normalizado])
+            if comuns >= minimo:
+                pontuados.append((comuns / len(alvo), normalizado))
+        pontuados.sort(key=lambda item: (-item[0], item[1]))
+        return [normalizado for _, normalizado in pontuados[:limite]]
+
+    def buscar(self, consulta, limite=20, similaridade_minima=0.5):
+        """
+        Nomes que começam com a consulta e, depois deles, os mais parecidos
+        (trigramas em comum), ignorando acentos, maiúsculas e pontuação
+        """
+        consulta = normalizar_nome(consulta)
+        if not consulta:
+            return []
+
+        with self._trava:
+            encontrados = self._por_prefixo(consulta, limite)
+            if len(encontrados) < limite:
+                vistos = set(encontrados)
+                encontrados += [
+                    normalizado
+                    for normalizado in self._por_trigramas(consulta, limite, similaridade_minima)
+                    if normalizado not in vistos
+                ][:limite - len(encontrados)]
+            return [self._ocorrencia(self._nomes[normalizado]) for normalizado in encontrados]
+
+    def _ocorrencia(self, nome):
+        cnpj = self._cnpjs.get(nome)
+        outros = sorted(self._nomes_cnpj.get(cnpj, set()) - {nome}) if cnpj else []
+        periodos = set()
+        for variante in [nome, *outros]:
+            periodos |= self._periodos.get(self._normalizados[variante], set())
+        return Ocorrencia(nome, cnpj, outros, sorted(periodos, key=_ordem_periodo))
+
+    def nomes_por_cnpj(self, cnpj):
+        with self._trava:
+            return sorted(self._nomes_cnpj.get(normalizar_cnpj(cnpj), ()))
+
+    def limpar(self):
+        with self._trava:
+            self._zerar()
+
+
+_busca = BuscaInstituicoes()
+
+
+def registrar_periodo(chave, indice):
+    _busca.registrar_periodo(chave, indice)
+
+
+def buscar(consulta, limite=20, similaridade_minima=0.5):
+    return _busca.buscar(consulta, limite, similaridade_minima)
+
+
+def nomes_por_cnpj(cnpj):
+    return _busca.nomes_por_cnpj(cnpj)
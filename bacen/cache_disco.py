@@ -0,0 +1,226 @@
+"""
+Cache em disco dos arquivos de ranking do BACEN.
+
+Os arquivos são guardados por conteúdo (sha256 dos bytes baixados) e indexados
+pela tupla (ano, periodicidade, periodo, tipo) usada em gerar_link_csv. Para cada
+arquivo ficam os bytes brutos e o DataFrame já lido em Parquet, junto com o ETag
+e o Last-Modified devolvidos pelo servidor para revalidação condicional.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+# ================= CONFIGURAÇÃO =================
+DIRETORIO_PADRAO = os.environ.get("BACEN_CACHE_DIR", ".cache_bacen")
+
+# Tempo (em segundos) até revalidar um período que ainda pode mudar
+TTL_PADRAO = int(os.environ.get("BACEN_CACHE_TTL", 6 * 60 * 60))
+
+
+# ================= CHAVES =================
+def parametros_da_url(url):
+    """
+    Extrai a tupla (ano, periodicidade, periodo, tipo) de um link de gerar_link_csv
+    """
+    query = parse_qs(urlparse(url).query)
+    return tuple(
+        query.get(campo, [""])[0]
+        for campo in ("ano", "periodicidade", "periodo", "tipo")
+    )
+
+
+def chave_periodo(ano, periodicidade, periodo, tipo):
+    texto = "|".join(str(parte) for parte in (ano, periodicidade, periodo, tipo))
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+# Períodos por ano de cada periodicidade do catálogo do BACEN
+PERIODOS_POR_ANO = {
+    "MENSAL": 12,
+    "BIMESTRAL": 6,
+    "TRIMESTRAL": 4,
+    "QUADRIMESTRAL": 3,
+    "SEMESTRAL": 2,
+    "ANUAL": 1,
+}
+
+
+def fim_periodo(ano, periodicidade, periodo):
+    """
+    Primeiro instante depois do período (ex.: 2024, TRIMESTRAL, 2 -> 01/07/2024),
+    ou None se a periodicidade ou o período não forem reconhecidos
+    """
+    por_ano = PERIODOS_POR_ANO.get(str(periodicidade).strip().upper())
+    try:
+        ano, periodo = int(ano), int(str(periodo).strip())
+    except (TypeError, ValueError):
+        return None
+    if por_ano is None or not 1 <= periodo <= por_ano:
+        return None
+    meses = periodo * 12 // por_ano
+    return datetime(ano + meses // 12, meses % 12 + 1, 1)
+
+
+def periodo_fechado(ano, periodicidade=None, periodo=None, agora=None):
+    """
+    Períodos já encerrados foram publicados e não mudam mais: os de anos
+    anteriores e, do ano corrente, os que já terminaram (ex.: o 1º trimestre
+    a partir de abril). Sem periodicidade/período reconhecíveis, vale só o ano.
+    """
+    agora = agora or datetime.now()
+    try:
+        if int(ano) < agora.year:
+            return True
+    except (TypeError, ValueError):
+        return False
+    fim = fim_periodo(ano, periodicidade, periodo)
+    return fim is not None and fim <= agora
+
+
+def _gravar_atomico(caminho, dados):
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as arquivo:
+            arquivo.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+# ================= CACHE =================
+class CacheDisco:
+    """
+    Guarda bytes e DataFrames dos rankings no disco, endereçados por conteúdo
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, ttl=TTL_PADRAO):
+        self.diretorio = diretorio
+        self.ttl = ttl
+
+    # ---- Caminhos
+    def _caminho_meta(self, chave):
+        return os.path.join(self.diretorio, "chaves", f"{chave}.json")
+
+    def caminho_bruto(self, sha):
+        return os.path.join(self.diretorio, "objetos", sha[:2], f"{sha}.csv")
+
+    def caminho_parquet(self, sha):
+        return os.path.join(self.diretorio, "objetos", sha[:2], f"{sha}.parquet")
+
+    # ---- Metadados
+    def ler_meta(self, chave):
+        try:
+            with open(self._caminho_meta(chave), encoding="utf-8") as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+    def _gravar_meta(self, chave, meta):
+        dados = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        _gravar_atomico(self._caminho_meta(chave), dados)
+
+    def precisa_revalidar(self, meta, agora=None):
+        if periodo_fechado(meta.get("ano"), meta.get("periodicidade"), meta.get("periodo")):
+            return False
+        agora = agora if agora is not None else time.time()
+        return agora - meta.get("verificado_em", 0) > self.ttl
+
+    def cabecalhos_condicionais(self, meta):
+        cabecalhos = {}
+        if not meta:
+            return cabecalhos
+        if meta.get("etag"):
+            cabecalhos["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = meta["last_modified"]
+        return cabecalhos
+
+    # ---- Conteúdo
+    def ler_frame(self, meta):
+        caminho = self.caminho_parquet(meta["sha256"])
+        if not os.path.exists(caminho):
+            return None
+        try:
+            return pd.read_parquet(caminho)
+        except Exception:
+            return None
+
+    def arquivo_bruto(self, meta):
+        """
+        Caminho dos bytes brutos do arquivo, ou None se não estiverem no disco
+        """
+        caminho = self.caminho_bruto(meta["sha256"])
+        return caminho if os.path.exists(caminho) else None
+
+    def novo_temporario(self):
+        """
+        Cria um arquivo temporário dentro do cache para receber um download
+        """
+        diretorio = os.path.join(self.diretorio, "tmp")
+        os.makedirs(diretorio, exist_ok=True)
+        fd, caminho = tempfile.mkstemp(dir=diretorio, suffix=".csv")
+        os.close(fd)
+        return caminho
+
+    def guardar_bruto(self, temporario, sha):
+        """
+        Move um download concluído para o endereço do seu conteúdo
+        """
+        destino = self.caminho_bruto(sha)
+        if os.path.exists(destino):
+            os.remove(temporario)
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(temporario, destino)
+        return destino
+
+    def gravar(self, ano, periodicidade, periodo, tipo, sha, df, cabecalhos=None, encoding=None):
+        """
+        Registra um download novo, já guardado com guardar_bruto.
+        O frame só é salvo se não estiver vazio.
+        """
+        cabecalhos = cabecalhos or {}
+
+        caminho_parquet = self.caminho_parquet(sha)
+        if df is not None and not df.empty and not os.path.exists(caminho_parquet):
+            temporario = f"{caminho_parquet}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(caminho_parquet), exist_ok=True)
+                df.to_parquet(temporario, index=False)
+                os.replace(temporario, caminho_parquet)
+            except Exception:
+                # Sem o Parquet o arquivo é relido a partir dos bytes brutos
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+
+        meta = {
+            "ano": str(ano),
+            "periodicidade": str(periodicidade),
+            "periodo": str(periodo),
+            "tipo": str(tipo),
+            "sha256": sha,
+            "encoding": encoding,
+            "etag": cabecalhos.get("ETag"),
+            "last_modified": cabecalhos.get("Last-Modified"),
+            "verificado_em": time.time(),
+        }
+        self._gravar_meta(chave_periodo(ano, periodicidade, periodo, tipo), meta)
+        return meta
+
+    def renovar(self, chave, meta):
+        """
+        Marca o arquivo como revalidado (resposta 304 do servidor)
+        """
+        meta = dict(meta, verificado_em=time.time())
+        self._gravar_meta(chave, meta)
+        return meta
@@ -0,0 +1,165 @@
+"""
+Cache em memória, compartilhado pelas threads do processo, com TTL, limite
+de itens e, opcionalmente, limite de bytes (os menos usados recentemente
+saem primeiro). Falhas simultâneas na mesma chave calculam o valor uma
+única vez.
+
+Com `tamanho`, cada valor guardado é medido (ex.: uso_memoria do DataFrame)
+e o total fica dentro de `max_bytes`. Chaves para as quais `fixar(chave)` é
+verdadeiro não são removidas para abrir espaço, mas saem como as demais
+quando o TTL vence.
+
+    bacen_cache_total{cache, resultado=acerto|falha}
+    bacen_cache_remocoes_total{cache, motivo=ttl|itens|bytes}
+    bacen_cache_bytes{cache}, bacen_cache_itens{cache}
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from bacen.metricas import definir, descrever, incrementar
+from bacen.voo_unico import VooUnico
+
+descrever("bacen_cache_remocoes_total", "Itens removidos dos caches em memória, por motivo")
+descrever("bacen_cache_bytes", "Bytes ocupados pelos itens de cada cache em memória")
+descrever("bacen_cache_itens", "Itens guardados em cada cache em memória")
+
+
+class CacheMemoria:
+    def __init__(self, ttl=600, max_itens=128, nome="memoria", max_bytes=None, tamanho=None, fixar=None):
+        self.nome = nome
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._tamanho = tamanho
+        self._fixar = fixar
+        self._itens = OrderedDict()     # chave -> (validade, valor, bytes)
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self._voos = VooUnico(nome)
+        self._estatisticas = {'acertos': 0, 'falhas': 0, 'remocoes': 0}
+
+    def obter(self, chave, fabrica, ttl=None):
+        """
+        Retorna o valor guardado para a chave, ou calcula com fabrica() e guarda.
+        Exceções de fabrica() não são guardadas.
+        """
+        agora = time.monotonic()
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > agora:
+                self._itens.move_to_end(chave)
+                self._estatisticas['acertos'] += 1
+                incrementar("bacen_cache_total", cache=self.nome, resultado="acerto")
+                return item[1]
+            self._estatisticas['falhas'] += 1
+
+        incrementar("bacen_cache_total", cache=self.nome, resultado="falha")
+        # Só quem calcula guarda (e mede o tamanho); os que esperaram recebem o mesmo valor
+        return self._voos.executar(chave, lambda: self._calcular(chave, fabrica, ttl, agora))
+
+    def _calcular(self, chave, fabrica, ttl, agora):
+        valor = fabrica()
+        self._guardar(chave, valor, ttl, agora)
+        return valor
+
+    def guardar(self, chave, valor, ttl=None):
+        """
+        Coloca (ou troca) o valor da chave sem passar por fabrica(), ex.: quando
+        uma tarefa em segundo plano já buscou a versão nova
+        """
+        self._guardar(chave, valor, ttl, time.monotonic())
+
+    def consultar(self, chave, vencidos=True):
+        """
+        Valor guardado para a chave (mesmo vencido, a não ser com
+        vencidos=False), sem calcular nem contar acerto/falha; None se não houver
+        """
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None or (not vencidos and item[0] <= time.monotonic()):
+                return None
+            return item[1]
+
+    def _guardar(self, chave, valor, ttl, agora):
+        tamanho = self._tamanho(valor) if self._tamanho else 0
+        with self._trava:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            self._itens[chave] = (agora + (self.ttl if ttl is None else ttl), valor, tamanho)
+            self._bytes += tamanho
+            self._podar(agora)
+            self._publicar()
+
+    def _fixo(self, chave):
+        return self._fixar is not None and self._fixar(chave)
+
+    def _remover(self, chave, motivo):
+        _, _, tamanho = self._itens.pop(chave)
+        self._bytes -= tamanho
+        self._estatisticas['remocoes'] += 1
+        incrementar("bacen_cache_remocoes_total", cache=self.nome, motivo=motivo)
+
+    def _excedido(self):
+        if len(self._itens) > self.max_itens:
+            return "itens"
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            return "bytes"
+        return None
+
+    def _podar(self, agora):
+        """Remove vencidos (fixos ou não) e, enquanto passar dos limites, os menos usados não fixos"""
+        if not self._excedido():
+            return
+        for chave in [chave for chave, item in self._itens.items() if item[0] <= agora]:
+            self._remover(chave, "ttl")
+
+        for chave in list(self._itens):
+            motivo = self._excedido()
+            if motivo is None:
+                break
+            # O último item é o recém-guardado: ele fica mesmo que sozinho passe do limite
+            if chave == next(reversed(self._itens)) or self._fixo(chave):
+                continue
+            self._remover(chave, motivo)
+
+    def _publicar(self):
+        definir("bacen_cache_bytes", self._bytes, cache=self.nome)
+        definir("bacen_cache_itens", len(self._itens), cache=self.nome)
+
+    def estatisticas(self):
+        """
+        Itens, bytes ocupados, itens fixos e contagens de acertos, falhas e remoções
+        """
+        with self._trava:
+            return {
+                'itens': len(self._itens),
+                'bytes': self._bytes,
+                'fixos': sum(1 for chave in self._itens if self._fixo(chave)),
+                **self._estatisticas,
+            }
+
+    def remover(self, chave):
+        with self._trava:
+            item = self._itens.pop(chave, None)
+            if item is not None:
+                self._bytes -= item[2]
+            self._publicar()
+
+    def remover_onde(self, condicao):
+        """
+        Remove as chaves para as quais condicao(chave) é verdadeira; retorna quantas
+        """
+        with self._trava:
+            chaves = [chave for chave in self._itens if condicao(chave)]
+            for chave in chaves:
+                self._bytes -= self._itens.pop(chave)[2]
+            self._publicar()
+        return len(chaves)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+            self._publicar()
@@ -0,0 +1,217 @@
+"""
+Sessão HTTP compartilhada pelo processo para falar com o BACEN.
+
+- Mantém as conexões abertas (pool por host), evitando um handshake TLS por arquivo
+- Repete falhas transitórias (429/5xx, erros de conexão) com backoff exponencial e jitter
+- Limita a taxa de requisições com um balde de tokens, para cargas em lote
+  (backfill, vários períodos) não serem barradas pelo BACEN; cada nova
+  tentativa também consome um token
+
+Configuração por variáveis de ambiente:
+
+    BACEN_HTTP_TAXA         requisições por segundo (padrão 5; 0 desliga o limite)
+    BACEN_HTTP_RAJADA       requisições permitidas em rajada (padrão 10)
+    BACEN_HTTP_TENTATIVAS   novas tentativas em falhas transitórias (padrão 3)
+    BACEN_HTTP_CONEXOES     conexões mantidas por host (padrão 16)
+"""
+import asyncio
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from bacen.metricas import descrever, incrementar
+
+TAXA_PADRAO = float(os.environ.get("BACEN_HTTP_TAXA", "5"))
+RAJADA_PADRAO = int(os.environ.get("BACEN_HTTP_RAJADA", "10"))
+TENTATIVAS_PADRAO = int(os.environ.get("BACEN_HTTP_TENTATIVAS", "3"))
+CONEXOES_POR_HOST = int(os.environ.get("BACEN_HTTP_CONEXOES", "16"))
+
+STATUS_TRANSITORIOS = (429, 500, 502, 503, 504)
+
+_trava = threading.Lock()
+_sessao = None
+_estatisticas = {"requisicoes": 0, "conexoes_novas": 0, "conexoes_reutilizadas": 0, "espera_limite": 0.0}
+
+
+# ================= LIMITE DE TAXA =================
+class BaldeTokens:
+    """
+    Balde de tokens: enche a `taxa` tokens por segundo até `capacidade`;
+    cada requisição consome um token e espera quando o balde está vazio.
+    """
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = max(1, capacidade)
+        self._tokens = float(self.capacidade)
+        self._atualizado = time.monotonic()
+        self._trava = threading.Lock()
+
+    def _retirar(self):
+        """Pega um token: 0 se conseguiu, senão quantos segundos faltam para o próximo"""
+        with self._trava:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.taxa
+
+    def consumir(self):
+        """Retorna quantos segundos esperou pelo token"""
+        if self.taxa <= 0:
+            return 0.0
+
+        esperou = 0.0
+        while True:
+            espera = self._retirar()
+            if not espera:
+                return esperou
+            time.sleep(espera)
+            esperou += espera
+
+    async def consumir_async(self):
+        """Como consumir, mas espera sem bloquear o laço de eventos"""
+        if self.taxa <= 0:
+            return 0.0
+
+        esperou = 0.0
+        while True:
+            espera = self._retirar()
+            if not espera:
+                return esperou
+            await asyncio.sleep(espera)
+            esperou += espera
+
+
+def _contar_espera(esperou):
+    if not esperou:
+        return
+    with _trava:
+        _estatisticas["espera_limite"] += esperou
+    incrementar("bacen_http_espera_limite_segundos_total", esperou)
+
+
+# ================= NOVAS TENTATIVAS =================
+class _TentativasLimitadas(Retry):
+    """
+    Retry do urllib3 em que cada nova tentativa, depois do backoff, pega um
+    token do balde: as repetições acontecem dentro de HTTPAdapter.send, e sem
+    isso uma onda de 429/5xx passaria do limite de taxa justamente quando ele
+    mais importa
+    """
+
+    def __init__(self, *args, balde=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.balde = balde
+
+    def new(self, **kwargs):
+        # O urllib3 cria um Retry novo a cada tentativa
+        tentativas = super().new(**kwargs)
+        tentativas.balde = self.balde
+        return tentativas
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.balde is not None:
+            _contar_espera(self.balde.consumir())
+
+
+# ================= ADAPTADOR =================
+class _AdaptadorBacen(HTTPAdapter):
+    """HTTPAdapter que respeita o balde de tokens e conta o reuso de conexões"""
+
+    def __init__(self, balde, **kwargs):
+        self.balde = balde
+        self._conexoes_contadas = 0
+        super().__init__(**kwargs)
+
+    def _conexoes_criadas(self):
+        pools = self.poolmanager.pools
+        return sum(pools[chave].num_connections for chave in pools.keys() if chave in pools)
+
+    def send(self, request, **kwargs):
+        esperou = self.balde.consumir()
+        resposta = super().send(request, **kwargs)
+
+        # Os pools do urllib3 contam as conexões abertas; o que passou disso
+        # desde a última requisição são conexões novas, o resto foi reuso
+        with _trava:
+            criadas = self._conexoes_criadas()
+            novas = max(0, criadas - self._conexoes_contadas)
+            self._conexoes_contadas = max(criadas, self._conexoes_contadas)
+            reutilizadas = 0 if novas else 1
+            _estatisticas["requisicoes"] += 1
+            _estatisticas["conexoes_novas"] += novas
+            _estatisticas["conexoes_reutilizadas"] += reutilizadas
+        if novas:
+            incrementar("bacen_http_conexoes_total", novas, conexao="nova")
+        if reutilizadas:
+            incrementar("bacen_http_conexoes_total", conexao="reutilizada")
+        _contar_espera(esperou)
+        return resposta
+
+
+# ================= SESSÃO =================
+def criar_sessao(taxa=TAXA_PADRAO, rajada=RAJADA_PADRAO, tentativas=TENTATIVAS_PADRAO, conexoes=CONEXOES_POR_HOST):
+    balde = BaldeTokens(taxa, rajada)
+    retry = _TentativasLimitadas(
+        total=tentativas,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        backoff_max=30,
+        status_forcelist=STATUS_TRANSITORIOS,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        balde=balde,
+    )
+    adaptador = _AdaptadorBacen(
+        balde,
+        pool_connections=4,
+        pool_maxsize=conexoes,
+        max_retries=retry,
+    )
+
+    sessao = requests.Session()
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+def obter_sessao():
+    """Sessão única do processo (criada na primeira chamada)"""
+    global _sessao
+    if _sessao is None:
+        with _trava:
+            if _sessao is None:
+                _sessao = criar_sessao()
+    return _sessao
+
+
+def obter_balde():
+    """
+    Balde de tokens da sessão do processo, para outros clientes HTTP (ex.:
+    bacen.lote, com aiohttp) dividirem o mesmo limite de taxa
+    """
+    return obter_sessao().get_adapter("https://").balde
+
+
+def estatisticas():
+    """
+    Requisições feitas, conexões novas x reutilizadas e tempo total de espera
+    imposto pelo limite de taxa
+    """
+    with _trava:
+        dados = dict(_estatisticas)
+    dados["taxa_reuso"] = dados["conexoes_reutilizadas"] / dados["requisicoes"] if dados["requisicoes"] else 0.0
+    return dados
+
+
+descrever("bacen_http_conexoes_total", "Requisições ao BACEN por tipo de conexão (nova ou reutilizada)")
+descrever("bacen_http_espera_limite_segundos_total", "Tempo de espera imposto pelo limite de taxa")
@@ -0,0 +1,149 @@
+"""
+Detecção rápida do encoding dos arquivos de ranking do BACEN.
+
+As estratégias são tentadas da mais barata para a mais cara:
+
+1. BOM no início do arquivo
+2. UTF-8 estrito
+3. Encodings usados pelo BACEN (cp1252/latin1), validados pelos nomes
+   esperados no cabeçalho ('Instituição', 'Índice')
+4. chardet sobre uma amostra limitada, só como último recurso
+
+O tempo gasto em cada estratégia fica registrado no resultado.
+
+Para comparar com o chardet sobre o arquivo inteiro:
+    python -m bacen.codificacao arquivo.csv [arquivo2.csv ...]
+"""
+import codecs
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+
+from bacen.metricas import observar
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_AMOSTRA = 64 * 1024
+TAMANHO_BLOCO = 1024 * 1024
+
+ENCODINGS_BACEN = ("cp1252", "latin1")
+TOKENS_CABECALHO = ("Instituição", "Índice")
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+@dataclass
+class DeteccaoEncoding:
+    encoding: str
+    estrategia: str
+    tempos: dict = field(default_factory=dict)
+
+
+# ================= ESTRATÉGIAS =================
+def _por_bom(amostra):
+    for bom, encoding in BOMS:
+        if amostra.startswith(bom):
+            return encoding
+    return None
+
+
+def _utf8_estrito(caminho, amostra):
+    """
+    Valida a amostra como UTF-8. Se ela for só ASCII, o restante do arquivo
+    também precisa ser verificado, pois os acentos podem aparecer depois.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        decoder.decode(amostra, final=False)
+        if not amostra.isascii():
+            return "utf-8"
+
+        with open(caminho, "rb") as arquivo:
+            arquivo.seek(len(amostra))
+            for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b""):
+                decoder.decode(bloco, final=False)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return None
+    return "utf-8"
+
+
+def _encodings_bacen(amostra):
+    for encoding in ENCODINGS_BACEN:
+        try:
+            texto = amostra.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        if any(token in texto for token in TOKENS_CABECALHO):
+            return encoding
+    return None
+
+
+def _chardet_amostra(amostra):
+    import chardet
+
+    return chardet.detect(amostra)["encoding"]
+
+
+# ================= DETECÇÃO =================
+def detectar_encoding(caminho, encoding_padrao="latin1"):
+    """
+    Detecta o encoding de um arquivo lendo apenas o necessário dele
+    """
+    tempos = {}
+
+    with open(caminho, "rb") as arquivo:
+        amostra = arquivo.read(TAMANHO_AMOSTRA)
+
+    estrategias = (
+        ("bom", lambda: _por_bom(amostra)),
+        ("utf-8", lambda: _utf8_estrito(caminho, amostra)),
+        ("bacen", lambda: _encodings_bacen(amostra)),
+        ("chardet", lambda: _chardet_amostra(amostra)),
+    )
+
+    resultado = DeteccaoEncoding(encoding_padrao, "padrao", tempos)
+    for nome, estrategia in estrategias:
+        inicio = time.perf_counter()
+        encoding = estrategia()
+        tempos[nome] = time.perf_counter() - inicio
+        if encoding:
+            resultado = DeteccaoEncoding(encoding, nome, tempos)
+            break
+
+    observar("encoding", sum(tempos.values()))
+    logger.debug(
+        "encoding %s (%s) em %s: %s",
+        resultado.encoding,
+        resultado.estrategia,
+        caminho,
+        ", ".join(f"{nome}={segundos * 1000:.2f}ms" for nome, segundos in tempos.items()),
+    )
+    return resultado
+
+
+def main(argv=None):
+    import chardet
+
+    for caminho in (argv if argv is not None else sys.argv[1:]):
+        resultado = detectar_encoding(caminho)
+        total = sum(resultado.tempos.values())
+
+        with open(caminho, "rb") as arquivo:
+            conteudo = arquivo.read()
+        inicio = time.perf_counter()
+        referencia = chardet.detect(conteudo)["encoding"]
+        tempo_chardet = time.perf_counter() - inicio
+
+        detalhes = ", ".join(f"{nome}={segundos * 1000:.2f}ms" for nome, segundos in resultado.tempos.items())
+        print(f"{caminho}: {resultado.encoding} via {resultado.estrategia} em {total * 1000:.2f}ms ({detalhes})")
+        print(f"{' ' * len(caminho)}  chardet no arquivo inteiro: {referencia} em {tempo_chardet * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
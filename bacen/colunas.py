@@ -0,0 +1,116 @@
+"""
+Identificação das colunas de instituição e de reclamações nos CSVs do BACEN,
+cujos nomes variam entre tipos de instituição e ao longo dos anos.
+
+O resultado é guardado por assinatura do cabeçalho: arquivos (e reruns) com
+o mesmo layout resolvem as colunas com uma única consulta ao cache.
+"""
+import functools
+import re
+from dataclasses import dataclass, field
+
+POSSIVEIS_COLUNAS_INSTITUICAO = [
+    'Instituição', 'Instituição financeira', 'Administradora de consórcio',
+    'Instituição Financeira', 'Administradora de Consórcio'
+]
+
+TERMOS_INSTITUICAO = ['instituição', 'administradora', 'banco', 'financeira', 'nome']
+
+# Lista de padrões (expressões regulares, sobre o nome em minúsculas) para buscar colunas de reclamações
+PADROES_RECLAMACOES = {
+    'Reguladas Procedentes': ['procedente', 'regulada.*procedente', 'reclamações.*procedente'],
+    'Reguladas Outras': ['regulada.*outra', 'outra.*regulada', 'reclamações.*outra'],
+    'Não Reguladas': ['não.*regulada', 'nao.*regulada', 'não regulada', 'nao regulada', 'reclamações.*não.*regulada'],
+    'Total Reclamações': ['total.*reclamação', 'reclamações.*total', 'quantidade.*total']
+}
+
+# Se não encontrou pelo padrão, tentar nomes exatos
+NOMES_EXATOS = {
+    'Reguladas Procedentes': 'Quantidade de reclamações reguladas procedentes',
+    'Reguladas Outras': 'Quantidade de reclamações reguladas - outras',
+    'Não Reguladas': 'Quantidade de reclamações não reguladas',
+    'Total Reclamações': 'Quantidade total de reclamações'
+}
+
+
+# Padrões compilados uma única vez: um regex por tipo de reclamação
+_REGEX_RECLAMACOES = {
+    tipo_nome: re.compile("|".join(f"(?:{padrao})" for padrao in padroes))
+    for tipo_nome, padroes in PADROES_RECLAMACOES.items()
+}
+_REGEX_INSTITUICAO = re.compile("|".join(re.escape(termo) for termo in TERMOS_INSTITUICAO))
+
+
+@dataclass(frozen=True)
+class Esquema:
+    """Colunas identificadas em um cabeçalho"""
+    instituicao: str = None
+    reclamacoes: dict = field(default_factory=dict)
+    cnpj: str = None
+
+
+def _resolver_instituicao(colunas):
+    if not colunas:
+        return None
+
+    for col in POSSIVEIS_COLUNAS_INSTITUICAO:
+        if col in colunas:
+            return col
+
+    # Se não encontrou, usar a primeira coluna que parece ser de instituição
+    for col in colunas:
+        if _REGEX_INSTITUICAO.search(str(col).lower()):
+            return col
+
+    # Usar a primeira coluna como fallback
+    return colunas[0]
+
+
+def _resolver_reclamacoes(colunas):
+    colunas_encontradas = {}
+    minusculas = [(col, str(col).lower()) for col in colunas]
+
+    for tipo_nome, regex in _REGEX_RECLAMACOES.items():
+        for col, col_lower in minusculas:
+            if regex.search(col_lower):
+                colunas_encontradas[tipo_nome] = col
+                break
+
+    for tipo_nome, nome_exato in NOMES_EXATOS.items():
+        if tipo_nome not in colunas_encontradas and nome_exato in colunas:
+            colunas_encontradas[tipo_nome] = nome_exato
+
+    return colunas_encontradas
+
+
+def _resolver_cnpj(colunas):
+    return next((col for col in colunas if 'cnpj' in str(col).lower()), None)
+
+
+@functools.lru_cache(maxsize=256)
+def _resolver(cabecalho):
+    colunas = list(cabecalho)
+    return Esquema(_resolver_instituicao(colunas), _resolver_reclamacoes(colunas), _resolver_cnpj(colunas))
+
+
+def resolver_esquema(colunas):
+    """
+    Retorna o Esquema (colunas de instituição, de reclamações e de CNPJ) do
+    cabeçalho, calculado uma vez por layout. Não altere o dicionário
+    `reclamacoes` retornado: ele é compartilhado entre as chamadas.
+    """
+    return _resolver(tuple(colunas))
+
+
+def identificar_coluna_instituicao(colunas):
+    """
+    Retorna a coluna com o nome da instituição (ou a primeira coluna, se nenhuma parecer ser)
+    """
+    return resolver_esquema(colunas).instituicao
+
+
+def identificar_colunas_reclamacoes(colunas):
+    """
+    Retorna {tipo de reclamação: nome da coluna} para as colunas encontradas
+    """
+    return dict(resolver_esquema(colunas).reclamacoes)
@@ -0,0 +1,174 @@
+"""
+Comparação entre dois períodos do ranking: quem subiu ou desceu, quanto
+variaram o Índice e as reclamações, quem entrou e quem saiu.
+
+As instituições dos dois períodos são casadas com um único merge vetorizado
+(pelo CNPJ quando os dois arquivos trazem essa coluna, senão pelo nome sem
+acentos, maiúsculas e pontuação) e a comparação de cada par de períodos
+fica em cache em memória.
+
+    from bacen.comparacao import obter_comparacao
+    comparacao = obter_comparacao(
+        ("Bancos+e+financeiras", 2023, "TRIMESTRAL", 3),
+        ("Bancos+e+financeiras", 2023, "TRIMESTRAL", 4),
+    )
+    comparacao.subiram(10)
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from bacen.busca import normalizar_cnpj, normalizar_nome
+from bacen.cache_memoria import CacheMemoria
+from bacen.colunas import resolver_esquema
+from bacen.dados import obter_periodo, uso_memoria
+from bacen.metricas import cronometrar
+from bacen.numeros import converter_numeros
+from bacen.series import COLUNAS_VALORES
+
+NOVA = 'nova'
+SAIU = 'saiu'
+EM_AMBOS = 'ambos'
+
+
+@dataclass
+class Comparacao:
+    """
+    `tabela` tem uma linha por instituição: instituicao, situacao (nova, saiu
+    ou ambos), posicao_anterior/posicao_atual, variacao_posicao (positiva =
+    subiu) e, para o Índice e cada tipo de reclamação, <coluna>_anterior,
+    <coluna>_atual e <coluna>_variacao
+    """
+    tabela: pd.DataFrame
+    anterior: Tuple
+    atual: Tuple
+    por_cnpj: bool = False
+
+    def _em_ambos(self):
+        return self.tabela[self.tabela['situacao'] == EM_AMBOS]
+
+    def subiram(self, limite=20):
+        em_ambos = self._em_ambos()
+        return em_ambos[em_ambos['variacao_posicao'] > 0].nlargest(limite, 'variacao_posicao')
+
+    def desceram(self, limite=20):
+        em_ambos = self._em_ambos()
+        return em_ambos[em_ambos['variacao_posicao'] < 0].nsmallest(limite, 'variacao_posicao')
+
+    def maiores_variacoes(self, coluna='Índice', limite=20):
+        """Maiores variações absolutas (para cima ou para baixo) da coluna"""
+        variacao = self.tabela[f'{coluna}_variacao']
+        return self.tabela.loc[variacao.abs().dropna().nlargest(limite).index]
+
+    def novas(self):
+        return self.tabela[self.tabela['situacao'] == NOVA]
+
+    def sairam(self):
+        return self.tabela[self.tabela['situacao'] == SAIU]
+
+
+# ================= COMPARAÇÃO =================
+def _lado(resultado, por_cnpj):
+    """Uma linha por instituição do período, com a chave de junção e a posição"""
+    df = resultado.df
+    esquema = resolver_esquema(df.columns) if df is not None else None
+    if resultado.vazio or esquema.instituicao is None:
+        return pd.DataFrame(columns=['chave', 'instituicao', 'posicao'] + COLUNAS_VALORES)
+
+    nomes = df[esquema.instituicao].astype(object).to_numpy()
+    posicoes = resultado.ranking.posicoes()
+    lado = pd.DataFrame({
+        'instituicao': nomes,
+        'posicao': posicoes if posicoes is not None else np.nan,
+    })
+    colunas = {'Índice': 'Índice' if 'Índice' in df.columns else None, **esquema.reclamacoes}
+    for nome in COLUNAS_VALORES:
+        coluna = colunas.get(nome)
+        lado[nome] = converter_numeros(df[coluna]).to_numpy(dtype='float64') if coluna else np.nan
+
+    if por_cnpj:
+        lado['chave'] = [normalizar_cnpj(valor) for valor in df[esquema.cnpj].to_numpy(dtype=object, na_value=None)]
+    else:
+        # Normaliza cada nome distinto uma vez e espalha com map
+        distintos = pd.unique(lado['instituicao'].dropna())
+        lado['chave'] = lado['instituicao'].map({nome: normalizar_nome(nome) for nome in distintos})
+
+    # Nome repetido no arquivo: vale a primeira linha, como no resto do app
+    return lado.dropna(subset=['chave']).drop_duplicates('chave', keep='first')
+
+
+@cronometrar("comparacao")
+def comparar_resultados(resultado_anterior, resultado_atual, anterior=(), atual=()):
+    """
+    Compara dois Resultados já limpos (do período `anterior` para o `atual`)
+    """
+    esquemas = [
+        resolver_esquema(resultado.df.columns) if resultado.df is not None else None
+        for resultado in (resultado_anterior, resultado_atual)
+    ]
+    por_cnpj = all(esquema is not None and esquema.cnpj for esquema in esquemas)
+
+    tabela = pd.merge(
+        _lado(resultado_anterior, por_cnpj),
+        _lado(resultado_atual, por_cnpj),
+        on='chave',
+        how='outer',
+        suffixes=('_anterior', '_atual'),
+        indicator=True,
+    )
+
+    tabela.insert(0, 'instituicao', tabela['instituicao_atual'].fillna(tabela['instituicao_anterior']))
+    situacao = tabela.pop('_merge').map({'left_only': SAIU, 'right_only': NOVA, 'both': EM_AMBOS})
+    tabela.insert(1, 'situacao', situacao.astype(object))
+    for lado in ('anterior', 'atual'):
+        tabela[f'posicao_{lado}'] = tabela[f'posicao_{lado}'].astype('Int64')
+    tabela['variacao_posicao'] = tabela['posicao_anterior'] - tabela['posicao_atual']
+    for nome in COLUNAS_VALORES:
+        tabela[f'{nome}_variacao'] = tabela[f'{nome}_atual'] - tabela[f'{nome}_anterior']
+
+    tabela = (
+        tabela.drop(columns=['chave'])
+        .sort_values(['posicao_atual', 'posicao_anterior'], na_position='last', kind='stable')
+        .reset_index(drop=True)
+    )
+    return Comparacao(tabela, tuple(anterior), tuple(atual), por_cnpj)
+
+
+_cache_comparacoes = CacheMemoria(
+    ttl=600,
+    max_itens=32,
+    nome="comparacoes",
+    tamanho=lambda comparacao: uso_memoria(comparacao.tabela),
+)
+
+
+def obter_comparacao(anterior, atual):
+    """
+    Compara dois períodos (tuplas tipo, ano, periodicidade, periodo), com a
+    comparação de cada par guardada em cache
+    """
+    chave = tuple(tuple(str(parte) for parte in periodo) for periodo in (anterior, atual))
+    return _cache_comparacoes.obter(
+        chave,
+        lambda: comparar_resultados(obter_periodo(*anterior), obter_periodo(*atual), anterior, atual)
+    )
+
+
+def periodo_anterior(indice_catalogo, tipo, ano, periodicidade, periodo):
+    """
+    O período imediatamente anterior com a mesma periodicidade (voltando ao
+    ano anterior se for o primeiro do ano), ou None
+    """
+    anos = list(indice_catalogo.get(tipo, {}))
+    if ano not in anos:
+        return None
+    periodos = indice_catalogo[tipo][ano].get(periodicidade, [])
+    if periodo in periodos and periodos.index(periodo) > 0:
+        return tipo, ano, periodicidade, periodos[periodos.index(periodo) - 1]
+    for ano_anterior in reversed(anos[:anos.index(ano)]):
+        periodos = indice_catalogo[tipo][ano_anterior].get(periodicidade, [])
+        if periodos:
+            return tipo, ano_anterior, periodicidade, periodos[-1]
+    return None
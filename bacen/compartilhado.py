@@ -0,0 +1,161 @@
+"""
+Períodos já limpos compartilhados entre processos (réplicas do Streamlit, API,
+workers) em arquivos Arrow IPC (Feather, sem compressão) mapeados em memória.
+
+O primeiro processo que precisa de um período faz o download e a limpeza e
+grava o arquivo; todos (inclusive ele) abrem o arquivo com mmap. As colunas
+numéricas e os textos (string do Arrow) apontam direto para as páginas do
+arquivo, que ficam uma única vez no page cache do sistema para todas as
+réplicas, e a leitura fria custa só trazer as páginas, sem parse. Um lock de
+arquivo por período garante que só um processo materializa cada um.
+
+Só períodos fechados (já encerrados, ver cache_disco.periodo_fechado) são
+compartilhados: os que ainda não terminaram podem mudar e seguem o caminho
+normal, com revalidação.
+
+    BACEN_COMPARTILHADO      0 desliga o compartilhamento (padrão 1)
+    BACEN_COMPARTILHADO_DIR  diretório dos arquivos (padrão <BACEN_CACHE_DIR>/ipc)
+"""
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from bacen import cache_disco
+from bacen.metricas import cronometrar, incrementar
+from bacen.resultado import Resultado
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos, só entre threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ================= CONFIGURAÇÃO =================
+ATIVO = os.environ.get("BACEN_COMPARTILHADO", "1") != "0"
+DIRETORIO_PADRAO = os.environ.get("BACEN_COMPARTILHADO_DIR", os.path.join(cache_disco.DIRETORIO_PADRAO, "ipc"))
+
+_trava = threading.Lock()
+
+
+def caminho_periodo(chave, diretorio=DIRETORIO_PADRAO):
+    texto = "|".join(str(parte) for parte in chave)
+    return os.path.join(diretorio, f"{hashlib.sha256(texto.encode('utf-8')).hexdigest()}.arrow")
+
+
+# ================= LOCK ENTRE PROCESSOS =================
+@contextmanager
+def _lock_arquivo(caminho):
+    if fcntl is None:
+        with _trava:
+            yield
+        return
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(f"{caminho}.lock", "a+b") as arquivo:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+
+
+# ================= LEITURA E GRAVAÇÃO =================
+@cronometrar("arrow_mmap")
+def ler(caminho):
+    """
+    Abre o arquivo com mmap e devolve o DataFrame sem copiar as colunas
+    numéricas e de texto; None se o arquivo não existe (ou está corrompido)
+    """
+    if not os.path.exists(caminho):
+        return None
+
+    import pandas as pd
+    import pyarrow as pa
+
+    try:
+        with pa.memory_map(caminho, "r") as origem:
+            tabela = pa.ipc.open_file(origem).read_all()
+    except (OSError, pa.ArrowInvalid) as e:
+        logger.warning("Arquivo compartilhado inválido, será refeito: %s (%s)", caminho, e)
+        return None
+
+    def tipo_pandas(tipo):
+        # Textos continuam string do Arrow (apontando para o mmap), como em
+        # tipar_colunas; sem isso viram objetos Python, copiados e com o dobro do tamanho
+        if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+            return pd.StringDtype("pyarrow")
+        return None
+
+    # split_blocks evita juntar colunas do mesmo tipo em um bloco (o que copiaria)
+    return tabela.to_pandas(split_blocks=True, types_mapper=tipo_pandas)
+
+
+def gravar(caminho, df):
+    """
+    Grava o DataFrame como Arrow IPC sem compressão (requisito do mmap sem
+    cópia), de forma atômica
+    """
+    import pyarrow as pa
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(temporario, "wb") as destino:
+            with pa.ipc.new_file(destino, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def remover(chave, diretorio=DIRETORIO_PADRAO):
+    """
+    Apaga o arquivo do período (ex.: ele mudou no catálogo); quem já o tem
+    mapeado continua lendo a versão antiga até soltar o DataFrame
+    """
+    caminho = caminho_periodo(chave, diretorio)
+    with _lock_arquivo(caminho):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def obter(chave, fabrica, diretorio=DIRETORIO_PADRAO):
+    """
+    Resultado do período lido do arquivo compartilhado. Se ainda não existe,
+    um único processo executa fabrica() (que devolve um Resultado) e grava o
+    arquivo; os outros esperam no lock e depois leem o mesmo arquivo.
+    Resultados com erro ou vazios não são compartilhados.
+    """
+    import pyarrow as pa
+
+    caminho = caminho_periodo(chave, diretorio)
+    df = ler(caminho)
+    if df is not None:
+        incrementar("bacen_cache_total", cache="compartilhado", resultado="acerto")
+        return Resultado(df)
+
+    with _lock_arquivo(caminho):
+        # Outro processo pode ter gravado enquanto este esperava o lock
+        df = ler(caminho)
+        if df is not None:
+            incrementar("bacen_cache_total", cache="compartilhado", resultado="acerto")
+            return Resultado(df)
+
+        incrementar("bacen_cache_total", cache="compartilhado", resultado="falha")
+        resultado = fabrica()
+        if resultado.erro or resultado.vazio:
+            return resultado
+        try:
+            gravar(caminho, resultado.df)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning("Não foi possível compartilhar o período %s: %s", chave, e)
+            return resultado
+
+    # Este processo também passa a usar as páginas do arquivo, não a cópia parseada
+    df = ler(caminho)
+    return Resultado(df, resultado.avisos) if df is not None else resultado
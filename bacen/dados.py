@@ -0,0 +1,665 @@
+"""
+Pipeline de dados do ranking de reclamações do BACEN: catálogo, download,
+leitura e limpeza dos arquivos CSV.
+"""
+import hashlib
+import logging
+import os
+import time
+from csv import QUOTE_MINIMAL, QUOTE_NONE, reader
+from dataclasses import replace
+
+import pandas as pd
+
+from bacen import armazem, busca, compartilhado, series
+from bacen.cache_disco import CacheDisco, chave_periodo, parametros_da_url, periodo_fechado
+from bacen.cache_memoria import CacheMemoria
+from bacen.codificacao import detectar_encoding
+from bacen.colunas import identificar_coluna_instituicao
+from bacen.dialeto import (
+    confere_com_amostra,
+    detectar_dialeto,
+    dialeto_da_familia,
+    esquecer_dialeto,
+    guardar_dialeto,
+)
+from bacen.metricas import cronometrar, incrementar, medir
+from bacen.numeros import colunas_numericas, converter_numeros
+from bacen.resultado import Resultado
+from bacen.voo_unico import VooUnico
+
+logger = logging.getLogger(__name__)
+
+# Endereço da API de ranking do BACEN (pode apontar para um espelho ou servidor local)
+URL_BASE = os.environ.get("BACEN_URL_BASE", "https://www3.bcb.gov.br/rdrweb/rest/ext/ranking")
+
+# Sessões que pedem o mesmo período ao mesmo tempo esperam por uma única execução
+_voos_download = VooUnico("baixar_csv")
+_voos_periodo = VooUnico("carregar_periodo")
+
+
+# ================= CATÁLOGO =================
+@cronometrar("catalogo")
+def load_data():
+    from bacen.cliente_http import obter_sessao
+
+    response = obter_sessao().get(URL_BASE, timeout=30)
+    response.raise_for_status()
+
+    data = response.json()
+
+    df = pd.json_normalize(
+        data,
+        record_path=['anos', 'periodicidades', 'periodos', 'tipos'],
+        meta=[
+            ['anos', 'ano'],
+            ['anos', 'periodicidades', 'periodicidade'],
+            ['anos', 'periodicidades', 'periodos', 'periodo']
+        ]
+    )
+
+    df.columns = ['tipo', 'ano', 'periodicidade', 'periodo']
+    return df, construir_indice_catalogo(df)
+
+
+def construir_indice_catalogo(df):
+    """
+    Monta o índice tipo -> ano -> periodicidade -> [periodos] do catálogo.
+    Tipos e anos ficam ordenados; periodicidades e períodos seguem a ordem do BACEN.
+    """
+    indice = {}
+    colunas = df[['tipo', 'ano', 'periodicidade', 'periodo']].dropna()
+    for tipo, ano, periodicidade, periodo in colunas.itertuples(index=False, name=None):
+        periodos = indice.setdefault(tipo, {}).setdefault(ano, {}).setdefault(periodicidade, [])
+        if periodo not in periodos:
+            periodos.append(periodo)
+
+    return {
+        tipo: {ano: indice[tipo][ano] for ano in sorted(indice[tipo])}
+        for tipo in sorted(indice)
+    }
+
+
+def gerar_link_csv(ano, periodicidade, periodo, tipo):
+    base = f"{URL_BASE}/arquivo"
+    return f"{base}?ano={ano}&periodicidade={periodicidade}&periodo={periodo}&tipo={tipo}"
+
+
+# ================= DOWNLOAD E LEITURA CSV =================
+# O corpo da resposta vai em blocos direto para o cache em disco e é lido de lá
+# pelo leitor de CSV do pyarrow, sem decodificar o texto inteiro em memória.
+TAMANHO_BLOCO = 64 * 1024
+TAMANHO_AMOSTRA = 64 * 1024
+
+
+def baixar_para_arquivo(response, destino):
+    """
+    Grava o corpo da resposta em disco bloco a bloco e retorna o sha256 do conteúdo
+    """
+    sha = hashlib.sha256()
+    total = 0
+
+    with open(destino, "wb") as arquivo:
+        for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+            if not bloco:
+                continue
+            arquivo.write(bloco)
+            sha.update(bloco)
+            total += len(bloco)
+
+    incrementar("bacen_bytes_baixados_total", total)
+    incrementar("bacen_downloads_total")
+    return sha.hexdigest()
+
+
+def _normalizar_encoding(encoding):
+    if not encoding:
+        return "latin1"
+    if encoding.lower() == "ascii":
+        return "utf-8"
+    return encoding
+
+
+class _LinhasMalformadas(Exception):
+    """O arquivo tem linhas com mais ou menos campos que o cabeçalho"""
+
+    def __init__(self, curtas, longas):
+        self.curtas, self.longas = curtas, longas
+        partes = []
+        if curtas:
+            partes.append(f"{curtas} linha(s) com menos campos que o cabeçalho foram completadas com vazios")
+        if longas:
+            partes.append(f"{longas} linha(s) com mais campos que o cabeçalho foram descartadas")
+        super().__init__("; ".join(partes))
+
+
+def _desduplicar_nomes(nomes):
+    """
+    Nomes de coluna repetidos ganham sufixo .1, .2... como no pandas.read_csv
+    """
+    contagens = {}
+    unicos = []
+    for nome in nomes:
+        contagem = contagens.get(nome, 0)
+        while contagem > 0:
+            contagens[nome] = contagem + 1
+            nome = f"{nome}.{contagem}"
+            contagem = contagens.get(nome, 0)
+        unicos.append(nome)
+        contagens[nome] = contagem + 1
+    return unicos
+
+
+def ler_csv_arrow(caminho, encoding, dialeto, colunas):
+    """
+    Lê o arquivo com pyarrow.csv, mantendo todas as colunas como texto.
+    Linhas com número de campos diferente do cabeçalho levantam
+    _LinhasMalformadas (o pyarrow as descartaria em silêncio).
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    malformadas = {"curtas": 0, "longas": 0}
+
+    def contar_malformada(linha):
+        malformadas["curtas" if linha.actual_columns < linha.expected_columns else "longas"] += 1
+        return "skip"
+
+    tabela = pa_csv.read_csv(
+        caminho,
+        read_options=pa_csv.ReadOptions(encoding=encoding, skip_rows=dialeto.linha_cabecalho),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=dialeto.delimitador,
+            quote_char='"' if dialeto.aspas else False,
+            invalid_row_handler=contar_malformada
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={nome: pa.string() for nome in colunas},
+            strings_can_be_null=True
+        )
+    )
+    if malformadas["curtas"] or malformadas["longas"]:
+        raise _LinhasMalformadas(malformadas["curtas"], malformadas["longas"])
+    tabela = tabela.rename_columns(_desduplicar_nomes(tabela.column_names))
+    return tabela.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _nomes_colunas(amostra, dialeto):
+    linhas = amostra.splitlines()
+    if dialeto.linha_cabecalho >= len(linhas):
+        return []
+    return next(reader([linhas[dialeto.linha_cabecalho]], delimiter=dialeto.delimitador), [])
+
+
+def _ler_com_dialeto(caminho, encoding, dialeto, amostra, avisos):
+    """
+    Lê o arquivo uma única vez com o dialeto informado
+    """
+    try:
+        return ler_csv_arrow(caminho, encoding, dialeto, _nomes_colunas(amostra, dialeto)), None
+    except _LinhasMalformadas as e:
+        # O leitor do pandas completa as linhas curtas com vazios, como antes
+        avisos.append(f"Arquivo com linhas fora do formato: {e}.")
+    except Exception as e:
+        avisos.append(f"Leitura rápida falhou: {str(e)[:100]}... Tentando método alternativo.")
+
+    try:
+        df = pd.read_csv(
+            caminho,
+            sep=dialeto.delimitador,
+            skiprows=dialeto.linha_cabecalho,
+            quoting=QUOTE_MINIMAL if dialeto.aspas else QUOTE_NONE,
+            dtype=str,
+            encoding=encoding,
+            encoding_errors="ignore",
+            on_bad_lines='warn'
+        )
+        return df, None
+    except Exception as e:
+        # Retornar DataFrame vazio
+        return pd.DataFrame(), f"Não foi possível ler o arquivo CSV. Erro: {str(e)[:200]}"
+
+
+@cronometrar("leitura_csv")
+def ler_csv_arquivo(caminho, encoding=None, familia=None):
+    """
+    Lê um CSV do BACEN. O dialeto (delimitador, linha do cabeçalho e aspas) é
+    detectado numa passada sobre o início do arquivo, ou reaproveitado de
+    outro arquivo da mesma família (tipo, periodicidade).
+    Retorna um Resultado com o DataFrame e os avisos da leitura.
+    """
+    encoding = _normalizar_encoding(encoding or detectar_encoding(caminho).encoding)
+
+    with open(caminho, "rb") as arquivo:
+        amostra = arquivo.read(TAMANHO_AMOSTRA).decode(encoding, errors="ignore")
+
+    avisos = []
+    dialeto = dialeto_da_familia(familia) if familia else None
+    if dialeto is not None and not confere_com_amostra(dialeto, amostra):
+        dialeto = None
+    if dialeto is not None:
+        if not dialeto.aspas and '"' in amostra:
+            dialeto = replace(dialeto, aspas=True)
+        df, erro = _ler_com_dialeto(caminho, encoding, dialeto, amostra, avisos)
+        if df.shape[1] > 1:
+            return Resultado(df, avisos)
+        # O formato da família mudou: detectar de novo
+        esquecer_dialeto(familia)
+
+    dialeto = detectar_dialeto(amostra)
+    df, erro = _ler_com_dialeto(caminho, encoding, dialeto, amostra, avisos)
+    if familia and df.shape[1] > 1:
+        guardar_dialeto(familia, dialeto)
+    return Resultado(df, avisos, erro)
+
+
+def _baixar_para_cache(cache, url, cabecalhos):
+    """
+    Baixa o arquivo para o cache em disco.
+    Retorna None se o servidor respondeu 304 (arquivo não mudou).
+    """
+    from bacen.cliente_http import obter_sessao
+
+    temporario = cache.novo_temporario()
+    try:
+        with medir("download"), obter_sessao().get(url, headers=cabecalhos, timeout=30, stream=True) as response:
+            if response.status_code == 304 and cabecalhos:
+                return None
+            response.raise_for_status()
+            sha = baixar_para_arquivo(response, temporario)
+        caminho = cache.guardar_bruto(temporario, sha)
+        encoding = detectar_encoding(caminho).encoding
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    return caminho, sha, encoding, response.headers
+
+
+def baixar_csv(url):
+    """
+    Baixa (ou lê do cache em disco) o arquivo de ranking de um link de gerar_link_csv.
+    Retorna um Resultado; erros de rede são propagados como exceção.
+    Chamadas simultâneas para o mesmo período compartilham um único download.
+    """
+    chave = chave_periodo(*parametros_da_url(url))
+    return _voos_download.executar(chave, lambda: _baixar_csv(url, chave))
+
+
+def _baixar_csv(url, chave):
+    ano, periodicidade, periodo, tipo = parametros_da_url(url)
+    cache = CacheDisco()
+
+    # Períodos fechados (ou revalidados há pouco) saem direto do disco
+    meta = cache.ler_meta(chave)
+    if meta and not cache.precisa_revalidar(meta):
+        resultado = ler_csv_do_cache(cache, meta)
+        if resultado is not None:
+            incrementar("bacen_cache_total", cache="disco", resultado="acerto")
+            return resultado
+
+    baixado = _baixar_para_cache(cache, url, cache.cabecalhos_condicionais(meta))
+
+    if baixado is None:
+        resultado = ler_csv_do_cache(cache, meta)
+        if resultado is not None:
+            cache.renovar(chave, meta)
+            incrementar("bacen_cache_total", cache="disco", resultado="revalidado")
+            return resultado
+        # O arquivo local sumiu: baixar de novo sem condição
+        baixado = _baixar_para_cache(cache, url, {})
+
+    incrementar("bacen_cache_total", cache="disco", resultado="falha")
+    caminho, sha, encoding, cabecalhos = baixado
+    resultado = ler_csv_arquivo(caminho, encoding, familia=(tipo, periodicidade))
+    cache.gravar(ano, periodicidade, periodo, tipo, sha, resultado.df, cabecalhos, encoding=encoding)
+    return resultado
+
+
+def ler_csv_do_cache(cache, meta):
+    df = cache.ler_frame(meta)
+    if df is not None:
+        return Resultado(df)
+
+    caminho = cache.arquivo_bruto(meta)
+    if caminho is None:
+        return None
+    familia = (meta.get("tipo"), meta.get("periodicidade"))
+    return ler_csv_arquivo(caminho, meta.get("encoding"), familia=familia)
+
+
+# ================= FUNÇÃO PARA LIMPAR DADOS =================
+@cronometrar("limpeza")
+def limpar_dados_csv(df):
+    """
+    Limpa e padroniza o DataFrame baixado do BACEN
+    """
+    if df.empty:
+        return df
+    
+    # Fazer uma cópia para não modificar o original
+    df = df.copy()
+    
+    # Remover colunas completamente vazias
+    df = df.dropna(axis=1, how='all')
+    
+    # Remover linhas completamente vazias
+    df = df.dropna(how='all')
+    
+    # Remover apenas colunas de índice do pandas (Unnamed: 0, etc.)
+    colunas_para_remover = []
+    for col in df.columns:
+        if str(col).strip() in ['', 'Unnamed: 0', 'Unnamed: 0.1', 'index', 'Unnamed: 0.1.1']:
+            colunas_para_remover.append(col)
+    
+    df = df.drop(columns=colunas_para_remover, errors='ignore')
+    
+    # Padronizar nomes de colunas - MANTENDO TODAS AS COLUNAS ORIGINAIS
+    colunas_mapeamento = {
+        'Instituição financeira': 'Instituição',
+        'Administradora de consórcio': 'Instituição',
+        'Instituição Financeira': 'Instituição',
+        'Administradora de Consórcio': 'Instituição',
+        'Índice': 'Índice'
+    }
+    
+    # Renomear apenas as colunas principais
+    df = df.rename(columns={col: colunas_mapeamento.get(col, col) for col in df.columns})
+
+    # Partições gravadas por versões anteriores do backfill traziam cópias '<coluna>_num'
+    legadas = [col for col in df.columns if str(col).endswith('_num') and str(col)[:-4] in df.columns]
+    df = df.drop(columns=legadas)
+
+    antes = uso_memoria(df) if logger.isEnabledFor(logging.DEBUG) else None
+    df = tipar_colunas(df)
+    if antes is not None:
+        logger.debug("limpeza: %.2f MB -> %.2f MB", antes / 1024 / 1024, uso_memoria(df) / 1024 / 1024)
+    return df
+
+
+def uso_memoria(df):
+    """
+    Bytes ocupados pelo DataFrame, incluindo o conteúdo dos textos
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _tipo_numerico(valores):
+    # Contagens sem lacunas viram int64; o resto (Índice, colunas com vazios) fica em float64
+    numeros = valores.to_numpy()
+    if len(numeros) and not pd.isna(numeros).any() and (numeros == numeros.round()).all():
+        return valores.astype("int64")
+    return valores
+
+
+@cronometrar("conversao_numerica")
+def tipar_colunas(df):
+    """
+    Converte cada coluna para um tipo compacto, de uma vez por coluna:
+    - numéricas (e sempre o Índice): int64 ou float64
+    - nome da instituição e textos com muitos valores distintos: string do Arrow
+    - textos repetitivos (Categoria, Tipo...): category
+    Células vazias ficam como NA, nunca como o texto 'nan'. Colunas que já
+    têm tipo (partições do backfill) são mantidas.
+    """
+    coluna_instituicao = identificar_coluna_instituicao(df.columns)
+    texto = [col for col in df.columns if _eh_texto(df[col])]
+    candidatas = [
+        col for col in texto
+        if col != coluna_instituicao and 'cnpj' not in str(col).lower()
+    ]
+    numericas = colunas_numericas(df, [col for col in candidatas if col != 'Índice'])
+    if 'Índice' in candidatas:
+        numericas.insert(0, 'Índice')
+
+    tipadas = {}
+    for col in texto:
+        serie = df[col]
+        if col == 'Índice':
+            tipadas[col] = converter_numeros(serie)
+        elif col in numericas:
+            tipadas[col] = _tipo_numerico(converter_numeros(serie))
+        elif col != coluna_instituicao and serie.nunique() <= len(serie) // 2:
+            tipadas[col] = serie.astype("category")
+        else:
+            tipadas[col] = serie.astype("string[pyarrow]")
+
+    if not tipadas:
+        return df
+    return pd.DataFrame({col: tipadas.get(col, df[col]) for col in df.columns}, index=df.index)
+
+
+def _eh_texto(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+# ================= PERÍODO COMPLETO =================
+def carregar_periodo(tipo, ano, periodicidade, periodo):
+    """
+    Retorna o ranking limpo de um período: do armazenamento local (backfill)
+    quando existir e o período estiver fechado, senão baixar_csv -> limpar_dados_csv.
+    """
+    chave = (str(tipo), str(ano), str(periodicidade), str(periodo))
+    return _voos_periodo.executar(chave, lambda: _carregar_periodo(tipo, ano, periodicidade, periodo))
+
+
+def entrar_carga_periodo(chave):
+    """
+    Entra na mesma coalescência de carregar_periodo sem bloquear (ex.: bacen.lote):
+    (voo, lider), ver VooUnico.entrar; o líder termina com concluir_carga_periodo
+    ou, se foi cancelado, com abandonar_carga_periodo
+    """
+    return _voos_periodo.entrar(tuple(str(parte) for parte in chave))
+
+
+def concluir_carga_periodo(chave, voo, resultado=None, erro=None):
+    _voos_periodo.concluir(tuple(str(parte) for parte in chave), voo, resultado, erro)
+
+
+def abandonar_carga_periodo(chave, voo):
+    _voos_periodo.abandonar(tuple(str(parte) for parte in chave), voo)
+
+
+def _ler_periodo(tipo, ano, periodicidade, periodo):
+    """
+    Retorna (Resultado, baixado): do armazém local quando existir e o período
+    estiver fechado, senão por baixar_csv. Períodos ainda abertos mudam:
+    passam pelo cache em disco, que os revalida com ETag/If-Modified-Since.
+    """
+    if periodo_fechado(ano, periodicidade, periodo):
+        df = armazem.ler_particao(tipo, ano, periodicidade, periodo)
+        if df is not None:
+            incrementar("bacen_cache_total", cache="armazem", resultado="acerto")
+            return Resultado(limpar_dados_csv(df)), False
+        incrementar("bacen_cache_total", cache="armazem", resultado="falha")
+
+    baixado = baixar_csv(gerar_link_csv(ano, periodicidade, periodo, tipo))
+    return Resultado(limpar_dados_csv(baixado.df), baixado.avisos, baixado.erro), True
+
+
+def _carregar_periodo(tipo, ano, periodicidade, periodo):
+    chave = (tipo, ano, periodicidade, periodo)
+    if compartilhado.ATIVO and periodo_fechado(ano, periodicidade, periodo):
+        # Períodos fechados: um arquivo Arrow mapeado em memória por todas as réplicas
+        resultado = compartilhado.obter(chave, lambda: _ler_periodo(*chave)[0])
+        baixado = False
+    else:
+        resultado, baixado = _ler_periodo(*chave)
+
+    registrar_periodo(chave, resultado, baixado)
+    return resultado
+
+
+def registrar_periodo(chave, resultado, baixado):
+    """
+    Os nomes do período entram na busca global de instituições e o período na
+    tabela de séries históricas (só a partição dele; baixado de novo, é regravada)
+    """
+    busca.registrar_periodo(chave, resultado.instituicoes)
+    if not resultado.vazio:
+        series.atualizar_periodo(chave, resultado.df, regravar=baixado)
+
+
+# Cache em memória compartilhado pelo processo (API, workers, aquecimento).
+# Os períodos ficam dentro de um orçamento de memória. Só os que o dashboard
+# está mostrando ficam fixos (não saem para abrir espaço); vizinhos adiantados
+# e consultas da API disputam o orçamento normalmente, e o TTL vale para todos
+MEMORIA_PERIODOS = int(float(os.environ.get("BACEN_CACHE_MEMORIA_MB", "512")) * 1024 * 1024)
+
+
+def _tamanho_resultado(resultado):
+    return uso_memoria(resultado.df) if resultado.df is not None else 0
+
+
+# chave do período -> instante (time.monotonic) em que foi selecionado pela última vez
+_selecionados = {}
+
+
+def selecionar_periodo(tipo, ano, periodicidade, periodo):
+    """
+    Marca o período como o que o dashboard está mostrando: ele fica fixo no
+    cache em memória enquanto alguma sessão o selecionar de novo dentro do TTL
+    """
+    agora = time.monotonic()
+    _selecionados[(str(tipo), str(ano), str(periodicidade), str(periodo))] = agora
+    for chave, instante in list(_selecionados.items()):
+        if agora - instante > _cache_periodos.ttl:
+            _selecionados.pop(chave, None)
+
+
+def _periodo_fixo(chave):
+    instante = _selecionados.get(chave)
+    return instante is not None and time.monotonic() - instante <= _cache_periodos.ttl
+
+
+_cache_catalogo = CacheMemoria(ttl=600, max_itens=1, nome="catalogo")
+_cache_periodos = CacheMemoria(
+    ttl=600,
+    max_itens=int(os.environ.get("BACEN_CACHE_MEMORIA_ITENS", "64")),
+    nome="periodos",
+    max_bytes=MEMORIA_PERIODOS,
+    tamanho=_tamanho_resultado,
+    fixar=_periodo_fixo,
+)
+
+
+_ouvintes_catalogo = []
+_ouvintes_periodo = []
+
+
+def ao_atualizar_catalogo(funcao):
+    """
+    Registra funcao(catalogo) para ser chamada sempre que obter_catalogo
+    buscar o catálogo de novo no BACEN
+    """
+    _ouvintes_catalogo.append(funcao)
+    return funcao
+
+
+def ao_invalidar_periodo(funcao):
+    """
+    Registra funcao(chave) para ser chamada com cada período (partes como
+    texto) que atualizar_catalogo invalida, ex.: para caches de respostas
+    """
+    _ouvintes_periodo.append(funcao)
+    return funcao
+
+
+def invalidar_periodo(chave):
+    """
+    Tira o período do cache em memória, apaga o arquivo compartilhado e avisa
+    os ouvintes de ao_invalidar_periodo
+    """
+    chave = tuple(str(parte) for parte in chave)
+    _cache_periodos.remover(chave)
+    compartilhado.remover(chave)
+    for funcao in _ouvintes_periodo:
+        funcao(chave)
+
+
+def _atualizar_catalogo():
+    catalogo = load_data()
+    for funcao in _ouvintes_catalogo:
+        funcao(catalogo)
+    return catalogo
+
+
+def obter_catalogo():
+    """
+    load_data com cache em memória compartilhado pelo processo
+    """
+    return _cache_catalogo.obter('catalogo', _atualizar_catalogo)
+
+
+def chaves_catalogo(df):
+    """
+    Conjunto das entradas (tipo, ano, periodicidade, periodo) do catálogo
+    """
+    colunas = df[['tipo', 'ano', 'periodicidade', 'periodo']].dropna()
+    return set(colunas.itertuples(index=False, name=None))
+
+
+def atualizar_catalogo(ttl=None):
+    """
+    Busca o catálogo de novo e troca o que está em cache sem bloquear quem
+    lê (até a troca, obter_catalogo continua devolvendo o anterior).
+
+    Retorna (adicionados, removidos): as entradas que entraram e saíram do
+    catálogo desde a versão anterior (o catálogo só traz os identificadores,
+    então um período alterado aparece como removido e adicionado). Só essas
+    entradas são invalidadas (cache em memória, arquivo compartilhado e
+    caches dos ouvintes de ao_invalidar_periodo); os demais DataFrames já
+    carregados ficam como estão.
+    """
+    anterior = _cache_catalogo.consultar('catalogo')
+    catalogo = load_data()
+    _cache_catalogo.guardar('catalogo', catalogo, ttl)
+
+    if anterior is None:
+        # Primeira carga: não há com o que comparar
+        for funcao in _ouvintes_catalogo:
+            funcao(catalogo)
+        return [], []
+
+    antes, depois = chaves_catalogo(anterior[0]), chaves_catalogo(catalogo[0])
+    adicionados, removidos = depois - antes, antes - depois
+    for chave in adicionados | removidos:
+        invalidar_periodo(chave)
+
+    if adicionados or removidos:
+        for funcao in _ouvintes_catalogo:
+            funcao(catalogo)
+    return sorted(adicionados, key=str), sorted(removidos, key=str)
+
+
+def estatisticas_cache_periodos():
+    return _cache_periodos.estatisticas()
+
+
+def obter_periodo(tipo, ano, periodicidade, periodo):
+    """
+    carregar_periodo com cache em memória compartilhado pelo processo
+    """
+    chave = (str(tipo), str(ano), str(periodicidade), str(periodo))
+    return _cache_periodos.obter(
+        chave,
+        lambda: carregar_periodo(tipo, ano, periodicidade, periodo)
+    )
+
+
+def periodo_em_memoria(tipo, ano, periodicidade, periodo):
+    """
+    O Resultado do período se já estiver (válido) no cache em memória, senão None
+    """
+    return _cache_periodos.consultar((str(tipo), str(ano), str(periodicidade), str(periodo)), vencidos=False)
+
+
+def guardar_periodo(chave, resultado, baixado):
+    """
+    Registra um período carregado fora de obter_periodo (ex.: por bacen.lote)
+    na busca, nas séries e no cache em memória
+    """
+    registrar_periodo(chave, resultado, baixado)
+    _cache_periodos.guardar(tuple(str(parte) for parte in chave), resultado)
@@ -0,0 +1,113 @@
+"""
+Detecção do formato (dialeto) dos CSVs do BACEN em uma única passada.
+
+Sobre uma amostra do início do arquivo são identificados juntos o delimitador,
+a linha do cabeçalho (alguns arquivos trazem linhas de título antes dele) e o
+uso de aspas. O dialeto encontrado fica guardado por família de arquivo
+(tipo, periodicidade), e os próximos arquivos da mesma família não precisam
+ser analisados de novo.
+"""
+import threading
+from collections import Counter
+from csv import reader
+from dataclasses import dataclass
+
+DELIMITADORES = (';', ',', '\t', '|')
+TERMOS_CABECALHO = ('instituição', 'índice', 'administradora')
+LIMITE_LINHAS = 200
+
+
+@dataclass(frozen=True)
+class Dialeto:
+    delimitador: str = ';'
+    linha_cabecalho: int = 0
+    aspas: bool = True
+
+
+def _contar_campos(linha, delimitador):
+    try:
+        return len(next(reader([linha], delimiter=delimitador)))
+    except Exception:
+        return 0
+
+
+def detectar_dialeto(amostra):
+    """
+    Analisa o texto do início do arquivo e retorna o Dialeto mais provável
+    """
+    linhas = amostra.splitlines()[:LIMITE_LINHAS]
+    # A última linha da amostra pode estar cortada
+    if len(linhas) > 1:
+        linhas = linhas[:-1]
+
+    com_termo = [
+        i for i, linha in enumerate(linhas)
+        if any(termo in linha.lower() for termo in TERMOS_CABECALHO)
+    ]
+
+    melhor, melhor_nota = Dialeto(), None
+    for delimitador in DELIMITADORES:
+        contagens = [_contar_campos(linha, delimitador) if linha.strip() else 0 for linha in linhas]
+        validas = [n for n in contagens if n > 1]
+        if not validas:
+            continue
+
+        campos, frequencia = Counter(validas).most_common(1)[0]
+        consistencia = frequencia / len([n for n in contagens if n])
+
+        # Cabeçalho: primeira linha com os nomes esperados e o número de campos
+        # do corpo; sem ela, a primeira linha com esse número de campos
+        cabecalho = next((i for i in com_termo if contagens[i] == campos), None)
+        tem_termo = cabecalho is not None
+        if cabecalho is None:
+            cabecalho = contagens.index(campos)
+
+        nota = (tem_termo, consistencia, campos)
+        if melhor_nota is None or nota > melhor_nota:
+            melhor_nota = nota
+            melhor = Dialeto(
+                delimitador=delimitador,
+                linha_cabecalho=cabecalho,
+                aspas='"' in amostra
+            )
+
+    return melhor
+
+
+def confere_com_amostra(dialeto, amostra):
+    """
+    Verifica se um dialeto guardado ainda descreve o arquivo: o cabeçalho
+    precisa estar na mesma linha (arquivos da mesma família podem ter ou não
+    linhas de título antes dele)
+    """
+    linhas = amostra.splitlines()
+    if len(linhas) <= dialeto.linha_cabecalho:
+        return False
+
+    linha = linhas[dialeto.linha_cabecalho]
+    if _contar_campos(linha, dialeto.delimitador) <= 1:
+        return False
+    if any(termo in linha.lower() for termo in TERMOS_CABECALHO):
+        return True
+    # Arquivo sem nenhum dos nomes esperados: não há como conferir melhor
+    return not any(termo in amostra.lower() for termo in TERMOS_CABECALHO)
+
+
+# ================= CACHE POR FAMÍLIA =================
+_dialetos = {}
+_trava = threading.Lock()
+
+
+def dialeto_da_familia(familia):
+    with _trava:
+        return _dialetos.get(familia)
+
+
+def guardar_dialeto(familia, dialeto):
+    with _trava:
+        _dialetos[familia] = dialeto
+
+
+def esquecer_dialeto(familia):
+    with _trava:
+        _dialetos.pop(familia, None)
@@ -0,0 +1,339 @@
+"""
+Carga de vários períodos de uma vez (um ano inteiro de arquivos mensais,
+todos os tipos de um período...) com asyncio e aiohttp.
+
+- Os downloads correm juntos em uma única thread, limitados por um semáforo
+  e pelo mesmo balde de tokens da sessão HTTP síncrona, com novas tentativas
+  (backoff exponencial e jitter) nas mesmas falhas transitórias
+- Cada arquivo vai para o cache em disco enquanto chega; a leitura do CSV
+  (encoding, dialeto, parse) e a limpeza rodam em um pool de processos, fora
+  do laço de eventos e do GIL
+- Os resultados saem na ordem em que ficam prontos, para a interface ir
+  mostrando cada período sem esperar o mais lento
+
+Períodos já em memória, no arquivo compartilhado, no armazém ou com o cache
+em disco em dia não passam pela rede. Tudo o que é carregado vai para o cache
+em memória, a busca e as séries, como em dados.obter_periodo. Uma falha em um
+período não interrompe os demais: ele sai com um Resultado vazio e o erro.
+
+    from bacen.lote import iterar_periodos
+    for chave, resultado in iterar_periodos(chaves):
+        ...
+
+    BACEN_LOTE_CONCORRENCIA   downloads simultâneos (padrão 8)
+    BACEN_LOTE_PROCESSOS      processos para leitura e limpeza (padrão: núcleos da máquina; 0 usa threads)
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+import pandas as pd
+
+from bacen import armazem, compartilhado, dados
+from bacen.cache_disco import CacheDisco, chave_periodo, periodo_fechado
+from bacen.cliente_http import CONEXOES_POR_HOST, STATUS_TRANSITORIOS, TENTATIVAS_PADRAO, obter_balde
+from bacen.codificacao import detectar_encoding
+from bacen.metricas import descrever, incrementar, medir
+from bacen.resultado import Resultado
+
+logger = logging.getLogger(__name__)
+
+# ================= CONFIGURAÇÃO =================
+CONCORRENCIA = int(os.environ.get("BACEN_LOTE_CONCORRENCIA", "8"))
+PROCESSOS = int(os.environ.get("BACEN_LOTE_PROCESSOS", str(os.cpu_count() or 1)))
+
+TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+
+_trava = threading.Lock()
+_pool = None
+
+descrever("bacen_lote_periodos_total", "Períodos carregados em lote, por origem (memoria, coalescido, compartilhado, local, rede)")
+
+
+def _pool_processos(processos):
+    """Pool único do processo; None (threads) com processos=0"""
+    global _pool
+    if processos <= 0:
+        return None
+    with _trava:
+        if _pool is None:
+            # spawn: o Streamlit e a API têm várias threads, e fork copiaria travas presas
+            _pool = ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+async def _no_pool(pool, funcao, *args):
+    if pool is None:
+        return await asyncio.to_thread(funcao, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, funcao, *args)
+
+
+# ================= TRABALHO DOS PROCESSOS =================
+# Funções de módulo (o pool de processos só recebe o que dá para serializar).
+# As métricas são contadas por quem chama: contadores dos processos filhos se perderiam
+def _ler_local(chave):
+    """
+    (Resultado, meta, cache): o período limpo do armazém ou do cache em disco
+    ainda em dia, ou Resultado None se precisa ir ao BACEN (o meta do cache
+    em disco serve para a revalidação)
+    """
+    tipo, ano, periodicidade, periodo = chave
+    # Como em dados._ler_periodo: o armazém só vale para períodos fechados
+    df = armazem.ler_particao(*chave) if periodo_fechado(ano, periodicidade, periodo) else None
+    if df is not None:
+        return Resultado(dados.limpar_dados_csv(df)), None, "armazem"
+
+    cache = CacheDisco()
+    meta = cache.ler_meta(chave_periodo(ano, periodicidade, periodo, tipo))
+    if meta and not cache.precisa_revalidar(meta):
+        baixado = dados.ler_csv_do_cache(cache, meta)
+        if baixado is not None:
+            return Resultado(dados.limpar_dados_csv(baixado.df), baixado.avisos, baixado.erro), meta, "disco"
+    return None, meta, None
+
+
+def _ler_revalidado(chave, meta):
+    """Resposta 304: o arquivo do cache em disco continua valendo"""
+    tipo, ano, periodicidade, periodo = chave
+    cache = CacheDisco()
+    baixado = dados.ler_csv_do_cache(cache, meta)
+    if baixado is None:
+        return None
+    cache.renovar(chave_periodo(ano, periodicidade, periodo, tipo), meta)
+    return Resultado(dados.limpar_dados_csv(baixado.df), baixado.avisos, baixado.erro)
+
+
+def _ler_download(chave, caminho, sha, cabecalhos):
+    """Detecta o encoding, lê e limpa um arquivo recém-baixado e o registra no cache em disco"""
+    tipo, ano, periodicidade, periodo = chave
+    encoding = detectar_encoding(caminho).encoding
+    baixado = dados.ler_csv_arquivo(caminho, encoding, familia=(tipo, periodicidade))
+    CacheDisco().gravar(ano, periodicidade, periodo, tipo, sha, baixado.df, cabecalhos, encoding=encoding)
+    return Resultado(dados.limpar_dados_csv(baixado.df), baixado.avisos, baixado.erro)
+
+
+# ================= DOWNLOAD =================
+def _espera_nova_tentativa(tentativa, retry_after=None):
+    if retry_after and retry_after.isdigit():
+        return min(30.0, float(retry_after))
+    return min(30.0, 0.5 * 2 ** tentativa + random.uniform(0, 0.5))
+
+
+async def _gravar_resposta(resposta, cache):
+    """Grava o corpo no cache em disco bloco a bloco; retorna (caminho, sha256)"""
+    sha = hashlib.sha256()
+    total = 0
+    temporario = cache.novo_temporario()
+    try:
+        # Blocos de 64 KB vão para o page cache: escrever direto não segura o laço
+        with open(temporario, "wb") as arquivo:
+            async for bloco in resposta.content.iter_chunked(dados.TAMANHO_BLOCO):
+                arquivo.write(bloco)
+                sha.update(bloco)
+                total += len(bloco)
+        caminho = cache.guardar_bruto(temporario, sha.hexdigest())
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    incrementar("bacen_bytes_baixados_total", total)
+    incrementar("bacen_downloads_total")
+    return caminho, sha.hexdigest()
+
+
+async def _baixar(sessao, url, cabecalhos, semaforo, balde, tentativas=TENTATIVAS_PADRAO):
+    """
+    Baixa o arquivo para o cache em disco e retorna (caminho, sha256, cabeçalhos);
+    None se o servidor respondeu 304
+    """
+    cache = CacheDisco()
+    async with semaforo:
+        for tentativa in range(tentativas + 1):
+            esperou = await balde.consumir_async()
+            if esperou:
+                incrementar("bacen_http_espera_limite_segundos_total", esperou)
+            try:
+                with medir("download"):
+                    async with sessao.get(url, headers=cabecalhos) as resposta:
+                        if resposta.status == 304 and cabecalhos:
+                            return None
+                        if resposta.status not in STATUS_TRANSITORIOS or tentativa == tentativas:
+                            resposta.raise_for_status()
+                            caminho, sha = await _gravar_resposta(resposta, cache)
+                            return caminho, sha, {
+                                "ETag": resposta.headers.get("ETag"),
+                                "Last-Modified": resposta.headers.get("Last-Modified"),
+                            }
+                        espera = _espera_nova_tentativa(tentativa, resposta.headers.get("Retry-After"))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if tentativa == tentativas:
+                    raise
+                espera = _espera_nova_tentativa(tentativa)
+            await asyncio.sleep(espera)
+
+
+# ================= UM PERÍODO =================
+async def _carregar(chave, sessao, semaforo, balde, pool):
+    """
+    Resultado limpo do período e de onde veio (memoria, coalescido,
+    compartilhado, local ou rede). Se o dashboard ou a API já estão carregando
+    o mesmo período (ou o contrário), um espera pelo outro em vez de baixar de novo.
+    """
+    resultado = dados.periodo_em_memoria(*chave)
+    if resultado is not None:
+        return resultado, "memoria"
+
+    voo, lider = dados.entrar_carga_periodo(chave)
+    while not lider:
+        await asyncio.to_thread(voo.concluido.wait)
+        if not voo.abandonado:
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.valor, "coalescido"
+        voo, lider = dados.entrar_carga_periodo(chave)
+
+    try:
+        resultado, origem = await _carregar_lider(chave, sessao, semaforo, balde, pool)
+    except Exception as e:
+        dados.concluir_carga_periodo(chave, voo, erro=e)
+        raise
+    except BaseException:
+        # Lote cancelado (consumidor parou, rerun do Streamlit): quem esperava
+        # por este período não herda o cancelamento, carrega ele mesmo
+        dados.abandonar_carga_periodo(chave, voo)
+        raise
+    dados.concluir_carga_periodo(chave, voo, resultado)
+    return resultado, origem
+
+
+async def _carregar_lider(chave, sessao, semaforo, balde, pool):
+    tipo, ano, periodicidade, periodo = chave
+    fechado = periodo_fechado(ano, periodicidade, periodo)
+    compartilhar = compartilhado.ATIVO and fechado
+    if compartilhar:
+        df = await asyncio.to_thread(compartilhado.ler, compartilhado.caminho_periodo(chave))
+        if df is not None:
+            incrementar("bacen_cache_total", cache="compartilhado", resultado="acerto")
+            resultado = Resultado(df)
+            await asyncio.to_thread(dados.guardar_periodo, chave, resultado, False)
+            return resultado, "compartilhado"
+
+    resultado, meta, cache = await _no_pool(pool, _ler_local, chave)
+    if cache != "armazem" and fechado:
+        incrementar("bacen_cache_total", cache="armazem", resultado="falha")
+    if resultado is not None:
+        incrementar("bacen_cache_total", cache=cache, resultado="acerto")
+        origem, baixado = "local", False
+    else:
+        url = dados.gerar_link_csv(ano, periodicidade, periodo, tipo)
+        download = await _baixar(sessao, url, CacheDisco().cabecalhos_condicionais(meta), semaforo, balde)
+        if download is None:
+            resultado = await _no_pool(pool, _ler_revalidado, chave, meta)
+            if resultado is not None:
+                incrementar("bacen_cache_total", cache="disco", resultado="revalidado")
+            else:
+                # O arquivo local sumiu: baixar de novo sem condição
+                download = await _baixar(sessao, url, {}, semaforo, balde)
+        if resultado is None:
+            incrementar("bacen_cache_total", cache="disco", resultado="falha")
+            resultado = await _no_pool(pool, _ler_download, chave, *download)
+        origem, baixado = "rede", True
+
+    if compartilhar and not resultado.erro and not resultado.vazio:
+        # Grava o arquivo Arrow e passa a usar as páginas mapeadas dele
+        resultado = await asyncio.to_thread(compartilhado.obter, chave, lambda: resultado)
+    await asyncio.to_thread(dados.guardar_periodo, chave, resultado, baixado)
+    return resultado, origem
+
+
+async def _carregar_com_erro(chave, *args):
+    try:
+        resultado, origem = await _carregar(chave, *args)
+        incrementar("bacen_lote_periodos_total", origem=origem)
+        return chave, resultado
+    except Exception as e:
+        logger.warning("Falha ao carregar o período %s em lote: %s", chave, e)
+        incrementar("bacen_lote_periodos_total", origem="falha")
+        return chave, Resultado(pd.DataFrame(), erro=f"Erro ao baixar o CSV: {str(e)[:200]}")
+
+
+# ================= VÁRIOS PERÍODOS =================
+async def baixar_periodos(chaves, concorrencia=CONCORRENCIA, processos=PROCESSOS):
+    """
+    Carrega os períodos (tuplas tipo, ano, periodicidade, periodo) juntos e
+    produz (chave, Resultado) à medida que cada um fica pronto
+    """
+    # Internamente (caches, coalescência) as partes da chave são texto; quem
+    # chamou recebe de volta a chave como passou
+    originais = {}
+    for chave in chaves:
+        originais.setdefault(tuple(str(parte) for parte in chave), tuple(chave))
+    if not originais:
+        return
+
+    semaforo = asyncio.Semaphore(max(1, concorrencia))
+    balde = obter_balde()
+    pool = _pool_processos(processos)
+    conector = aiohttp.TCPConnector(limit_per_host=CONEXOES_POR_HOST)
+    async with aiohttp.ClientSession(connector=conector, timeout=TIMEOUT) as sessao:
+        tarefas = [
+            asyncio.ensure_future(_carregar_com_erro(chave, sessao, semaforo, balde, pool))
+            for chave in originais
+        ]
+        try:
+            for pronta in asyncio.as_completed(tarefas):
+                chave, resultado = await pronta
+                yield originais[chave], resultado
+        finally:
+            # Quem consome parou antes do fim: os downloads pendentes são cancelados
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+def iterar_periodos(chaves, concorrencia=CONCORRENCIA, processos=PROCESSOS):
+    """
+    baixar_periodos para código síncrono (Streamlit, scripts): o laço de
+    eventos roda em uma thread própria e cada (chave, Resultado) sai assim
+    que fica pronto
+    """
+    fila = queue.Queue()
+    fim = object()
+    estado = {}
+    iniciado = threading.Event()
+
+    async def consumir():
+        estado['laco'], estado['tarefa'] = asyncio.get_running_loop(), asyncio.current_task()
+        iniciado.set()
+        try:
+            async for item in baixar_periodos(chaves, concorrencia, processos):
+                fila.put(item)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            fila.put(e)
+        finally:
+            fila.put(fim)
+
+    thread = threading.Thread(target=asyncio.run, args=(consumir(),), name="bacen-lote", daemon=True)
+    thread.start()
+    iniciado.wait()
+    try:
+        while True:
+            item = fila.get()
+            if item is fim:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if thread.is_alive():
+            estado['laco'].call_soon_threadsafe(estado['tarefa'].cancel)
+            thread.join()
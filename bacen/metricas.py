@@ -0,0 +1,209 @@
+"""
+Medição de tempo por etapa e contadores do pipeline, exportados no formato
+texto do Prometheus.
+
+    with medir("download"):
+        ...
+    incrementar("bacen_cache_total", cache="disco", resultado="acerto")
+
+As durações viram histogramas (bacen_etapa_duracao_segundos), adequados para
+alertas com histogram_quantile (ex.: p95 do rerun ou do download).
+"""
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LIMITES_HISTOGRAMA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+AMOSTRAS_RECENTES = 1000
+
+_NOME_HISTOGRAMA = "bacen_etapa_duracao_segundos"
+
+_trava = threading.Lock()
+_histogramas = {}
+_contadores = {}
+_medidores = {}
+_ajuda = {
+    _NOME_HISTOGRAMA: "Duração de cada etapa do pipeline",
+}
+
+
+class _Histograma:
+    def __init__(self):
+        self.buckets = [0] * len(LIMITES_HISTOGRAMA)
+        self.soma = 0.0
+        self.contagem = 0
+        self.recentes = deque(maxlen=AMOSTRAS_RECENTES)
+
+    def observar(self, valor):
+        posicao = bisect.bisect_left(LIMITES_HISTOGRAMA, valor)
+        if posicao < len(self.buckets):
+            self.buckets[posicao] += 1
+        self.soma += valor
+        self.contagem += 1
+        self.recentes.append(valor)
+
+
+# ================= REGISTRO =================
+def observar(etapa, segundos):
+    with _trava:
+        histograma = _histogramas.get(etapa)
+        if histograma is None:
+            histograma = _histogramas[etapa] = _Histograma()
+        histograma.observar(segundos)
+
+
+def cronometrar(etapa):
+    """
+    Decorador: mede cada chamada da função na etapa informada
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(etapa):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+@contextmanager
+def medir(etapa):
+    """
+    Mede a duração do bloco e registra no histograma da etapa
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(etapa, time.perf_counter() - inicio)
+
+
+def incrementar(nome, valor=1, **rotulos):
+    chave = (nome, tuple(sorted(rotulos.items())))
+    with _trava:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def definir(nome, valor, **rotulos):
+    """Medidor (gauge): guarda o valor atual, ex.: bytes ocupados por um cache"""
+    chave = (nome, tuple(sorted(rotulos.items())))
+    with _trava:
+        _medidores[chave] = valor
+
+
+def descrever(nome, ajuda):
+    _ajuda[nome] = ajuda
+
+
+def zerar():
+    with _trava:
+        _histogramas.clear()
+        _contadores.clear()
+        _medidores.clear()
+
+
+# ================= EXPORTAÇÃO =================
+def _quantil(valores, q):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+def resumo():
+    """
+    Retorna {etapa: {contagem, media, p50, p95}} com as amostras recentes e os
+    contadores (junto com os medidores)
+    """
+    with _trava:
+        etapas = {
+            etapa: {
+                'contagem': h.contagem,
+                'media': h.soma / h.contagem if h.contagem else 0.0,
+                'p50': _quantil(h.recentes, 0.5),
+                'p95': _quantil(h.recentes, 0.95),
+            }
+            for etapa, h in _histogramas.items()
+        }
+        contadores = {**_contadores, **_medidores}
+    return etapas, contadores
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(pares):
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+def exportar_prometheus():
+    """
+    Gera o texto das métricas no formato de exposição do Prometheus
+    """
+    linhas = []
+    with _trava:
+        if _histogramas:
+            linhas.append(f"# HELP {_NOME_HISTOGRAMA} {_ajuda[_NOME_HISTOGRAMA]}")
+            linhas.append(f"# TYPE {_NOME_HISTOGRAMA} histogram")
+            for nome_etapa in sorted(_histogramas):
+                h = _histogramas[nome_etapa]
+                etapa = _escapar(nome_etapa)
+                acumulado = 0
+                for limite, quantidade in zip(LIMITES_HISTOGRAMA, h.buckets):
+                    acumulado += quantidade
+                    linhas.append(
+                        f'{_NOME_HISTOGRAMA}_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}'
+                    )
+                linhas.append(f'{_NOME_HISTOGRAMA}_bucket{{etapa="{etapa}",le="+Inf"}} {h.contagem}')
+                linhas.append(f'{_NOME_HISTOGRAMA}_sum{{etapa="{etapa}"}} {h.soma}')
+                linhas.append(f'{_NOME_HISTOGRAMA}_count{{etapa="{etapa}"}} {h.contagem}')
+
+        for tipo, valores in (("counter", _contadores), ("gauge", _medidores)):
+            nomes = sorted({nome for nome, _ in valores})
+            for nome in nomes:
+                if nome in _ajuda:
+                    linhas.append(f"# HELP {nome} {_ajuda[nome]}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                for (nome_metrica, pares), valor in sorted(valores.items()):
+                    if nome_metrica == nome:
+                        linhas.append(f"{nome}{_rotulos(pares)} {valor}")
+
+    return "\n".join(linhas) + "\n"
+
+
+def iniciar_servidor_metricas(porta, host="0.0.0.0"):
+    """
+    Sobe um servidor HTTP em segundo plano com as métricas em /metrics
+    (para processos que não têm a API, como o Streamlit)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Metricas(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            corpo = exportar_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    servidor = ThreadingHTTPServer((host, porta), _Metricas)
+    threading.Thread(target=servidor.serve_forever, daemon=True, name="bacen-metricas").start()
+    return servidor
+
+
+descrever("bacen_cache_total", "Consultas aos caches por resultado (acerto, falha, revalidado)")
+descrever("bacen_bytes_baixados_total", "Bytes baixados do BACEN")
+descrever("bacen_downloads_total", "Arquivos baixados do BACEN")
@@ -0,0 +1,136 @@
+"""
+Conversão e formatação vetorizadas de números no padrão brasileiro.
+
+Todas as funções trabalham sobre uma coluna inteira (pandas.Series) de uma vez,
+usando os kernels de string do pyarrow e NumPy, em vez de percorrer cada célula
+em Python.
+"""
+import numpy as np
+import pandas as pd
+
+# Textos tratados como célula vazia
+VALORES_VAZIOS = ['', 'nan', 'None', 'NaN']
+
+# Célula que parece número: dígitos com separadores de milhar/decimal
+_RE_NUMERO = r"\s*-?\d[\d.,]*\s*"
+
+# Apenas pontos agrupando de 3 em 3 dígitos ("1.234", "12.345.678"): milhar
+_RE_MILHAR_PONTO = r"-?[1-9]\d{0,2}(?:\.\d{3})+"
+
+# Uma única vírgula, sem ponto depois dela ("1.234,56", "12,5")
+_RE_VIRGULA_DECIMAL = r"[^,]*,[^,.]*"
+
+# Um único ponto, sem vírgula depois dele ("1,234.56", "12.5")
+_RE_PONTO_DECIMAL = r"[^.]*\.[^.,]*"
+
+# Texto já normalizado que o cast para float64 aceita
+_RE_FLOAT = r"^-?(?:\d+\.?\d*|\.\d+)$"
+
+
+def _texto(serie):
+    # Strings do Arrow: strip, replace, contains e fullmatch rodam nos kernels do
+    # pyarrow; .str.rfind, .str.count e pd.to_numeric não (laço Python por célula)
+    return serie.astype("string[pyarrow]").fillna("").str.strip()
+
+
+def converter_numeros(serie):
+    """
+    Converte uma coluna de textos como '1.234,56', '1,234.56', '12,5' ou '1.234'
+    para float64. Células vazias ou não numéricas viram NaN.
+
+    Regras (as mesmas para toda a coluna):
+    - vírgula e ponto: o último separador que aparece é o decimal
+    - apenas uma vírgula: vírgula decimal
+    - apenas um ponto: decimal, exceto quando agrupa milhar ('1.234')
+    - separadores repetidos: milhar
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype("float64")
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    # Tudo nos kernels do pyarrow: .str.rfind/.str.count e pd.to_numeric sobre
+    # strings do Arrow cairiam em um laço Python por célula
+    limpo = pc.replace_substring_regex(pa.array(_texto(serie)), r"[^\d,.\-]", "")
+
+    virgula_decimal = pc.match_substring_regex(limpo, f"^{_RE_VIRGULA_DECIMAL}$")
+    ponto_decimal = pc.and_(
+        pc.match_substring_regex(limpo, f"^{_RE_PONTO_DECIMAL}$"),
+        pc.invert(pc.match_substring_regex(limpo, f"^{_RE_MILHAR_PONTO}$")),
+    )
+
+    sem_pontos = pc.replace_substring(limpo, ".", "")
+    sem_virgulas = pc.replace_substring(limpo, ",", "")
+
+    # Padrão: todos os separadores são de milhar
+    normalizado = pc.replace_substring(sem_pontos, ",", "")
+    normalizado = pc.if_else(virgula_decimal, pc.replace_substring(sem_pontos, ",", "."), normalizado)
+    normalizado = pc.if_else(ponto_decimal, sem_virgulas, normalizado)
+
+    # O cast do Arrow falha no primeiro texto inválido: os demais viram nulo (NaN) antes
+    validos = pc.match_substring_regex(normalizado, _RE_FLOAT)
+    numeros = pc.cast(pc.if_else(validos, normalizado, pa.scalar(None, pa.string())), pa.float64())
+    return pd.Series(numeros.to_numpy(zero_copy_only=False), index=serie.index, dtype="float64")
+
+
+def formatar_numeros(serie):
+    """
+    Formata uma coluna no padrão brasileiro com 2 casas decimais: 1.234,56
+
+    Células vazias viram '' e textos que não são números são mantidos como estão.
+    """
+    valores = converter_numeros(serie)
+    numeros = valores.to_numpy()
+    validos = ~np.isnan(numeros)
+
+    centavos = np.rint(np.abs(np.where(validos, numeros, 0)) * 100).astype("int64")
+    inteiros = pd.Series(centavos // 100, index=serie.index).astype(str)
+    decimais = pd.Series(centavos % 100, index=serie.index).astype(str).str.zfill(2)
+
+    # Separador de milhar apenas a partir de 1.000 (mesmo comportamento anterior)
+    milhar = pd.Series(numeros >= 1000, index=serie.index)
+    inteiros = inteiros.mask(milhar, inteiros.str.replace(r"(\d)(?=(?:\d{3})+$)", r"\1.", regex=True))
+
+    sinal = pd.Series(np.where(numeros < 0, "-", ""), index=serie.index)
+    formatado = sinal + inteiros + "," + decimais
+
+    if pd.api.types.is_numeric_dtype(serie):
+        return formatado.where(validos, "")
+
+    original = _texto(serie)
+    formatado = formatado.where(validos, original)
+    return formatado.mask(original.isin(VALORES_VAZIOS), "")
+
+
+def colunas_numericas(df, colunas=None):
+    """
+    Retorna as colunas de texto em que toda célula preenchida é um número
+    """
+    encontradas = []
+    for col in (colunas if colunas is not None else df.columns):
+        texto = _texto(df[col])
+        preenchidas = texto[~texto.isin(VALORES_VAZIOS)]
+        if preenchidas.empty:
+            continue
+        if preenchidas.str.fullmatch(_RE_NUMERO).all():
+            encontradas.append(col)
+    return encontradas
+
+
+# ================= VALORES ISOLADOS =================
+def converter_numero(valor, default=0):
+    """
+    Versão para um único valor de converter_numeros
+    """
+    if isinstance(valor, (int, float, np.number)) and not isinstance(valor, bool):
+        return default if pd.isna(valor) else float(valor)
+    numero = converter_numeros(pd.Series([valor], dtype=object)).iloc[0]
+    return default if pd.isna(numero) else float(numero)
+
+
+def formatar_numero_brasileiro(valor):
+    """
+    Formata números no padrão brasileiro: 1.234,56
+    """
+    return formatar_numeros(pd.Series([valor], dtype=object)).iloc[0]
@@ -0,0 +1,117 @@
+"""
+Ranking de reclamações de um período: instituições ordenadas pelo Índice.
+
+O Ranking é montado uma vez por período (fica no Resultado em cache) e só
+ordena e formata as linhas pedidas: para o top 30 de um arquivo com milhares
+de instituições, basta uma seleção parcial (np.partition) e a ordenação
+desses poucos candidatos.
+"""
+import threading
+
+import numpy as np
+
+from bacen.colunas import identificar_coluna_instituicao
+from bacen.metricas import cronometrar
+from bacen.numeros import converter_numeros, formatar_numeros
+
+
+class Ranking:
+    """
+    Ordem do maior para o menor Índice; empates mantêm a ordem do arquivo e
+    linhas sem Índice ficam por último (mesma ordem de um sort estável)
+    """
+
+    def __init__(self, df, coluna_instituicao=None):
+        self.df = df
+        self.coluna = coluna_instituicao or identificar_coluna_instituicao(df.columns)
+        self.disponivel = not df.empty and 'Índice' in df.columns and self.coluna is not None
+        self._valores = (
+            converter_numeros(df['Índice']).to_numpy(dtype='float64', na_value=np.nan)
+            if self.disponivel else np.empty(0)
+        )
+        self._tabelas = {}
+        self._posicoes = None
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self._valores)
+
+    def _ordem(self, limite):
+        """Posições (para df.iloc) das `limite` primeiras linhas do ranking"""
+        valores = self._valores
+        com_indice = np.flatnonzero(~np.isnan(valores))
+
+        candidatos = com_indice
+        if limite is not None and limite < len(com_indice):
+            # Tudo que empata com o k-ésimo valor entra como candidato, para o
+            # desempate pela ordem do arquivo ser o mesmo da ordenação completa
+            chaves = -valores[com_indice]
+            limiar = np.partition(chaves, limite - 1)[limite - 1]
+            candidatos = com_indice[chaves <= limiar]
+
+        # `candidatos` já está na ordem do arquivo: o argsort estável desempata por ela
+        ordem = candidatos[np.argsort(-valores[candidatos], kind='stable')]
+        if limite is None or len(ordem) < limite:
+            ordem = np.concatenate([ordem, np.flatnonzero(np.isnan(valores))])
+        return ordem[:limite]
+
+    def topo(self, limite=None):
+        """
+        DataFrame com Rank, instituição, Índice (formatado) e Índice_valor
+        (float) das `limite` primeiras posições (todas, se None). O resultado
+        fica guardado por limite; não altere o DataFrame retornado.
+        """
+        if not self.disponivel:
+            return self.df.iloc[0:0]
+
+        with self._trava:
+            tabela = self._tabelas.get(limite)
+        if tabela is not None:
+            return tabela
+
+        ordem = self._ordem(limite)
+        tabela = self.df.iloc[ordem][[self.coluna, 'Índice']].reset_index(drop=True)
+        tabela.insert(0, 'Rank', tabela.index + 1)
+        tabela['Índice_valor'] = self._valores[ordem]
+        tabela['Índice'] = formatar_numeros(tabela['Índice'])
+
+        with self._trava:
+            return self._tabelas.setdefault(limite, tabela)
+
+    def posicoes(self):
+        """
+        Posição no ranking (a partir de 1) de cada linha do DataFrame, na
+        ordem das linhas; None se o período não tem Índice
+        """
+        if not self.disponivel:
+            return None
+        if self._posicoes is None:
+            posicoes = np.empty(len(self._valores), dtype='int64')
+            posicoes[self._ordem(None)] = np.arange(1, len(self._valores) + 1)
+            self._posicoes = posicoes
+        return self._posicoes
+
+    def posicao(self, linha):
+        """
+        Posição no ranking (a partir de 1) da linha `linha` do DataFrame,
+        sem ordenar o arquivo inteiro
+        """
+        if not self.disponivel or linha is None:
+            return None
+
+        valores = self._valores
+        valor = valores[linha]
+        if np.isnan(valor):
+            com_indice = np.count_nonzero(~np.isnan(valores))
+            return int(com_indice + np.count_nonzero(np.isnan(valores[:linha]))) + 1
+        return int(np.count_nonzero(valores > valor) + np.count_nonzero(valores[:linha] == valor)) + 1
+
+
+@cronometrar("ranking")
+def calcular_ranking(df, coluna_instituicao=None, limite=None):
+    """
+    Retorna um DataFrame com Rank, instituição, Índice (formatado) e
+    Índice_valor (float), do maior para o menor Índice; sem Índice, por último.
+    Com `limite`, só as primeiras posições são ordenadas e formatadas.
+    """
+    return Ranking(df, coluna_instituicao).topo(limite)
@@ -0,0 +1,38 @@
+"""
+Resultado estruturado das etapas do pipeline.
+
+Em vez de chamar st.warning/st.error, as funções do pacote devolvem os avisos
+e erros junto com os dados, e quem chama decide como exibi-los.
+"""
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, List, Optional
+
+
+@dataclass
+class Resultado:
+    df: Any
+    avisos: List[str] = field(default_factory=list)
+    erro: Optional[str] = None
+
+    @property
+    def vazio(self):
+        return self.df is None or self.df.empty
+
+    @cached_property
+    def instituicoes(self):
+        """
+        Índice nome -> linha do DataFrame, montado na primeira consulta e
+        reaproveitado enquanto o Resultado estiver em cache
+        """
+        from bacen.busca import IndiceInstituicoes
+        return IndiceInstituicoes(self.df)
+
+    @cached_property
+    def ranking(self):
+        """
+        Ranking do período, montado uma vez por Resultado em cache; cada
+        tamanho de topo pedido é ordenado e formatado só na primeira vez
+        """
+        from bacen.ranking import Ranking
+        return Ranking(self.df, self.instituicoes.coluna)
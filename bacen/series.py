@@ -0,0 +1,216 @@
+"""
+Séries históricas por instituição: Índice e reclamações de cada período em
+uma tabela materializada, mantida de forma incremental.
+
+Cada período vira uma partição Parquet estreita (uma linha por instituição,
+só as colunas da série), no mesmo layout do armazém, em BACEN_SERIES_DIR.
+Gravar um período mexe apenas na sua partição. Em memória, a tabela fica
+indexada por instituição (CNPJ quando o arquivo traz essa coluna, senão o
+nome normalizado), então a série de uma instituição sai sem varrer os
+demais períodos.
+
+    from bacen.series import serie_instituicao
+    serie_instituicao("BANCO DO BRASIL S.A.")
+"""
+import logging
+import os
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+from bacen import armazem
+from bacen.busca import normalizar_cnpj, normalizar_nome
+from bacen.colunas import resolver_esquema
+from bacen.metricas import cronometrar
+from bacen.numeros import converter_numeros
+
+logger = logging.getLogger(__name__)
+
+# ================= CONFIGURAÇÃO =================
+DIRETORIO_PADRAO = os.environ.get("BACEN_SERIES_DIR", "dados_bacen_series")
+
+CAMPOS_PERIODO = ['tipo', 'ano', 'periodicidade', 'periodo']
+COLUNAS_VALORES = ['Índice', 'Reguladas Procedentes', 'Reguladas Outras', 'Não Reguladas', 'Total Reclamações']
+COLUNAS_SERIE = CAMPOS_PERIODO + ['instituicao', 'cnpj'] + COLUNAS_VALORES
+
+
+# ================= PARTIÇÃO DE UM PERÍODO =================
+def linhas_periodo(df):
+    """
+    Recorte estreito de um período já limpo: instituição, CNPJ, Índice e
+    quantidades de reclamações (NaN quando o arquivo não traz a coluna)
+    """
+    esquema = resolver_esquema(df.columns)
+    if df.empty or esquema.instituicao is None:
+        return pd.DataFrame(columns=['instituicao', 'cnpj'] + COLUNAS_VALORES)
+
+    recorte = pd.DataFrame({
+        'instituicao': df[esquema.instituicao].astype(object),
+        'cnpj': (
+            [normalizar_cnpj(valor) for valor in df[esquema.cnpj].to_numpy(dtype=object, na_value=None)]
+            if esquema.cnpj else None
+        ),
+    })
+    colunas = {'Índice': 'Índice' if 'Índice' in df.columns else None, **esquema.reclamacoes}
+    for nome in COLUNAS_VALORES:
+        coluna = colunas.get(nome)
+        recorte[nome] = converter_numeros(df[coluna]).to_numpy(dtype='float64') if coluna else float('nan')
+
+    return recorte.dropna(subset=['instituicao']).reset_index(drop=True)
+
+
+def ordenar_periodos(df, colunas):
+    """
+    Ordena pelas colunas dadas; ano e período (guardados como texto) como
+    números, para "10" vir depois de "2"
+    """
+    def chave(coluna):
+        return pd.to_numeric(coluna, errors='coerce') if coluna.name in ('ano', 'periodo') else coluna
+    return df.sort_values(colunas, key=chave, kind='stable').reset_index(drop=True)
+
+
+# ================= TABELA MATERIALIZADA =================
+class TabelaSeries:
+    def __init__(self, diretorio=DIRETORIO_PADRAO, diretorio_armazem=armazem.DIRETORIO_PADRAO):
+        self.diretorio = diretorio
+        self.diretorio_armazem = diretorio_armazem
+        self._trava = threading.RLock()
+        self._trava_carga = threading.Lock()      # uma carga por vez; consultas não esperam por ela
+        self._carregada = False
+        self._carga = None
+        self._linhas = defaultdict(dict)            # instituição -> período -> linha
+        self._chaves_nome = defaultdict(set)        # nome normalizado -> instituições
+        self._instituicoes_periodo = {}             # período -> instituições
+
+    @staticmethod
+    def _chave_instituicao(nome, cnpj):
+        return ('cnpj', cnpj) if cnpj else ('nome', normalizar_nome(nome))
+
+    def _aplicar(self, chave, recorte):
+        """Troca, em memória, as linhas do período pelas do recorte"""
+        for instituicao in self._instituicoes_periodo.pop(chave, ()):
+            self._linhas[instituicao].pop(chave, None)
+
+        instituicoes = set()
+        recorte = recorte.reindex(columns=['instituicao', 'cnpj'] + COLUNAS_VALORES)
+        for nome, cnpj, *valores in recorte.itertuples(index=False, name=None):
+            cnpj = normalizar_cnpj(cnpj)
+            instituicao = self._chave_instituicao(nome, cnpj)
+            self._linhas[instituicao][chave] = (*chave, nome, cnpj, *valores)
+            self._chaves_nome[normalizar_nome(nome)].add(instituicao)
+            instituicoes.add(instituicao)
+        self._instituicoes_periodo[chave] = instituicoes
+
+    def _gravar(self, chave, recorte):
+        try:
+            armazem.gravar_particao(recorte, *chave, diretorio=self.diretorio)
+        except OSError as e:
+            logger.warning("Não foi possível gravar a série do período %s: %s", chave, e)
+
+    def _aplicar_se_novo(self, chave, recorte):
+        # Um período atualizado durante a carga já está com a versão mais nova
+        with self._trava:
+            if chave not in self._instituicoes_periodo:
+                self._aplicar(chave, recorte)
+
+    @cronometrar("series_carregar")
+    def carregar(self):
+        """
+        Lê as partições já materializadas e materializa só os períodos do
+        armazém que ainda não têm a sua. As leituras ficam fora da trava das
+        consultas: cada partição entra assim que é lida.
+        """
+        with self._trava_carga:
+            if self._carregada:
+                return
+            for chave in armazem.listar_particoes(self.diretorio):
+                self._aplicar_se_novo(chave, armazem.ler_particao(*chave, diretorio=self.diretorio))
+            for chave in armazem.listar_particoes(self.diretorio_armazem):
+                with self._trava:
+                    materializada = chave in self._instituicoes_periodo
+                if not materializada:
+                    recorte = linhas_periodo(armazem.ler_particao(*chave, diretorio=self.diretorio_armazem))
+                    if not recorte.empty:
+                        self._gravar(chave, recorte)
+                    self._aplicar_se_novo(chave, recorte)
+            self._carregada = True
+
+    def carregar_em_segundo_plano(self):
+        """Inicia carregar() em uma thread própria (uma vez por processo)"""
+        with self._trava:
+            if self._carga is not None or self._carregada:
+                return
+            self._carga = threading.Thread(target=self._carregar_registrando, name="bacen-series", daemon=True)
+        self._carga.start()
+
+    def _carregar_registrando(self):
+        try:
+            self.carregar()
+        except Exception as e:
+            logger.warning("Falha ao carregar as séries históricas: %s", e)
+
+    @property
+    def carregada(self):
+        return self._carregada
+
+    def atualizar_periodo(self, chave, df, regravar=True):
+        """
+        Materializa um período (DataFrame já limpo). Com regravar=False, a
+        partição em disco só é gravada se ainda não existir.
+        """
+        chave = tuple(str(parte) for parte in chave)
+        recorte = linhas_periodo(df)
+        if recorte.empty:
+            return 0
+        with self._trava:
+            if regravar or not armazem.existe_particao(*chave, diretorio=self.diretorio):
+                self._gravar(chave, recorte)
+            self._aplicar(chave, recorte)
+        return len(recorte)
+
+    def serie(self, nome, cnpj=None, tipo=None, esperar=True):
+        """
+        Uma linha por período em que a instituição aparece (pelo CNPJ, quando
+        informado, reconhece também os nomes antigos), em ordem cronológica.
+        Com esperar=False não dispara nem espera a carga das partições: devolve
+        o que já está em memória (ver carregada).
+        """
+        if esperar:
+            self.carregar()
+        cnpj = normalizar_cnpj(cnpj)
+        with self._trava:
+            instituicoes = {('cnpj', cnpj)} if cnpj else set(self._chaves_nome.get(normalizar_nome(nome), ()))
+            linhas = [
+                linha
+                for instituicao in instituicoes
+                for chave, linha in self._linhas.get(instituicao, {}).items()
+                if tipo is None or chave[0] == str(tipo)
+            ]
+
+        serie = pd.DataFrame(linhas, columns=COLUNAS_SERIE)
+        return ordenar_periodos(serie, ['tipo', 'periodicidade', 'ano', 'periodo'])
+
+    def periodos(self):
+        self.carregar()
+        with self._trava:
+            return sorted(self._instituicoes_periodo)
+
+
+_tabela = TabelaSeries()
+
+
+def atualizar_periodo(chave, df, regravar=True):
+    return _tabela.atualizar_periodo(chave, df, regravar)
+
+
+def serie_instituicao(nome, cnpj=None, tipo=None, esperar=True):
+    return _tabela.serie(nome, cnpj, tipo, esperar)
+
+
+def carregar_em_segundo_plano():
+    _tabela.carregar_em_segundo_plano()
+
+
+def carregada():
+    return _tabela.carregada
@@ -0,0 +1,91 @@
+"""
+Coalescência de chamadas simultâneas ("single flight"): enquanto uma chamada
+para uma chave está em andamento, as outras threads que pedem a mesma chave
+esperam por ela e recebem o mesmo resultado (ou a mesma exceção), em vez de
+repetir o download e o parse.
+
+Se a chamada em andamento é interrompida sem uma falha de verdade
+(cancelamento, KeyboardInterrupt...), quem esperava não recebe essa
+interrupção: tenta de novo, e um deles passa a executar.
+"""
+import threading
+
+from bacen.metricas import descrever, incrementar
+
+
+class _Voo:
+    def __init__(self):
+        self.concluido = threading.Event()
+        self.valor = None
+        self.erro = None
+        self.abandonado = False
+
+
+class VooUnico:
+    def __init__(self, nome):
+        self.nome = nome
+        self._voos = {}
+        self._trava = threading.Lock()
+
+    def executar(self, chave, funcao):
+        """
+        Executa funcao() uma única vez por chave em andamento e repassa
+        o resultado a todas as threads que chegaram nesse intervalo
+        """
+        voo, lider = self.entrar(chave)
+        while not lider:
+            voo.concluido.wait()
+            if not voo.abandonado:
+                if voo.erro is not None:
+                    raise voo.erro
+                return voo.valor
+            voo, lider = self.entrar(chave)
+
+        try:
+            valor = funcao()
+        except Exception as e:
+            self.concluir(chave, voo, erro=e)
+            raise
+        except BaseException:
+            self.abandonar(chave, voo)
+            raise
+        self.concluir(chave, voo, valor)
+        return valor
+
+    def entrar(self, chave):
+        """
+        (voo, lider) para quem não pode bloquear dentro de executar (ex.: código
+        assíncrono): o líder calcula e chama concluir (ou abandonar, se foi
+        interrompido); os demais esperam voo.concluido e leem voo.valor/voo.erro,
+        ou entram de novo se voo.abandonado
+        """
+        with self._trava:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+        if not lider:
+            incrementar("bacen_chamadas_coalescidas_total", operacao=self.nome)
+        return voo, lider
+
+    def concluir(self, chave, voo, valor=None, erro=None):
+        voo.valor, voo.erro = valor, erro
+        with self._trava:
+            del self._voos[chave]
+        voo.concluido.set()
+
+    def abandonar(self, chave, voo):
+        """
+        Libera a chave sem resultado nem erro: quem esperava tenta de novo
+        """
+        voo.abandonado = True
+        with self._trava:
+            del self._voos[chave]
+        voo.concluido.set()
+
+    def em_andamento(self):
+        with self._trava:
+            return len(self._voos)
+
+
+descrever("bacen_chamadas_coalescidas_total", "Chamadas que aguardaram uma execução idêntica já em andamento")
@@ -0,0 +1,3 @@
+"""
+Benchmarks do pipeline de dados sobre arquivos de ranking sintéticos.
+"""
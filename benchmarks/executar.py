@@ -0,0 +1,245 @@
+"""
+Benchmark do pipeline (download, leitura, limpeza, conversão numérica,
+identificação de colunas e ranking) sobre arquivos sintéticos, sem acesso ao BACEN.
+
+Os arquivos são servidos por um servidor HTTP local, então baixar_csv é medido
+de ponta a ponta (download em blocos, cache em disco, encoding, dialeto e leitura).
+
+Uso:
+    python -m benchmarks.executar
+    python -m benchmarks.executar --linhas 100 10000 100000 1000000
+    python -m benchmarks.executar --salvar benchmarks/baseline.json
+    python -m benchmarks.executar --comparar benchmarks/baseline.json [--tolerancia 0.2] [--minimo-ms 5]
+
+Tempo: menor tempo entre as repetições. Memória: pico alocado durante a etapa,
+medido com tracemalloc numa execução separada (inclui NumPy/pandas; a memória
+interna do pyarrow não é contabilizada).
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# O cache em disco precisa ficar isolado antes de importar o pacote
+os.environ.setdefault("BACEN_CACHE_DIR", tempfile.mkdtemp(prefix="bench_cache_"))
+
+from bacen import compartilhado, dados  # noqa: E402
+from bacen.colunas import identificar_coluna_instituicao, identificar_colunas_reclamacoes  # noqa: E402
+from bacen.comparacao import comparar_resultados  # noqa: E402
+from bacen.numeros import colunas_numericas, converter_numeros  # noqa: E402
+from bacen.ranking import calcular_ranking  # noqa: E402
+from bacen.resultado import Resultado  # noqa: E402
+from benchmarks.gerador import gerar_csv  # noqa: E402
+
+ETAPAS = [
+    'baixar_csv', 'ler_csv', 'limpar_dados_csv', 'conversao_numerica', 'deteccao_colunas', 'ranking', 'comparacao',
+    'arrow_mmap',
+]
+NOMES_DELIMITADORES = {';': 'ponto-e-virgula', ',': 'virgula'}
+
+
+# ================= SERVIDOR LOCAL =================
+class _Arquivos(BaseHTTPRequestHandler):
+    arquivos = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        tipo = parse_qs(urlparse(self.path).query).get("tipo", [""])[0]
+        corpo = self.arquivos.get(tipo)
+        if corpo is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def iniciar_servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Arquivos)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    dados.URL_BASE = f"http://127.0.0.1:{servidor.server_address[1]}/ranking"
+    return servidor
+
+
+# ================= MEDIÇÃO =================
+def medir(funcao, repeticoes):
+    """
+    Executa funcao(i) repetidas vezes. Retorna (valor, menor tempo, pico de memória em bytes).
+    """
+    tempos = []
+    valor = None
+    for i in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        valor = funcao(i)
+        tempos.append(time.perf_counter() - inicio)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcao(repeticoes)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return valor, min(tempos), pico
+
+
+def executar_cenario(nome, conteudo, repeticoes, etapas):
+    resultados = {}
+    _Arquivos.arquivos[nome] = conteudo
+
+    caminho = os.path.join(tempfile.mkdtemp(prefix="bench_"), f"{nome}.csv")
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(conteudo)
+
+    def registrar(etapa, funcao):
+        if etapa not in etapas:
+            return funcao(0)
+        valor, tempo, pico = medir(funcao, repeticoes)
+        resultados[etapa] = {"tempo_s": tempo, "pico_mb": pico / 1024 / 1024}
+        return valor
+
+    # Cada repetição usa um período diferente para sempre perder o cache
+    registrar('baixar_csv', lambda i: dados.baixar_csv(dados.gerar_link_csv(2000, "BENCH", f"{time.time_ns()}{i}", nome)))
+    df = registrar('ler_csv', lambda i: dados.ler_csv_arquivo(caminho).df)
+    df_limpo = registrar('limpar_dados_csv', lambda i: dados.limpar_dados_csv(df))
+    print(f"{nome:45} {'memoria_frame':20} {dados.uso_memoria(df) / 1024 / 1024:10.2f} MB lido -> "
+          f"{dados.uso_memoria(df_limpo) / 1024 / 1024:.2f} MB tipado")
+
+    numericas = colunas_numericas(df)
+    registrar('conversao_numerica', lambda i: [converter_numeros(df[col]) for col in numericas])
+
+    registrar('deteccao_colunas', lambda i: (
+        identificar_coluna_instituicao(df_limpo.columns),
+        identificar_colunas_reclamacoes(df_limpo.columns),
+    ))
+    registrar('ranking', lambda i: calcular_ranking(df_limpo))
+    # Período "anterior" com os mesmos nomes e outros Índices; Resultados novos a cada
+    # repetição, para incluir o cálculo das posições
+    df_anterior = df_limpo.assign(**{'Índice': df_limpo['Índice'].sample(frac=1, random_state=0).to_numpy()})
+    registrar('comparacao', lambda i: comparar_resultados(Resultado(df_anterior), Resultado(df_limpo)))
+
+    # Período fechado compartilhado entre processos: a leitura com mmap tem de
+    # devolver os mesmos tipos (e o mesmo tamanho) do frame tipado
+    caminho_arrow = f"{caminho}.arrow"
+    compartilhado.gravar(caminho_arrow, df_limpo)
+    df_mmap = registrar('arrow_mmap', lambda i: compartilhado.ler(caminho_arrow))
+    diferentes = {
+        col: (str(df_limpo[col].dtype), str(df_mmap[col].dtype))
+        for col in df_limpo.columns if df_limpo[col].dtype != df_mmap[col].dtype
+    }
+    if diferentes:
+        raise RuntimeError(f"{nome}: o arquivo compartilhado mudou os tipos das colunas: {diferentes}")
+    print(f"{nome:45} {'memoria_mmap':20} {dados.uso_memoria(df_mmap) / 1024 / 1024:10.2f} MB")
+    os.remove(caminho_arrow)
+
+    _Arquivos.arquivos.pop(nome, None)
+    os.remove(caminho)
+    return resultados
+
+
+# ================= BASELINE =================
+def comparar(resultados, baseline, tolerancia, minimo_ms=0.0):
+    """
+    Imprime a variação em relação ao baseline e retorna as regressões de tempo.
+    Aumentos menores que minimo_ms (ruído de etapas de poucos milissegundos)
+    não contam como regressão.
+    """
+    regressoes = []
+    for cenario, etapas in resultados.items():
+        for etapa, medida in etapas.items():
+            referencia = baseline.get("resultados", {}).get(cenario, {}).get(etapa)
+            if not referencia or not referencia["tempo_s"]:
+                continue
+            razao = medida["tempo_s"] / referencia["tempo_s"]
+            marca = ""
+            if razao > 1 + tolerancia and (medida["tempo_s"] - referencia["tempo_s"]) * 1000 >= minimo_ms:
+                marca = "  <-- REGRESSÃO"
+                regressoes.append((cenario, etapa, razao))
+            print(f"{cenario:45} {etapa:20} {razao:6.2f}x tempo  "
+                  f"{medida['pico_mb'] - referencia['pico_mb']:+8.2f} MB{marca}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de rankings do BACEN (offline).")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--encodings", nargs="+", default=["latin1", "utf-8"])
+    parser.add_argument("--delimitadores", nargs="+", default=[";", ","])
+    parser.add_argument("--sem-preambulo", action="store_true", help="Não gerar cenários com linhas antes do cabeçalho")
+    parser.add_argument("--etapas", nargs="+", default=ETAPAS, choices=ETAPAS)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--salvar", help="Gravar os resultados como baseline neste arquivo JSON")
+    parser.add_argument("--comparar", help="Comparar com o baseline deste arquivo JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Aumento de tempo aceito antes de acusar regressão")
+    parser.add_argument("--minimo-ms", type=float, default=5.0,
+                        help="Aumento absoluto mínimo (ms) para acusar regressão (padrão: 5)")
+    args = parser.parse_args(argv)
+
+    servidor = iniciar_servidor()
+    preambulos = [False] if args.sem_preambulo else [False, True]
+
+    resultados = {}
+    try:
+        for linhas in args.linhas:
+            for encoding in args.encodings:
+                for delimitador in args.delimitadores:
+                    for preambulo in preambulos:
+                        nome = "-".join([
+                            encoding,
+                            NOMES_DELIMITADORES.get(delimitador, delimitador),
+                            "preambulo" if preambulo else "simples",
+                            str(linhas),
+                        ])
+                        conteudo = gerar_csv(linhas, encoding, delimitador, preambulo, semente=linhas)
+                        resultados[nome] = executar_cenario(nome, conteudo, args.repeticoes, args.etapas)
+
+                        for etapa, medida in resultados[nome].items():
+                            print(f"{nome:45} {etapa:20} {medida['tempo_s'] * 1000:10.2f} ms "
+                                  f"{medida['pico_mb']:10.2f} MB")
+    finally:
+        servidor.shutdown()
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "parametros": {
+                    "linhas": args.linhas,
+                    "encodings": args.encodings,
+                    "delimitadores": args.delimitadores,
+                    "sem_preambulo": args.sem_preambulo,
+                    "repeticoes": args.repeticoes,
+                },
+                "resultados": resultados,
+            }, arquivo, ensure_ascii=False, indent=2)
+        print(f"Baseline gravado em {args.salvar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        print()
+        regressoes = comparar(resultados, baseline, args.tolerancia, args.minimo_ms)
+        if regressoes:
+            print(f"{len(regressoes)} regressões acima de {args.tolerancia:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Gerador de arquivos de ranking sintéticos no formato dos CSVs do BACEN.
+"""
+import csv
+import io
+import random
+
+COLUNAS_BANCOS = [
+    'Categoria',
+    'Tipo',
+    'CNPJ IF',
+    'Instituição financeira',
+    'Índice',
+    'Quantidade de reclamações reguladas procedentes',
+    'Quantidade de reclamações reguladas - outras',
+    'Quantidade de reclamações não reguladas',
+    'Quantidade total de reclamações',
+    'Quantidade total de clientes – CCS e SCR',
+    'Quantidade de clientes – CCS',
+    'Quantidade de clientes – SCR',
+]
+
+PREAMBULO = [
+    'Ranking de instituições por índice de reclamações',
+    'Período de referência: 4º trimestre',
+    '',
+]
+
+_PREFIXOS = ['BANCO', 'BCO', 'COOPERATIVA DE CRÉDITO', 'SOCIEDADE DE CRÉDITO', 'FINANCEIRA', 'CAIXA']
+_NOMES = ['AÇORES', 'SÃO JOÃO', 'PARANÁ', 'ITAÚ', 'CONFIANÇA', 'VALE', 'NORDESTE', 'GAÚCHO', 'UNIÃO', 'ÁGUIA']
+_SUFIXOS = ['S.A.', 'LTDA', 'S/A', '(CONGLOMERADO)', '']
+
+
+def _numero_br(valor, decimais=2):
+    texto = f"{valor:,.{decimais}f}"
+    return texto.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def gerar_linhas(linhas, semente=0):
+    """
+    Gera as linhas (listas de textos) de um ranking com o número pedido de instituições
+    """
+    aleatorio = random.Random(semente)
+    for i in range(linhas):
+        clientes = aleatorio.randint(1_000, 80_000_000)
+        procedentes = aleatorio.randint(0, 5_000)
+        outras = aleatorio.randint(0, 5_000)
+        nao_reguladas = aleatorio.randint(0, 2_000)
+        indice = procedentes / clientes * 1_000_000
+
+        nome = " ".join(parte for parte in (
+            aleatorio.choice(_PREFIXOS),
+            aleatorio.choice(_NOMES),
+            str(i),
+            aleatorio.choice(_SUFIXOS),
+        ) if parte)
+
+        yield [
+            aleatorio.choice(['S1', 'S2', 'S3', 'S4', 'N/A']),
+            aleatorio.choice(['Banco', 'Cooperativa', 'Financeira']),
+            f"{aleatorio.randint(0, 99_999_999):08d}",
+            nome,
+            _numero_br(indice) if aleatorio.random() > 0.01 else '',
+            str(procedentes),
+            str(outras),
+            _numero_br(nao_reguladas, 0),
+            _numero_br(procedentes + outras + nao_reguladas, 0),
+            _numero_br(clientes, 0),
+            _numero_br(clientes * 0.8, 0),
+            '',
+        ]
+
+
+def gerar_csv(linhas, encoding='latin1', delimitador=';', preambulo=False, semente=0):
+    """
+    Retorna os bytes de um CSV de ranking sintético.
+
+    encoding: 'latin1' ou 'utf-8' (as colunas têm acentos e travessões)
+    delimitador: ';' ou ','
+    preambulo: inclui linhas de título antes do cabeçalho
+    """
+    texto = io.StringIO()
+    if preambulo:
+        for linha in PREAMBULO:
+            texto.write(linha + "\r\n")
+
+    escritor = csv.writer(texto, delimiter=delimitador, lineterminator="\r\n")
+    escritor.writerow(COLUNAS_BANCOS)
+    escritor.writerows(gerar_linhas(linhas, semente))
+
+    # cp1252 cobre o travessão das colunas de clientes, como nos arquivos do BACEN
+    return texto.getvalue().encode('cp1252' if encoding == 'latin1' else encoding)
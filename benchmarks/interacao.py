@@ -0,0 +1,92 @@
+"""
+Latência de uma troca de empresa no dashboard, antes e depois dos fragmentos.
+
+- antes: o script inteiro rodava de novo a cada troca; mede o trabalho de dados
+  desse rerun (identificação de colunas, cópia do frame, ordenação completa,
+  rótulos e formatação de todas as linhas do ranking, busca da empresa por
+  varredura da coluna)
+- depois: só o fragmento da empresa roda; mede a busca pelo índice de
+  instituições e a leitura dos valores exibidos (o ranking já está em cache)
+
+Renderização do Streamlit não entra na conta; no dashboard, os histogramas
+`rerun` e `rerun_empresa` (painel com BACEN_PAINEL_METRICAS=1 ou /metrics)
+mostram a latência real das duas interações.
+
+Uso:
+    python -m benchmarks.interacao
+    python -m benchmarks.interacao --linhas 1000 100000 --trocas 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bacen import dados
+from bacen.colunas import identificar_coluna_instituicao, identificar_colunas_reclamacoes
+from bacen.numeros import converter_numero, formatar_numero_brasileiro, formatar_numeros
+from bacen.resultado import Resultado
+from benchmarks.gerador import gerar_csv
+
+
+def rerun_linear(df, empresa):
+    """Trabalho de dados que o app.py linear refazia a cada troca de empresa"""
+    coluna_instituicao = identificar_coluna_instituicao(df.columns)
+    colunas_reclamacoes = identificar_colunas_reclamacoes(df.columns)
+
+    dados_empresa = df[df[coluna_instituicao] == empresa].iloc[0]
+    valores = {tipo: converter_numero(dados_empresa[coluna]) for tipo, coluna in colunas_reclamacoes.items()}
+    formatar_numero_brasileiro(dados_empresa['Índice'])
+
+    ranking = df.copy().sort_values('Índice', ascending=False).reset_index(drop=True)
+    ranking.insert(0, 'Rank', [f"{i + 1}º" for i in ranking.index])
+    ranking['Índice'] = formatar_numeros(ranking['Índice'])
+    ranking[['Rank', coluna_instituicao, 'Índice']].head(30)
+    return valores
+
+
+def rerun_fragmento(resultado, colunas_reclamacoes, empresa):
+    """Trabalho de dados do fragmento da empresa"""
+    dados_empresa = resultado.df.iloc[resultado.instituicoes.posicao(empresa)]
+    valores = {tipo: converter_numero(dados_empresa[coluna]) for tipo, coluna in colunas_reclamacoes.items()}
+    formatar_numero_brasileiro(dados_empresa['Índice'])
+    return valores
+
+
+def medir_trocas(funcao, empresas):
+    tempos = []
+    for empresa in empresas:
+        inicio = time.perf_counter()
+        funcao(empresa)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return tempos[len(tempos) // 2], tempos[int(len(tempos) * 0.95)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latência de uma troca de empresa, antes e depois dos fragmentos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--trocas", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    print(f"{'linhas':>10} {'antes p50':>12} {'antes p95':>12} {'depois p50':>12} {'depois p95':>12} {'ganho':>8}")
+    for linhas in args.linhas:
+        caminho = os.path.join(tempfile.mkdtemp(prefix="bench_"), "interacao.csv")
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(gerar_csv(linhas, semente=linhas))
+        resultado = Resultado(dados.limpar_dados_csv(dados.ler_csv_arquivo(caminho).df))
+        os.remove(caminho)
+
+        # Montados no primeiro rerun do período, fora da troca de empresa
+        resultado.ranking.topo(30)
+        colunas_reclamacoes = identificar_colunas_reclamacoes(resultado.df.columns)
+        empresas = random.Random(linhas).choices(resultado.instituicoes.nomes, k=args.trocas)
+
+        antes = medir_trocas(lambda empresa: rerun_linear(resultado.df, empresa), empresas)
+        depois = medir_trocas(lambda empresa: rerun_fragmento(resultado, colunas_reclamacoes, empresa), empresas)
+        print(f"{linhas:>10} {antes[0] * 1000:>9.3f} ms {antes[1] * 1000:>9.3f} ms "
+              f"{depois[0] * 1000:>9.3f} ms {depois[1] * 1000:>9.3f} ms {antes[0] / depois[0]:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from bacen.cache_disco import fim_periodo, periodo_fechado
+
+AGORA = datetime(2024, 8, 15)
+
+
+def test_fim_periodo():
+    assert fim_periodo(2024, "TRIMESTRAL", 2) == datetime(2024, 7, 1)
+    assert fim_periodo("2024", "semestral", "2") == datetime(2025, 1, 1)
+    assert fim_periodo(2024, "MENSAL", 12) == datetime(2025, 1, 1)
+    assert fim_periodo(2024, "TRIMESTRAL", 5) is None
+    assert fim_periodo(2024, "DESCONHECIDA", 1) is None
+
+
+def test_periodos_encerrados_do_ano_corrente_estao_fechados():
+    assert periodo_fechado(2023, "TRIMESTRAL", 4, agora=AGORA)
+    assert periodo_fechado(2024, "TRIMESTRAL", 2, agora=AGORA)
+    assert periodo_fechado(2024, "SEMESTRAL", 1, agora=AGORA)
+    assert not periodo_fechado(2024, "TRIMESTRAL", 3, agora=AGORA)
+    assert not periodo_fechado(2024, "SEMESTRAL", 2, agora=AGORA)
+
+
+def test_sem_periodo_reconhecivel_vale_o_ano():
+    assert periodo_fechado(2023, agora=AGORA)
+    assert not periodo_fechado(2024, agora=AGORA)
+    assert not periodo_fechado(2024, "TRIMESTRAL", "x", agora=AGORA)
+    assert not periodo_fechado("ano", agora=AGORA)
@@ -0,0 +1,25 @@
+from bacen.cache_memoria import CacheMemoria
+
+
+def _cache(fixos, ttl=600):
+    return CacheMemoria(ttl=ttl, max_itens=2, nome="teste", fixar=lambda chave: chave in fixos)
+
+
+def test_fixo_nao_sai_para_abrir_espaco():
+    cache = _cache({"a"})
+    for chave in ("a", "b", "c"):
+        cache.guardar(chave, chave)
+
+    assert cache.consultar("a") == "a"
+    assert cache.consultar("b") is None
+    assert cache.consultar("c") == "c"
+
+
+def test_fixo_vencido_sai_pelo_ttl():
+    cache = _cache({"a"})
+    cache.guardar("a", "a", ttl=-1)
+    cache.guardar("b", "b")
+    cache.guardar("c", "c")
+
+    assert cache.consultar("a") is None
+    assert cache.estatisticas()["itens"] == 2
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+from bacen import api, compartilhado, dados
+
+MANTIDO = ("Bancos", 2023, "TRIMESTRAL", 4)
+REMOVIDO = ("Bancos", 2024, "TRIMESTRAL", 1)
+
+
+def _catalogo(*chaves):
+    df = pd.DataFrame(list(chaves), columns=["tipo", "ano", "periodicidade", "periodo"])
+    return df, dados.construir_indice_catalogo(df)
+
+
+def test_periodo_que_sai_do_catalogo_e_invalidado_em_todos_os_caches(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    catalogos = iter([_catalogo(MANTIDO, REMOVIDO), _catalogo(MANTIDO)])
+    monkeypatch.setattr(dados, "load_data", lambda: next(catalogos))
+    dados._cache_catalogo.limpar()
+    api._respostas.limpar()
+
+    dados.atualizar_catalogo()
+    for chave in (MANTIDO, REMOVIDO):
+        compartilhado.gravar(compartilhado.caminho_periodo(chave), pd.DataFrame({"a": [1]}))
+        api._respostas.guardar(("ranking", chave, 30), (b"{}", "etag"))
+    api._respostas.guardar(("comparacao", MANTIDO, REMOVIDO, 20), (b"{}", "etag"))
+    api._respostas.guardar(("catalogo",), (b"{}", "etag"))
+
+    adicionados, removidos = dados.atualizar_catalogo()
+
+    assert (adicionados, removidos) == ([], [REMOVIDO])
+    assert not os.path.exists(compartilhado.caminho_periodo(REMOVIDO))
+    assert os.path.exists(compartilhado.caminho_periodo(MANTIDO))
+    assert api._respostas.consultar(("ranking", REMOVIDO, 30)) is None
+    assert api._respostas.consultar(("comparacao", MANTIDO, REMOVIDO, 20)) is None
+    assert api._respostas.consultar(("catalogo",)) is None
+    assert api._respostas.consultar(("ranking", MANTIDO, 30)) is not None
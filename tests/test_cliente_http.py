@@ -0,0 +1,32 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bacen.cliente_http import criar_sessao
+
+
+class _FalhaUmaVez(BaseHTTPRequestHandler):
+    pedidos = 0
+
+    def do_GET(self):
+        type(self).pedidos += 1
+        self.send_response(503 if type(self).pedidos == 1 else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_nova_tentativa_consome_token():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _FalhaUmaVez)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        # Taxa quase nula: o balde praticamente não enche durante o teste
+        sessao = criar_sessao(taxa=0.001, rajada=10)
+        resposta = sessao.get(f"http://127.0.0.1:{servidor.server_port}/", timeout=5)
+    finally:
+        servidor.shutdown()
+
+    assert resposta.status_code == 200
+    assert _FalhaUmaVez.pedidos == 2
+    assert int(sessao.get_adapter("http://").balde._tokens) == 8
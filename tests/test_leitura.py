@@ -0,0 +1,37 @@
+from bacen.dados import limpar_dados_csv, ler_csv_arquivo
+
+CABECALHO = "Instituição financeira;Índice;Quantidade de reclamações;Quantidade de reclamações\n"
+
+
+def _gravar(tmp_path, linhas):
+    caminho = tmp_path / "ranking.csv"
+    caminho.write_text(CABECALHO + "".join(linhas), encoding="utf-8")
+    return str(caminho)
+
+
+def test_linhas_fora_do_formato_geram_aviso_e_linhas_curtas_sao_mantidas(tmp_path):
+    caminho = _gravar(tmp_path, [
+        "BANCO A;1,5;10;11\n",
+        "BANCO B;2,5\n",
+        "BANCO C;3,5;30;31;extra\n",
+        "BANCO D;4,5;40;41\n",
+    ])
+
+    resultado = ler_csv_arquivo(caminho, "utf-8")
+
+    assert resultado.df["Instituição financeira"].tolist() == ["BANCO A", "BANCO B", "BANCO D"]
+    assert any("1 linha(s) com menos campos" in aviso for aviso in resultado.avisos)
+    assert any("1 linha(s) com mais campos" in aviso for aviso in resultado.avisos)
+
+
+def test_colunas_repetidas_recebem_sufixo(tmp_path):
+    caminho = _gravar(tmp_path, ["BANCO A;1,5;10;11\n", "BANCO B;2,5;20;21\n"])
+
+    resultado = ler_csv_arquivo(caminho, "utf-8")
+
+    assert resultado.avisos == []
+    assert list(resultado.df.columns) == [
+        "Instituição financeira", "Índice", "Quantidade de reclamações", "Quantidade de reclamações.1",
+    ]
+    df = limpar_dados_csv(resultado.df)
+    assert df["Quantidade de reclamações.1"].tolist() == [11, 21]
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pandas as pd
+
+from bacen import dados, lote, metricas
+from bacen.resultado import Resultado
+
+PRONTO = ("Bancos", "2019", "trimestral", "1")
+PENDENTE = ("Bancos", "2019", "trimestral", "2")
+
+
+def _esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim, "tempo esgotado"
+        time.sleep(0.01)
+
+
+def test_lote_cancelado_nao_repassa_cancelamento_a_quem_espera(monkeypatch):
+    metricas.zerar()
+    lider_iniciou = threading.Event()
+
+    async def carregar_lider(chave, *args):
+        if chave == PRONTO:
+            return Resultado(pd.DataFrame()), "rede"
+        lider_iniciou.set()
+        await lote.asyncio.sleep(3600)
+
+    monkeypatch.setattr(lote, "_carregar_lider", carregar_lider)
+    monkeypatch.setattr(dados, "_carregar_periodo", lambda *chave: Resultado(pd.DataFrame({"a": [1]})))
+
+    saida = {}
+
+    def esperar_periodo():
+        try:
+            saida["resultado"] = dados.carregar_periodo(*PENDENTE)
+        except BaseException as e:
+            saida["erro"] = e
+
+    periodos = lote.iterar_periodos([PRONTO, PENDENTE], processos=0)
+    assert next(periodos)[0] == PRONTO
+    assert lider_iniciou.wait(5)
+
+    esperando = threading.Thread(target=esperar_periodo)
+    esperando.start()
+    coalescidas = ("bacen_chamadas_coalescidas_total", (("operacao", "carregar_periodo"),))
+    _esperar(lambda: metricas._contadores.get(coalescidas))
+
+    # Quem consome para antes do fim: o download pendente é cancelado
+    periodos.close()
+    esperando.join(5)
+
+    assert "erro" not in saida
+    assert saida["resultado"].df["a"].tolist() == [1]
+    assert dados._voos_periodo.em_andamento() == 0